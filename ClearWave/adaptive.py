@@ -0,0 +1,176 @@
+from collections import namedtuple
+
+import numpy as np
+
+from signals import output_dtype
+
+# Frequencies (Hz) of the hum and whine tones added by "2. Add Noise"
+HUM_FREQUENCY = 50.0
+WHINE_FREQUENCY = 8000.0
+SYNTHETIC_NOISE_TONES = (HUM_FREQUENCY, WHINE_FREQUENCY)
+
+# Block length of the NLMS update and its normalized step size (0 < mu < 2;
+# smaller values converge more slowly but disturb the audio less)
+DEFAULT_NLMS_BLOCKSIZE = 256
+DEFAULT_NLMS_STEP_SIZE = 0.02
+
+# Output of an adaptive run: the cleaned signal plus its convergence curves,
+# sampled once per block (times in seconds, tone amplitudes shaped
+# (..., blocks, tones), residual power in dB shaped (..., blocks))
+AdaptiveResult = namedtuple(
+    "AdaptiveResult", ["output", "times", "amplitude", "error_power", "tones"]
+)
+
+
+class ToneCanceller:
+    """
+    Block-normalized LMS canceller for sinusoidal interference of known frequency.
+
+    A reference generator supplies a sine and a cosine for every tone, and the
+    NLMS weights learn the amplitude and phase of each tone in the signal, which
+    is then subtracted. The weights are updated once per block from the whole
+    block's error (a matrix product instead of a per-sample loop), and between
+    blocks they are rotated by the phase the tones advance over a block, so the
+    reference block itself never has to be regenerated. `run` processes a whole
+    signal; `process` streams blocks with the weights carried between calls.
+    """
+
+    def __init__(
+        self,
+        fs,
+        tones=SYNTHETIC_NOISE_TONES,
+        step_size=DEFAULT_NLMS_STEP_SIZE,
+        blocksize=DEFAULT_NLMS_BLOCKSIZE,
+    ):
+        """
+        Parameters:
+        - fs: Sampling frequency (Hz).
+        - tones: Frequencies (Hz) of the interfering tones; those at or above
+          Nyquist are ignored.
+        - step_size: Normalized NLMS step size.
+        - blocksize: Number of samples per weight update.
+        """
+        self.fs = fs
+        self.tones = np.array([f for f in tones if 0 < f < fs / 2], dtype=float)
+        self.step_size = step_size
+        self.blocksize = blocksize
+
+        # Reference block, [sin(w k), cos(w k)] for every tone, shape (blocksize, 2 * tones)
+        phase = 2 * np.pi * np.outer(np.arange(blocksize), self.tones) / fs
+        self.reference = np.hstack([np.sin(phase), np.cos(phase)])
+        self._energy = self._energy_for(blocksize)
+        self._rotation = self._rotation_for(blocksize)
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the learned weights so the next block starts from scratch.
+        """
+        self.weights = None
+
+    def _energy_for(self, n):
+        # Energy of the first n reference samples, which normalizes the update
+        return np.sum(np.square(self.reference[:n])) + np.finfo(float).eps
+
+    def _rotation_for(self, n):
+        # Cosine and sine of the phase every tone advances over n samples
+        advance = 2 * np.pi * self.tones * n / self.fs
+        return np.cos(advance), np.sin(advance)
+
+    def _step(self, block, weights):
+        # One NLMS update over a block of at most `blocksize` samples: the error
+        # of the whole block with fixed weights, then one normalized update
+        n = block.shape[-1]
+        k = self.tones.size
+        reference = self.reference[:n]
+        if weights is None:
+            weights = np.zeros(block.shape[:-1] + (2 * k,))
+        full = n == self.blocksize
+        energy = self._energy if full else self._energy_for(n)
+        error = block - weights @ reference.T
+        weights = weights + (self.step_size / energy) * (error @ reference)
+
+        # Re-express the weights relative to the start of the next block:
+        # a sin(w (k + n)) + b cos(w (k + n)) = a' sin(w k) + b' cos(w k)
+        a, b = weights[..., :k], weights[..., k:]
+        cos, sin = self._rotation if full else self._rotation_for(n)
+        weights = np.concatenate([a * cos - b * sin, a * sin + b * cos], axis=-1)
+        return error, np.hypot(a, b), weights
+
+    def process(self, block):
+        """
+        Cancel the tones in one block of samples, carrying the learned weights
+        between calls (for streaming and real-time use).
+
+        Parameters:
+        - block: Block of audio samples (numpy array, time on the last axis).
+
+        Returns:
+        - Block with the tones removed, the same length as the input block.
+        """
+        out = np.empty(block.shape, dtype=output_dtype(block))
+        for start in range(0, block.shape[-1], self.blocksize):
+            stop = start + self.blocksize
+            out[..., start:stop], _, self.weights = self._step(
+                block[..., start:stop], self.weights
+            )
+        return out
+
+    def run(self, data):
+        """
+        Cancel the tones in a whole signal, starting from zero weights, and
+        record the convergence of the weights. Does not touch the streaming state.
+
+        Parameters:
+        - data: Input audio signal (numpy array, time on the last axis).
+
+        Returns:
+        - AdaptiveResult(output, times, amplitude, error_power, tones).
+        """
+        n = data.shape[-1]
+        n_blocks = -(-n // self.blocksize)
+        out = np.empty(data.shape, dtype=output_dtype(data))
+        amplitude = np.empty(data.shape[:-1] + (n_blocks, self.tones.size))
+        error_power = np.empty(data.shape[:-1] + (n_blocks,))
+
+        weights = None
+        for block in range(n_blocks):
+            start = block * self.blocksize
+            stop = start + self.blocksize
+            error, amplitude[..., block, :], weights = self._step(
+                data[..., start:stop], weights
+            )
+            out[..., start:stop] = error
+            error_power[..., block] = np.mean(np.square(error), axis=-1)
+
+        times = np.arange(n_blocks) * self.blocksize / self.fs
+        error_power = 10 * np.log10(error_power + 1e-12)
+        return AdaptiveResult(out, times, amplitude, error_power, self.tones)
+
+    def apply(self, data):
+        """
+        Cancel the tones in a signal.
+
+        Parameters:
+        - data: Input audio signal (numpy array, time on the last axis).
+
+        Returns:
+        - Audio data with the tones removed, the same shape as the input.
+        """
+        return self.run(data).output
+
+
+def tone_canceller(lowcut, highcut, fs):
+    """
+    Design an adaptive canceller for the synthetic hum and whine tones. The band
+    edges are not used: the canceller removes only the reference tones.
+
+    Parameters:
+    - lowcut: Low cutoff frequency (Hz), unused.
+    - highcut: High cutoff frequency (Hz), unused.
+    - fs: Sampling frequency (Hz).
+
+    Returns:
+    - ToneCanceller for the 50 Hz and 8 kHz tones.
+    """
+    return ToneCanceller(fs)
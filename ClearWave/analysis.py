@@ -0,0 +1,241 @@
+import numpy as np
+
+from features import FLATNESS_AMIN, get_features
+from signals import unwrap
+from spectrum import DEFAULT_LOG_BINS, DEFAULT_NPERSEG, get_spectrum, log_bin, welch_psd
+from streaming import DEFAULT_BLOCKSIZE
+
+
+def _energy_quantile(freqs, cumulative_energy, q):
+    # First frequency at which the cumulative energy reaches q, per channel
+    # (searchsorted over the last axis, vectorized across leading axes)
+    return freqs[np.sum(cumulative_energy < q, axis=-1)]
+
+
+def _suggest_from_spectrum(freqs, magnitude, flatness, bandwidth):
+    # Shared cutoff heuristic: energy percentiles adjusted by centroid, rolloff,
+    # flatness and bandwidth, evaluated per channel (leading axes of magnitude)
+
+    # Calculate the total energy of the positive frequencies
+    total_energy = np.sum(magnitude, axis=-1, keepdims=True)
+
+    # Calculate the spectral centroid (center of mass of the spectrum)
+    spectral_centroid = np.sum(freqs * magnitude, axis=-1) / total_energy[..., 0]
+
+    # Compute the cumulative energy for spectral rolloff calculation
+    cumulative_energy = np.cumsum(magnitude, axis=-1) / total_energy
+
+    # Spectral rolloff: frequency below which 85% of the energy is concentrated
+    spectral_rolloff = _energy_quantile(freqs, cumulative_energy, 0.85)
+
+    # Estimate low and high cutoff based on the 10th and 90th percentile of the energy distribution
+    lowcut_suggested = _energy_quantile(freqs, cumulative_energy, 0.1)
+    highcut_suggested = _energy_quantile(freqs, cumulative_energy, 0.9)
+
+    # Adjust the low and high cutoff based on spectral centroid and rolloff
+    lowcut_suggested = (lowcut_suggested + spectral_centroid * 0.2) / 2
+    highcut_suggested = (highcut_suggested + spectral_rolloff * 0.8) / 2
+
+    # If spectral flatness suggests high noise, reduce the high cutoff
+    # (higher flatness indicates a more noise-like signal)
+    highcut_suggested = np.where(
+        flatness > 0.3, highcut_suggested * 0.8, highcut_suggested
+    )
+
+    # Further adjust the low and high cutoff based on spectral bandwidth
+    lowcut_suggested = np.minimum(lowcut_suggested, bandwidth * 0.2)
+    highcut_suggested = np.maximum(highcut_suggested, bandwidth * 1.2)
+
+    # Keep the band wide enough for every channel
+    return int(np.min(lowcut_suggested)), int(np.max(highcut_suggested))
+
+
+def suggest_bandpass_values(audio_data, sr):
+    """
+    Suggest advanced band-pass filter cutoff values based on multiple audio characteristics,
+    including spectral centroid, rolloff, flatness, and bandwidth.
+
+    Multichannel audio, shaped (channels, samples), is analysed per channel in
+    batched operations; the suggestion is the band that covers every channel
+    (the lowest low cutoff and the highest high cutoff).
+
+    Parameters:
+    - audio_data: Input audio data (time on the last axis) or its SignalHandle.
+    - sr: Sampling rate.
+
+    Returns:
+    - lowcut_suggested: Suggested low cutoff frequency.
+    - highcut_suggested: Suggested high cutoff frequency.
+    """
+    # Positive-frequency magnitude spectrum from the shared real-FFT cache
+    positive_freqs, positive_magnitude = get_spectrum(audio_data, sr)
+
+    # Spectral flatness (a measure of noisiness) and spectral bandwidth (spread of energy),
+    # both taken from the shared single-STFT feature extractor
+    features = get_features(audio_data, sr)
+    spectral_flatness = np.mean(features.flatness, axis=-1)
+    spectral_bandwidth = np.mean(features.bandwidth, axis=-1)
+
+    return _suggest_from_spectrum(
+        positive_freqs, positive_magnitude, spectral_flatness, spectral_bandwidth
+    )
+
+
+def suggest_bandpass_values_welch(
+    audio_data, sr, start=None, end=None, nperseg=DEFAULT_NPERSEG, blocks=None
+):
+    """
+    Suggest band-pass cutoff values from an averaged Welch periodogram instead of
+    one full-length FFT.
+
+    The signal (or the selected time range, e.g. a noise-only segment) is read
+    once, block by block, with bounded memory, and averaging the segments gives
+    a much smoother spectrum, so the suggestions vary less between recordings.
+    The same heuristic as suggest_bandpass_values is applied to the square root
+    of the PSD, with flatness and bandwidth taken from the averaged PSD.
+
+    Parameters:
+    - audio_data: Input audio data (time on the last axis) or its SignalHandle, or
+      None if `blocks` is given.
+    - sr: Sampling rate.
+    - start: Start of the analysed range (s), defaults to the beginning.
+    - end: End of the analysed range (s), defaults to the end.
+    - nperseg: Welch segment length in samples.
+    - blocks: Iterable of consecutive blocks to analyse instead of `audio_data`.
+
+    Returns:
+    - lowcut_suggested: Suggested low cutoff frequency.
+    - highcut_suggested: Suggested high cutoff frequency.
+
+    Raises:
+    - ValueError: If the analysed range is shorter than one Welch segment.
+    """
+    freqs, psd = welch_psd(unwrap(audio_data), sr, start, end, nperseg, blocks)
+    magnitude = np.sqrt(psd)  # Amplitude density, comparable to |FFT|
+
+    # Flatness of the averaged power spectrum and the spread of its amplitudes
+    clipped = np.maximum(psd, FLATNESS_AMIN)
+    spectral_flatness = np.exp(np.mean(np.log(clipped), axis=-1)) / np.mean(
+        clipped, axis=-1
+    )
+    weights = magnitude / np.sum(magnitude, axis=-1, keepdims=True)
+    centroid = np.sum(weights * freqs, axis=-1, keepdims=True)
+    spectral_bandwidth = np.sqrt(np.sum(weights * np.square(freqs - centroid), axis=-1))
+
+    return _suggest_from_spectrum(
+        freqs, magnitude, spectral_flatness, spectral_bandwidth
+    )
+
+
+class SNRAccumulator:
+    """
+    Streaming Signal-to-Noise Ratio between an original and a cleaned signal.
+
+    Pairs of consecutive blocks are fed through `update`; only the signal and
+    noise energies per channel are kept, accumulated in float64, so the SNR of a
+    recording can be measured while it is filtered block by block.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """
+        Discard the accumulated energies.
+        """
+        self.signal_energy = 0.0
+        self.noise_energy = 0.0
+        self.samples = 0  # Samples per channel
+        self.size = 0  # Samples over all channels
+
+    def update(self, original, cleaned):
+        """
+        Add the next block of the original signal and the matching cleaned block
+        (time on the last axis).
+        """
+        original = original.astype(np.float64)
+        diff = original - cleaned
+        # Clip extreme differences to prevent overflow during squaring
+        np.clip(diff, -1e6, 1e6, out=diff)
+        self.signal_energy = self.signal_energy + np.einsum(
+            "...i,...i->...", original, original
+        )
+        self.noise_energy = self.noise_energy + np.einsum("...i,...i->...", diff, diff)
+        self.samples += original.shape[-1]
+        self.size += original.size
+
+    def snr(self, per_channel=False):
+        """
+        Return the SNR of all blocks seen so far.
+
+        Parameters:
+        - per_channel: Return one SNR per channel instead of one over all channels.
+
+        Returns:
+        - snr: SNR in decibels (dB), an array of one value per channel if per_channel.
+        """
+        # Mean power per channel, or over all channels
+        if per_channel:
+            signal_power = np.asarray(self.signal_energy) / self.samples
+            noise_power = np.asarray(self.noise_energy) / self.samples
+        else:
+            signal_power = np.sum(self.signal_energy) / self.size
+            noise_power = np.sum(self.noise_energy) / self.size
+
+        # Infinite SNR where there's no noise, avoiding divide-by-zero warnings
+        with np.errstate(divide="ignore"):
+            snr = 10 * np.log10(signal_power / noise_power)
+        return np.where(noise_power == 0, np.inf, snr) if per_channel else snr
+
+
+def calculate_snr(original_audio, cleaned_audio, per_channel=False):
+    """
+    Calculate the Signal-to-Noise Ratio (SNR) between the original and cleaned audio.
+
+    Parameters:
+    - original_audio: Original audio signal (time on the last axis) or its SignalHandle.
+    - cleaned_audio: Cleaned audio signal after noise cancellation (or its SignalHandle).
+    - per_channel: Return one SNR per channel instead of one over all channels.
+
+    Returns:
+    - snr: Calculated SNR in decibels (dB), an array of one value per channel if per_channel.
+    """
+
+    original_audio = unwrap(original_audio)
+    cleaned_audio = unwrap(cleaned_audio)
+
+    # Accumulate the powers of the original and noise signals in float64 one
+    # block at a time, instead of casting both whole signals to float64
+    accumulator = SNRAccumulator()
+    for start in range(0, original_audio.shape[-1], DEFAULT_BLOCKSIZE):
+        accumulator.update(
+            original_audio[..., start : start + DEFAULT_BLOCKSIZE],
+            cleaned_audio[..., start : start + DEFAULT_BLOCKSIZE],
+        )
+    return accumulator.snr(per_channel)
+
+
+def snr_spectrum(original_spectrum, cleaned_spectrum, sr, n_bins=DEFAULT_LOG_BINS):
+    """
+    Calculate the SNR across the frequency spectrum, averaged over log-spaced bins.
+
+    Parameters:
+    - original_spectrum: Spectrum of the original audio.
+    - cleaned_spectrum: Spectrum of the cleaned audio.
+    - sr: Sampling rate.
+    - n_bins: Number of log-spaced frequency bins.
+
+    Returns:
+    - LogSpectrum of the SNR (dB): bin centers, maximum and mean per bin (per channel).
+    """
+    original_magnitude = original_spectrum.magnitude
+    cleaned_magnitude = cleaned_spectrum.magnitude
+
+    # Calculate the SNR in the frequency domain
+    snr_values = 10 * np.log10(
+        (original_magnitude**2)
+        / (np.abs(original_magnitude - cleaned_magnitude) ** 2 + 1e-10)
+    )
+
+    # Average the SNR over log-spaced bins for a constant-size, log-axis friendly plot
+    return log_bin(original_spectrum.freqs, snr_values, n_bins, fmin=1.0, fmax=sr / 2)
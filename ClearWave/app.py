@@ -1,335 +1,62 @@
 import streamlit as st
 import numpy as np
-import pandas as pd
-import librosa
-import soundfile as sf
-import matplotlib.patheffects as path_effects
-from scipy import signal
-from scipy.signal import (
-    butter,
-    lfilter,
-    firwin,
-    freqz,
-    iirfilter,
-    cheby1,
-    cheby2,
-    ellip,
-    bessel,
-)
-import io
-import altair as alt
-
-all_filters = [
-    "Butterworth Band-pass",
-    "FIR Band-pass",
-    "IIR Band-pass",
-    "Chebyshev Type I Band-pass",
-    "Chebyshev Type II Band-pass",
-    "Elliptic Band-pass",
-    "Bessel Band-pass",
-]
-
-
-def butter_bandpass(lowcut, highcut, fs, order=5):
-    """
-    Design a Butterworth band-pass filter, which provides a smooth frequency response.
-
-    Parameters:
-    - lowcut: Low cutoff frequency (Hz).
-    - highcut: High cutoff frequency (Hz).
-    - fs: Sampling frequency (Hz).
-    - order: Filter order, which defines the steepness of the filter transition.
-
-    Returns:
-    - b, a: Numerator (b) and denominator (a) polynomials of the IIR filter.
-    """
-    nyquist = 0.5 * fs  # Nyquist frequency, half the sampling rate
-    low = lowcut / nyquist  # Normalize the low cutoff frequency
-    high = highcut / nyquist  # Normalize the high cutoff frequency
-    b, a = butter(
-        order, [low, high], btype="band"
-    )  # Design Butterworth band-pass filter
-    return b, a
-
-
-def fir_bandpass(lowcut, highcut, fs, numtaps=101):
-    """
-    Design a FIR band-pass filter with a specified number of taps.
-
-    Parameters:
-    - lowcut: Low cutoff frequency (Hz).
-    - highcut: High cutoff frequency (Hz).
-    - fs: Sampling frequency (Hz).
-    - numtaps: Number of filter taps, controlling the filter order.
-
-    Returns:
-    - taps: FIR filter coefficients, defining the filter's impulse response.
-    """
-    nyquist = 0.5 * fs  # Nyquist frequency
-    taps = firwin(
-        numtaps, [lowcut / nyquist, highcut / nyquist], pass_zero=False
-    )  # Design FIR band-pass filter
-    return taps
-
+from profiling import TRACE_PATH, Profiler, activate, profiled
+from signals import HASH_FUNCS, SignalHandle
 
-def iir_bandpass(lowcut, highcut, fs, order=5):
-    """
-    Design a general IIR band-pass filter (Butterworth by default).
-
-    Parameters:
-    - lowcut: Low cutoff frequency (Hz).
-    - highcut: High cutoff frequency (Hz).
-    - fs: Sampling frequency (Hz).
-    - order: Filter order.
+# The processing and plotting stack (scipy, pandas, altair) is imported in
+# section 1 once a file has been uploaded, so the app shell and the upload
+# control render without waiting for it
 
-    Returns:
-    - b, a: Numerator (b) and denominator (a) polynomials of the IIR filter.
-    """
-    nyquist = 0.5 * fs  # Nyquist frequency
-    low = lowcut / nyquist  # Normalize low cutoff frequency
-    high = highcut / nyquist  # Normalize high cutoff frequency
-    b, a = iirfilter(
-        order, [low, high], btype="band", ftype="butter"
-    )  # Design IIR filter with Butterworth characteristics
-    return b, a
-
-
-def cheby1_bandpass(lowcut, highcut, fs, order=5, rp=0.5):
-    """
-    Design a Chebyshev Type I band-pass filter with ripple in the passband.
-
-    Parameters:
-    - lowcut: Low cutoff frequency (Hz).
-    - highcut: High cutoff frequency (Hz).
-    - fs: Sampling frequency (Hz).
-    - order: Filter order.
-    - rp: Maximum ripple allowed in the passband (in dB).
-
-    Returns:
-    - b, a: Numerator (b) and denominator (a) polynomials of the IIR filter.
-    """
-    nyquist = 0.5 * fs  # Nyquist frequency
-    low = lowcut / nyquist  # Normalize low cutoff frequency
-    high = highcut / nyquist  # Normalize high cutoff frequency
-    b, a = cheby1(
-        order, rp, [low, high], btype="band"
-    )  # Design Chebyshev Type I band-pass filter
-    return b, a
-
-
-def cheby2_bandpass(lowcut, highcut, fs, order=5, rs=20):
-    """
-    Design a Chebyshev Type II band-pass filter with attenuation in the stopband.
-
-    Parameters:
-    - lowcut: Low cutoff frequency (Hz).
-    - highcut: High cutoff frequency (Hz).
-    - fs: Sampling frequency (Hz).
-    - order: Filter order.
-    - rs: Minimum attenuation required in the stopband (in dB).
-
-    Returns:
-    - b, a: Numerator (b) and denominator (a) polynomials of the IIR filter.
-    """
-    nyquist = 0.5 * fs  # Nyquist frequency
-    low = lowcut / nyquist  # Normalize low cutoff frequency
-    high = highcut / nyquist  # Normalize high cutoff frequency
-    b, a = cheby2(
-        order, rs, [low, high], btype="band"
-    )  # Design Chebyshev Type II band-pass filter
-    return b, a
-
-
-def ellip_bandpass(lowcut, highcut, fs, order=5, rp=0.5, rs=20):
-    """
-    Design an elliptic (Cauer) band-pass filter with ripple in the passband and stopband.
-
-    Parameters:
-    - lowcut: Low cutoff frequency (Hz).
-    - highcut: High cutoff frequency (Hz).
-    - fs: Sampling frequency (Hz).
-    - order: Filter order.
-    - rp: Maximum ripple allowed in the passband (in dB).
-    - rs: Minimum attenuation required in the stopband (in dB).
-
-    Returns:
-    - b, a: Numerator (b) and denominator (a) polynomials of the IIR filter.
-    """
-    nyquist = 0.5 * fs  # Nyquist frequency
-    low = lowcut / nyquist  # Normalize low cutoff frequency
-    high = highcut / nyquist  # Normalize high cutoff frequency
-    b, a = ellip(
-        order, rp, rs, [low, high], btype="band"
-    )  # Design elliptic band-pass filter
-    return b, a
-
-
-def bessel_bandpass(lowcut, highcut, fs, order=5):
-    """
-    Design a Bessel band-pass filter with a maximally flat group delay.
-
-    Parameters:
-    - lowcut: Low cutoff frequency (Hz).
-    - highcut: High cutoff frequency (Hz).
-    - fs: Sampling frequency (Hz).
-    - order: Filter order.
-
-    Returns:
-    - b, a: Numerator (b) and denominator (a) polynomials of the IIR filter.
-    """
-    nyquist = 0.5 * fs  # Nyquist frequency
-    low = lowcut / nyquist  # Normalize low cutoff frequency
-    high = highcut / nyquist  # Normalize high cutoff frequency
-    b, a = bessel(order, [low, high], btype="band")  # Design Bessel band-pass filter
-    return b, a
-
-
-def apply_filter(data, lowcut, highcut, fs, filter_type, order=5, rp=None, rs=None):
-    """
-    Apply the selected filter type to the input audio data.
+primary_color = "#00CC66"  # Matte green used for cleaned signals
+secondary_color = "#FF4B4B"  # Matte red used for noisy signals
+tertiary_color = "#3399FF"  # Matte blue used for neutral signals
 
-    Parameters:
-    - data: Input audio data (numpy array).
-    - lowcut: Low cutoff frequency (Hz).
-    - highcut: High cutoff frequency (Hz).
-    - fs: Sampling frequency (Hz).
-    - filter_type: Type of filter to apply (e.g., 'Butterworth', 'FIR').
-    - order: Filter order (applicable to IIR filters).
-    - rp: Passband ripple (dB) for Chebyshev I and Elliptic filters (optional).
-    - rs: Stopband attenuation (dB) for Chebyshev II and Elliptic filters (optional).
 
-    Returns:
-    - Filtered audio data (numpy array).
+def response_filters(filter_type=None, filters=None):
     """
-    if filter_type == "Butterworth Band-pass":
-        b, a = butter_bandpass(lowcut, highcut, fs, order)  # Design Butterworth filter
-        return lfilter(b, a, data)  # Apply filter to the input data
-    elif filter_type == "FIR Band-pass":
-        taps = fir_bandpass(lowcut, highcut, fs)  # Design FIR filter
-        return lfilter(taps, 1.0, data)  # Apply FIR filter
-    elif filter_type == "IIR Band-pass":
-        b, a = iir_bandpass(lowcut, highcut, fs, order)  # Design general IIR filter
-        return lfilter(b, a, data)  # Apply IIR filter
-    elif filter_type == "Chebyshev Type I Band-pass":
-        # Use the provided rp, or fall back to a default if not provided
-        rp = rp if rp is not None else 0.5
-        b, a = cheby1_bandpass(
-            lowcut, highcut, fs, order, rp
-        )  # Design Chebyshev Type I filter
-        return lfilter(b, a, data)  # Apply Chebyshev Type I filter
-    elif filter_type == "Chebyshev Type II Band-pass":
-        # Use the provided rs, or fall back to a default if not provided
-        rs = rs if rs is not None else 20
-        b, a = cheby2_bandpass(
-            lowcut, highcut, fs, order, rs
-        )  # Design Chebyshev Type II filter
-        return lfilter(b, a, data)  # Apply Chebyshev Type II filter
-    elif filter_type == "Elliptic Band-pass":
-        # Use the provided rp and rs, or fall back to defaults if not provided
-        rp = rp if rp is not None else 0.5
-        rs = rs if rs is not None else 20
-        b, a = ellip_bandpass(
-            lowcut, highcut, fs, order, rp, rs
-        )  # Design elliptic filter
-        return lfilter(b, a, data)  # Apply elliptic filter
-    elif filter_type == "Bessel Band-pass":
-        b, a = bessel_bandpass(lowcut, highcut, fs, order)  # Design Bessel filter
-        return lfilter(b, a, data)  # Apply Bessel filter
+    Select the filter types whose frequency, phase, impulse and step responses can be plotted.
 
-
-@st.cache_data
-def suggest_bandpass_values(audio_data, sr):
-    """
-    Suggest advanced band-pass filter cutoff values based on multiple audio characteristics,
-    including spectral centroid, rolloff, flatness, and bandwidth.
+    Non-linear types (the spectral denoiser) adapt their gains to the signal and
+    have no fixed response, so they are left out with a note.
 
     Parameters:
-    - audio_data: Input audio data.
-    - sr: Sampling rate.
+    - filter_type: Single filter type, used if filters is not provided.
+    - filters: List of filter types.
 
     Returns:
-    - lowcut_suggested: Suggested low cutoff frequency.
-    - highcut_suggested: Suggested high cutoff frequency.
+    - List of the linear filter types.
     """
-    # Perform Fast Fourier Transform (FFT) on the audio data
-    fft = np.fft.fft(audio_data)
-    freqs = np.fft.fftfreq(len(fft), 1 / sr)
-    magnitude = np.abs(fft)
-
-    # Focus on positive frequencies (first half of the FFT output)
-    positive_freqs = freqs[: len(freqs) // 2]
-    positive_magnitude = magnitude[: len(magnitude) // 2]
-
-    # Calculate the total energy of the positive frequencies
-    total_energy = np.sum(positive_magnitude)
-
-    # Calculate the spectral centroid (center of mass of the spectrum)
-    spectral_centroid = np.sum(positive_freqs * positive_magnitude) / total_energy
-
-    # Compute the cumulative energy for spectral rolloff calculation
-    cumulative_energy = np.cumsum(positive_magnitude) / total_energy
-
-    # Spectral rolloff: frequency below which 85% of the energy is concentrated
-    spectral_rolloff = positive_freqs[np.searchsorted(cumulative_energy, 0.85)]
-
-    # Compute spectral flatness (a measure of noisiness) and spectral bandwidth (spread of energy)
-    spectral_flatness = librosa.feature.spectral_flatness(y=audio_data)[0]
-    spectral_bandwidth = librosa.feature.spectral_bandwidth(y=audio_data, sr=sr)[0]
-
-    # Estimate low and high cutoff based on the 10th and 90th percentile of the energy distribution
-    lowcut_suggested = positive_freqs[np.searchsorted(cumulative_energy, 0.1)]
-    highcut_suggested = positive_freqs[np.searchsorted(cumulative_energy, 0.9)]
-
-    # Adjust the low and high cutoff based on spectral centroid and rolloff
-    lowcut_suggested = (lowcut_suggested + spectral_centroid * 0.2) / 2
-    highcut_suggested = (highcut_suggested + spectral_rolloff * 0.8) / 2
-
-    # If spectral flatness suggests high noise, reduce the high cutoff
-    if (
-        np.mean(spectral_flatness) > 0.3
-    ):  # Higher flatness indicates more noise-like signal
-        highcut_suggested = (
-            highcut_suggested * 0.8
-        )  # Lower the high cutoff to filter noise
-
-    # Further adjust the low and high cutoff based on spectral bandwidth
-    lowcut_suggested = min(lowcut_suggested, np.mean(spectral_bandwidth) * 0.2)
-    highcut_suggested = max(highcut_suggested, np.mean(spectral_bandwidth) * 1.2)
-
-    return int(lowcut_suggested), int(highcut_suggested)
+    if filters is None:
+        filters = [filter_type]
+    linear = [filt for filt in filters if filter_bank.is_linear(filt)]
+    if not linear:
+        st.info(
+            f"{filter_type} adapts its gains to the signal, so it has no fixed "
+            "response to plot."
+        )
+    return linear
 
 
-@st.cache_data
-def load_audio(audio_file):
+def analysis_series(table, quantity):
     """
-    Load the uploaded audio file into memory.
+    Select one quantity of a filter analysis table as curves on a shared axis.
 
     Parameters:
-    - audio_file: The uploaded audio file.
-
-    Returns:
-    - audio_data: The audio data as a numpy array.
-    - sr: Sampling rate of the audio.
-    """
-    audio_data, sr = librosa.load(audio_file, sr=None)
-    return audio_data, sr
-
-
-primary_color = "#00CC66"  # Matte green used for cleaned signals
-secondary_color = "#FF4B4B"  # Matte red used for noisy signals
-tertiary_color = "#3399FF"  # Matte blue used for neutral signals
-
-
-def apply_text_effects():
-    """
-    Apply text effects for plot labels to enhance visibility.
+    - table: Table returned by comparison.analyze_filters.
+    - quantity: Quantity to select (e.g. "Gain" or "Impulse").
 
     Returns:
-    - List of path_effects for text styling.
+    - x: The shared frequencies (Hz) or times (s).
+    - curves: Dictionary mapping each filter type to its values.
     """
-    return [path_effects.Stroke(linewidth=3, foreground="white"), path_effects.Normal()]
+    rows = table[table["Quantity"] == quantity]
+    filters = rows["Filter"].to_numpy()
+    x, y = rows["X"].to_numpy(), rows["Y"].to_numpy()
+    curves = {filt: y[filters == filt] for filt in dict.fromkeys(filters)}
+    return x[filters == filters[0]], curves
 
 
+@profiled()
 def filter_customization_panel(
     audio_data,
     lowcut,
@@ -339,6 +66,7 @@ def filter_customization_panel(
     default_order=5,
     default_rp=0.5,
     default_rs=20,
+    zero_phase=False,
 ):
     """
     Create an interactive filter customization panel where users can modify filter parameters and visualize the result.
@@ -352,16 +80,28 @@ def filter_customization_panel(
     - default_order: Default filter order.
     - default_rp: Default passband ripple (for Chebyshev I and Elliptic filters).
     - default_rs: Default stopband ripple (for Chebyshev II and Elliptic filters).
+    - zero_phase: Show the effective response of forward-backward filtering.
 
     Returns:
     - filter_order: The selected filter order.
     - rp: The passband ripple value (if applicable).
     - rs: The stopband ripple value (if applicable).
+    - numtaps: The number of FIR taps (if applicable).
+    - fir_method: The FIR execution mode (if applicable).
     """
 
     # General Filter Customization Controls
     st.write("**Filter Customization**")
 
+    # The spectral denoiser has no design parameters or fixed frequency response
+    if not filter_bank.is_linear(filter_type):
+        st.info(
+            f"{filter_type} estimates the noise spectrum from the quietest frames "
+            "and attenuates it inside the selected band; there are no design "
+            "parameters to adjust."
+        )
+        return default_order, None, None, None, "auto"
+
     # Slider for Filter Order (applies to most filters), with a unique key
     filter_order = st.slider(
         "Filter Order",
@@ -396,32 +136,51 @@ def filter_customization_panel(
     else:
         rs = None
 
-    # Apply the filter with customized parameters
-    if filter_type == "Butterworth Band-pass":
-        b, a = butter_bandpass(lowcut, highcut, sr, filter_order)
-    elif filter_type == "FIR Band-pass":
-        b, a = fir_bandpass(lowcut, highcut, sr), 1.0
-    elif filter_type == "IIR Band-pass":
-        b, a = iir_bandpass(lowcut, highcut, sr, filter_order)
-    elif filter_type == "Chebyshev Type I Band-pass":
-        b, a = cheby1_bandpass(lowcut, highcut, sr, filter_order, rp)
-    elif filter_type == "Chebyshev Type II Band-pass":
-        b, a = cheby2_bandpass(lowcut, highcut, sr, filter_order, rs)
-    elif filter_type == "Elliptic Band-pass":
-        b, a = ellip_bandpass(lowcut, highcut, sr, filter_order, rp, rs)
-    elif filter_type == "Bessel Band-pass":
-        b, a = bessel_bandpass(lowcut, highcut, sr, filter_order)
+    # Tap count and execution mode for the FIR filter; long filters are run
+    # with overlap-add FFT convolution when that is cheaper than direct form
+    if filter_type == "FIR Band-pass":
+        numtaps = st.slider(
+            "Number of Taps",
+            min_value=11,
+            max_value=4001,
+            value=101,
+            step=10,
+            key="fir_numtaps_slider",
+        )
+        fir_method = st.radio(
+            "FIR Execution",
+            ["auto", "direct", "fft"],
+            format_func={
+                "auto": "Automatic",
+                "direct": "Direct form",
+                "fft": "FFT overlap-add",
+            }.get,
+            horizontal=True,
+            key="fir_method_radio",
+        )
+    else:
+        numtaps, fir_method = None, "auto"
 
     # Plot the frequency response of the customized filter
-    w, h = freqz(b, a, worN=2000)
-    freqs = (sr * 0.5 / np.pi) * w
+    analysis = analyze_filters(
+        [filter_type],
+        lowcut,
+        highcut,
+        sr,
+        filter_order,
+        rp,
+        rs,
+        numtaps,
+        zero_phase=zero_phase,
+    )
+    freqs, curves = analysis_series(analysis, "Gain")
 
     # Apply a small epsilon to avoid log of zero
     epsilon = 1e-10
-    gain = 20 * np.log10(np.abs(h) + epsilon)  # Avoid log(0) by adding epsilon
+    gain = 20 * np.log10(curves[filter_type] + epsilon)
 
-    # Prepare the data for plotting
-    df = pd.DataFrame({"Frequency (Hz)": freqs, "Gain (dB)": gain})
+    # Prepare the data for plotting (within the chart's point budget)
+    df = wide_frame("Frequency (Hz)", freqs, {"Gain (dB)": gain})
 
     # Create an Altair plot for the filter response
     chart = (
@@ -438,7 +197,8 @@ def filter_customization_panel(
             tooltip=["Frequency (Hz)", "Gain (dB)"],
         )
         .properties(
-            title=f"{filter_type} - Frequency Response (Order: {filter_order})",
+            title=f"{filter_type} - Frequency Response ("
+            + (f"Taps: {numtaps})" if numtaps else f"Order: {filter_order})"),
             width=600,
             autosize=alt.AutoSizeParams(type="fit", contains="padding"),
         )
@@ -448,45 +208,66 @@ def filter_customization_panel(
     st.altair_chart(chart, use_container_width=True)
 
     # Return the necessary parameters
-    return filter_order, rp, rs
+    return filter_order, rp, rs, numtaps, fir_method
 
 
+@profiled()
+def play_preview(preview):
+    """
+    Show an audio player for an encoded preview.
+
+    Parameters:
+    - preview: Preview from previews.get_preview.
+    """
+    st.audio(preview.data, format=preview.mime)
+    if preview.truncated:
+        st.caption("The preview is cut at the selected length.")
+
+
+@profiled()
 def plot_time_domain(
     noisy_audio,
     cleaned_audio=None,
     sr=44100,
     noisy="Noisy",
     cleaned="Cleaned",
-    max_points=5000,
+    max_points=None,
 ):
     """
     Plot the time-domain signal of noisy and cleaned audio data.
 
+    Each signal is drawn as a min/max band read from its cached waveform pyramid,
+    so peaks stay visible while the number of plotted points stays fixed.
+
     Parameters:
-    - noisy_audio: Noisy audio signal.
-    - cleaned_audio: Cleaned audio signal (optional).
+    - noisy_audio: Noisy audio signal (SignalHandle).
+    - cleaned_audio: Cleaned audio signal (SignalHandle, optional).
     - sr: Sampling rate.
     - noisy: Label for noisy audio.
     - cleaned: Label for cleaned audio.
-    - max_points: Maximum number of points to plot.
+    - max_points: Maximum number of points to plot (defaults to the chart point budget).
     """
-    time = np.linspace(0, len(noisy_audio) / sr, len(noisy_audio))
-    step = max(1, len(noisy_audio) // max_points)
-    time_downsampled = time[::step]
-    noisy_downsampled = noisy_audio[::step]
+    # Both signals share the chart's point budget
+    n_signals = 1 if cleaned_audio is None else 2
+    noisy_envelope = get_envelope(noisy_audio, sr, series_budget(n_signals, max_points))
 
     # Noisy audio plot only
     if cleaned_audio is None:
         df = pd.DataFrame(
-            {"Time (s)": time_downsampled, "Amplitude": noisy_downsampled}
+            {
+                "Time (s)": noisy_envelope.times,
+                "Min Amplitude": noisy_envelope.minimum,
+                "Max Amplitude": noisy_envelope.maximum,
+            }
         )
         chart = (
             alt.Chart(df)
-            .mark_line(opacity=0.5, color=tertiary_color)
+            .mark_area(opacity=0.5, color=tertiary_color)
             .encode(
                 x="Time (s)",
-                y=alt.Y("Amplitude", title="Amplitude"),
-                tooltip=["Time (s)", "Amplitude"],
+                y=alt.Y("Min Amplitude", title="Amplitude"),
+                y2="Max Amplitude",
+                tooltip=["Time (s)", "Min Amplitude", "Max Amplitude"],
             )
             .properties(
                 title="Time-Domain Signal",
@@ -498,29 +279,37 @@ def plot_time_domain(
 
     # Both noisy and cleaned audio plots
     else:
-        cleaned_downsampled = cleaned_audio[::step]
-        df = pd.DataFrame(
+        cleaned_envelope = get_envelope(cleaned_audio, sr, series_budget(2, max_points))
+        df = stacked_frame(
             {
-                "Time (s)": time_downsampled,
-                noisy: noisy_downsampled,
-                cleaned: cleaned_downsampled,
-            }
+                label: {
+                    "Time (s)": envelope.times,
+                    "Min Amplitude": envelope.minimum,
+                    "Max Amplitude": envelope.maximum,
+                }
+                for envelope, label in [
+                    (noisy_envelope, noisy),
+                    (cleaned_envelope, cleaned),
+                ]
+            },
+            "Signal",
+            max_points,
         )
-        df_melted = df.melt("Time (s)", var_name="Signal", value_name="Amplitude")
         signal_color = tertiary_color if cleaned == "Original" else primary_color
         chart = (
-            alt.Chart(df_melted)
-            .mark_line(opacity=0.5)
+            alt.Chart(df)
+            .mark_area(opacity=0.5)
             .encode(
                 x="Time (s)",
-                y=alt.Y("Amplitude", title="Amplitude"),
+                y=alt.Y("Min Amplitude", title="Amplitude"),
+                y2="Max Amplitude",
                 color=alt.Color(
                     "Signal",
                     scale=alt.Scale(
                         domain=[noisy, cleaned], range=[secondary_color, signal_color]
                     ),
                 ),
-                tooltip=["Time (s)", "Amplitude", "Signal"],
+                tooltip=["Time (s)", "Min Amplitude", "Max Amplitude", "Signal"],
             )
             .properties(
                 title="Time-Domain Signal",
@@ -533,45 +322,51 @@ def plot_time_domain(
     st.altair_chart(chart, use_container_width=True)
 
 
-@st.cache_data
+@profiled()
+@st.cache_data(hash_funcs=HASH_FUNCS)
 def plot_frequency_domain(
     noisy_audio,
     cleaned_audio=None,
     sr=44100,
     lowcut=None,
     highcut=None,
-    max_points=5000,
+    n_bins=None,
 ):
     """
     Plot the frequency-domain signal of noisy and cleaned audio data.
 
+    The spectrum is aggregated into log-spaced bins (max and mean per bin), which
+    keeps full resolution at low frequencies and a fixed number of points overall.
+
     Parameters:
-    - noisy_audio: Noisy audio signal.
-    - cleaned_audio: Cleaned audio signal (optional).
+    - noisy_audio: Noisy audio signal (SignalHandle).
+    - cleaned_audio: Cleaned audio signal (SignalHandle, optional).
     - sr: Sampling rate.
     - lowcut: Low cutoff frequency (for marking on the plot).
     - highcut: High cutoff frequency (for marking on the plot).
-    - max_points: Maximum number of points to plot.
+    - n_bins: Number of log-spaced frequency bins to plot (defaults to DEFAULT_LOG_BINS).
     """
-    noisy_fft = np.fft.fft(noisy_audio)
-    freqs = np.fft.fftfreq(len(noisy_fft), 1 / sr)
-
-    # Positive frequency components
-    positive_freqs = freqs[: len(freqs) // 2]
-    noisy_magnitude = np.abs(noisy_fft[: len(freqs) // 2])
-
-    # Downsample for plot clarity
-    step = max(1, len(positive_freqs) // max_points)
-    freqs_downsampled = positive_freqs[::step]
-    noisy_magnitude_downsampled = noisy_magnitude[::step]
+    n_bins = n_bins or DEFAULT_LOG_BINS  # Imported with the plotting stack
+
+    # Plotting columns of a binned spectrum; multichannel spectra are drawn as
+    # one band (peak over channels, mean of the channel means)
+    def binned_columns(log_spectrum):
+        maximum, mean = log_spectrum.maximum, log_spectrum.mean
+        if maximum.ndim > 1:
+            maximum, mean = maximum.max(axis=0), mean.mean(axis=0)
+        return {
+            "Frequency (Hz)": log_spectrum.freqs,
+            "Magnitude": maximum,
+            "Mean Magnitude": mean,
+        }
+
+    # Log-binned positive frequency components from the shared spectrum cache
+    noisy_spectrum = get_log_spectrum(noisy_audio, sr, n_bins)
 
     # Plot only noisy signal
     if cleaned_audio is None:
-        df = pd.DataFrame(
-            {
-                "Frequency (Hz)": freqs_downsampled,
-                "Magnitude": noisy_magnitude_downsampled,
-            }
+        df = stacked_frame(
+            {"Noisy Magnitude": binned_columns(noisy_spectrum)}, "Signal"
         )
         chart = (
             alt.Chart(df)
@@ -584,7 +379,7 @@ def plot_frequency_domain(
                 ),
                 y=alt.Y("Magnitude", title="Magnitude"),
                 color=alt.value(tertiary_color),
-                tooltip=["Frequency (Hz)", "Magnitude"],
+                tooltip=["Frequency (Hz)", "Magnitude", "Mean Magnitude"],
             )
             .properties(title="Frequency-Domain Magnitude Spectrum", width=500)
             .interactive()
@@ -592,19 +387,16 @@ def plot_frequency_domain(
 
     # Plot both noisy and cleaned signals
     else:
-        cleaned_fft = np.fft.fft(cleaned_audio)
-        cleaned_magnitude = np.abs(cleaned_fft[: len(freqs) // 2])
-        cleaned_magnitude_downsampled = cleaned_magnitude[::step]
-        df = pd.DataFrame(
+        cleaned_spectrum = get_log_spectrum(cleaned_audio, sr, n_bins)
+        df = stacked_frame(
             {
-                "Frequency (Hz)": freqs_downsampled,
-                "Noisy Magnitude": noisy_magnitude_downsampled,
-                "Cleaned Magnitude": cleaned_magnitude_downsampled,
-            }
+                "Noisy Magnitude": binned_columns(noisy_spectrum),
+                "Cleaned Magnitude": binned_columns(cleaned_spectrum),
+            },
+            "Signal",
         )
-        df_melted = df.melt("Frequency (Hz)", var_name="Signal", value_name="Magnitude")
         chart = (
-            alt.Chart(df_melted)
+            alt.Chart(df)
             .mark_area(opacity=0.5)
             .encode(
                 x=alt.X(
@@ -620,7 +412,7 @@ def plot_frequency_domain(
                         range=[secondary_color, primary_color],
                     ),
                 ),
-                tooltip=["Frequency (Hz)", "Magnitude", "Signal"],
+                tooltip=["Frequency (Hz)", "Magnitude", "Mean Magnitude", "Signal"],
             )
             .properties(title="Frequency-Domain Magnitude Spectrum", width=500)
             .interactive()
@@ -661,8 +453,18 @@ def plot_frequency_domain(
     st.altair_chart(chart, use_container_width=True)
 
 
+@profiled()
 @st.cache_data
-def plot_filter_response(lowcut, highcut, sr, filter_type=None, filters=None, order=5):
+def plot_filter_response(
+    lowcut,
+    highcut,
+    sr,
+    filter_type=None,
+    filters=None,
+    order=5,
+    numtaps=None,
+    zero_phase=False,
+):
     """
     Plot the frequency response for multiple filters, allowing for comparison of different filter types.
 
@@ -673,61 +475,41 @@ def plot_filter_response(lowcut, highcut, sr, filter_type=None, filters=None, or
     - filter_type: Single filter type to plot if filters list is not provided.
     - filters: List of filter types to plot if multiple filters are to be compared.
     - order: Filter order (applicable to IIR filters).
+    - numtaps: Number of taps (applicable to the FIR filter).
+    - zero_phase: Show the effective response of forward-backward filtering.
 
     Returns:
     - None: Displays an interactive Altair plot of the frequency responses.
     """
 
-    # Function to compute the frequency response of the selected filter
-    def get_filter_response(filter_type, lowcut, highcut, sr, order):
-        if filter_type == "Butterworth Band-pass":
-            b, a = butter_bandpass(lowcut, highcut, sr, order)
-        elif filter_type == "FIR Band-pass":
-            taps = fir_bandpass(lowcut, highcut, sr)
-            b, a = taps, 1.0
-        elif filter_type == "IIR Band-pass":
-            b, a = iir_bandpass(lowcut, highcut, sr, order)
-        elif filter_type == "Chebyshev Type I Band-pass":
-            b, a = cheby1_bandpass(lowcut, highcut, sr, order)
-        elif filter_type == "Chebyshev Type II Band-pass":
-            b, a = cheby2_bandpass(lowcut, highcut, sr, order)
-        elif filter_type == "Elliptic Band-pass":
-            b, a = ellip_bandpass(lowcut, highcut, sr, order)
-        elif filter_type == "Bessel Band-pass":
-            b, a = bessel_bandpass(lowcut, highcut, sr, order)
-        # Calculate the frequency response (w = frequencies, h = frequency response values)
-        return freqz(b, a, worN=2000)
-
-    # If no list of filters is provided, use the single filter type
-    if filters is None:
-        filters = [filter_type]
-
-    combined_df = pd.DataFrame()  # DataFrame to store all the filter responses
+    # If no list of filters is provided, use the single filter type (non-linear
+    # types have no fixed response and are left out)
+    filters = response_filters(filter_type, filters)
+    if not filters:
+        return
 
-    # Loop over each filter type in the list and compute its frequency response
-    for filt in filters:
-        w, h = get_filter_response(filt, lowcut, highcut, sr, order)
-        # Create a DataFrame to store frequency and gain for the current filter
-        df = pd.DataFrame(
-            {"Frequency (Hz)": (sr * 0.5 / np.pi) * w, "Gain": abs(h), "Filter": filt}
-        )
-        # Append the current filter's response to the combined DataFrame
-        combined_df = pd.concat([combined_df, df])
+    # Frequency and gain of every filter, sliced from the shared analysis table
+    analysis = analyze_filters(
+        filters, lowcut, highcut, sr, order, numtaps=numtaps, zero_phase=zero_phase
+    )
+    x, curves = analysis_series(analysis, "Gain")
+    combined_df = wide_frame("Frequency (Hz)", x, curves)
 
     # Plot the frequency response using Altair
     chart = (
         alt.Chart(combined_df)
+        .transform_fold(list(curves), as_=["Filter", "Gain"])  # One line per filter
         .mark_line(opacity=0.5)  # Set opacity for the lines
         .encode(
             x=alt.X(
                 "Frequency (Hz)", scale=alt.Scale(domain=(0, sr / 2))
             ),  # X-axis represents frequency
-            y=alt.Y("Gain", title="Gain"),  # Y-axis represents gain
-            color="Filter",  # Color by filter type
+            y=alt.Y("Gain:Q", title="Gain"),  # Y-axis represents gain
+            color="Filter:N",  # Color by filter type
             tooltip=[
                 "Frequency (Hz)",
-                "Gain",
-                "Filter",
+                "Gain:Q",
+                "Filter:N",
             ],  # Show tooltips for data points
         )
         .properties(
@@ -744,28 +526,27 @@ def plot_filter_response(lowcut, highcut, sr, filter_type=None, filters=None, or
     st.altair_chart(chart, use_container_width=True)
 
 
-@st.cache_data
+@profiled()
+@st.cache_data(hash_funcs=HASH_FUNCS)
 def plot_spectral_centroid(audio_data, sr):
     """
     Plot the spectral centroid over time, which indicates the 'center of mass' of the spectrum.
 
     Parameters:
-    - audio_data: Input audio signal.
+    - audio_data: Input audio signal (SignalHandle).
     - sr: Sampling rate.
 
     Returns:
     - None: Displays an interactive Altair plot of the spectral centroid.
     """
 
-    # Compute the spectral centroid of the audio signal
-    spectral_centroid = librosa.feature.spectral_centroid(y=audio_data, sr=sr)[0]
+    # Spectral centroid and frame times from the shared feature extractor
+    features = get_features(audio_data, sr)
+    spectral_centroid = features.centroid
+    t = features.times
 
-    # Convert the frames to time for plotting
-    frames = range(len(spectral_centroid))
-    t = librosa.frames_to_time(frames)
-
-    # Prepare the data for plotting
-    df = pd.DataFrame({"Time (s)": t, "Spectral Centroid (Hz)": spectral_centroid})
+    # Prepare the data for plotting (one line per channel)
+    df = channel_frame({"Time (s)": t}, {"Spectral Centroid (Hz)": spectral_centroid})
 
     # Create an Altair line chart to plot the spectral centroid over time
     chart = (
@@ -776,7 +557,12 @@ def plot_spectral_centroid(audio_data, sr):
             y=alt.Y(
                 "Spectral Centroid (Hz)", title="Spectral Centroid (Hz)"
             ),  # Y-axis represents spectral centroid
-            tooltip=["Time (s)", "Spectral Centroid (Hz)"],  # Tooltips for the plot
+            detail="Channel:N",  # Separate line per channel
+            tooltip=[
+                "Time (s)",
+                "Spectral Centroid (Hz)",
+                "Channel",
+            ],  # Tooltips for the plot
         )
         .properties(
             title="Spectral Centroid Over Time",  # Title of the plot
@@ -792,8 +578,18 @@ def plot_spectral_centroid(audio_data, sr):
     st.altair_chart(chart, use_container_width=True)
 
 
+@profiled()
 @st.cache_data
-def plot_phase_response(lowcut, highcut, sr, filter_type=None, filters=None, order=5):
+def plot_phase_response(
+    lowcut,
+    highcut,
+    sr,
+    filter_type=None,
+    filters=None,
+    order=5,
+    numtaps=None,
+    zero_phase=False,
+):
     """
     Plot the phase response for multiple filters, allowing for comparison of different filter types.
 
@@ -804,65 +600,45 @@ def plot_phase_response(lowcut, highcut, sr, filter_type=None, filters=None, ord
     - filter_type: Single filter type to plot if filters list is not provided.
     - filters: List of filter types to plot if multiple filters are to be compared.
     - order: Filter order (applicable to IIR filters).
+    - numtaps: Number of taps (applicable to the FIR filter).
+    - zero_phase: Show the effective response of forward-backward filtering.
 
     Returns:
     - None: Displays an interactive Altair plot of the phase responses.
     """
 
-    # Function to compute the phase response of the selected filter
-    def get_phase_response(filter_type, lowcut, highcut, sr, order):
-        if filter_type == "Butterworth Band-pass":
-            b, a = butter_bandpass(lowcut, highcut, sr, order)
-        elif filter_type == "FIR Band-pass":
-            taps = fir_bandpass(lowcut, highcut, sr)
-            b, a = taps, 1.0
-        elif filter_type == "IIR Band-pass":
-            b, a = iir_bandpass(lowcut, highcut, sr, order)
-        elif filter_type == "Chebyshev Type I Band-pass":
-            b, a = cheby1_bandpass(lowcut, highcut, sr, order)
-        elif filter_type == "Chebyshev Type II Band-pass":
-            b, a = cheby2_bandpass(lowcut, highcut, sr, order)
-        elif filter_type == "Elliptic Band-pass":
-            b, a = ellip_bandpass(lowcut, highcut, sr, order)
-        elif filter_type == "Bessel Band-pass":
-            b, a = bessel_bandpass(lowcut, highcut, sr, order)
-        w, h = freqz(b, a, worN=2000)  # Get frequency and phase response
-        return w, np.angle(h)  # Return the frequencies and phase values
-
-    # If no list of filters is provided, use the single filter type
-    if filters is None:
-        filters = [filter_type]
-
-    combined_df = pd.DataFrame()  # DataFrame to store phase responses for all filters
+    # If no list of filters is provided, use the single filter type (non-linear
+    # types have no fixed response and are left out)
+    filters = response_filters(filter_type, filters)
+    if not filters:
+        return
 
-    # Loop over each filter type and compute its phase response
-    for filt in filters:
-        w, phase = get_phase_response(filt, lowcut, highcut, sr, order)
-        df = pd.DataFrame(
-            {
-                "Frequency (Hz)": (sr * 0.5 / np.pi) * w,  # Convert to Hz
-                "Phase (radians)": phase,  # Phase values in radians
-                "Filter": filt,  # Filter type
-            }
-        )
-        combined_df = pd.concat([combined_df, df])
+    # Phase of every filter, sliced from the shared analysis table
+    analysis = analyze_filters(
+        filters, lowcut, highcut, sr, order, numtaps=numtaps, zero_phase=zero_phase
+    )
+    x, curves = analysis_series(analysis, "Phase")
+    combined_df = wide_frame("Frequency (Hz)", x, curves)
 
     # Plot the phase response using Altair
     chart = (
         alt.Chart(combined_df)
+        .transform_fold(
+            list(curves), as_=["Filter", "Phase (radians)"]
+        )  # One line per filter
         .mark_line(opacity=0.5)  # Set line opacity
         .encode(
             x=alt.X(
                 "Frequency (Hz)", scale=alt.Scale(domain=(0, sr / 2))
             ),  # X-axis represents frequency
             y=alt.Y(
-                "Phase (radians)", title="Phase (radians)"
+                "Phase (radians):Q", title="Phase (radians)"
             ),  # Y-axis represents phase
-            color="Filter",  # Color by filter type
+            color="Filter:N",  # Color by filter type
             tooltip=[
                 "Frequency (Hz)",
-                "Phase (radians)",
-                "Filter",
+                "Phase (radians):Q",
+                "Filter:N",
             ],  # Tooltip for interactive plot
         )
         .properties(
@@ -879,8 +655,18 @@ def plot_phase_response(lowcut, highcut, sr, filter_type=None, filters=None, ord
     st.altair_chart(chart, use_container_width=True)
 
 
+@profiled()
 @st.cache_data
-def plot_group_delay(lowcut, highcut, sr, filter_type=None, filters=None, order=5):
+def plot_group_delay(
+    lowcut,
+    highcut,
+    sr,
+    filter_type=None,
+    filters=None,
+    order=5,
+    numtaps=None,
+    zero_phase=False,
+):
     """
     Plot the group delay for multiple filters, allowing for comparison of different filter types.
 
@@ -891,69 +677,45 @@ def plot_group_delay(lowcut, highcut, sr, filter_type=None, filters=None, order=
     - filter_type: Single filter type to plot if filters list is not provided.
     - filters: List of filter types to plot if multiple filters are to be compared.
     - order: Filter order (applicable to IIR filters).
+    - numtaps: Number of taps (applicable to the FIR filter).
+    - zero_phase: Show the effective response of forward-backward filtering.
 
     Returns:
     - None: Displays an interactive Altair plot of the group delays.
     """
 
-    # Function to compute the group delay of the selected filter
-    def get_group_delay(filter_type, lowcut, highcut, sr, order):
-        if filter_type == "Butterworth Band-pass":
-            b, a = butter_bandpass(lowcut, highcut, sr, order)
-        elif filter_type == "FIR Band-pass":
-            taps = fir_bandpass(lowcut, highcut, sr)
-            b, a = taps, 1.0
-        elif filter_type == "IIR Band-pass":
-            b, a = iir_bandpass(lowcut, highcut, sr, order)
-        elif filter_type == "Chebyshev Type I Band-pass":
-            b, a = cheby1_bandpass(lowcut, highcut, sr, order)
-        elif filter_type == "Chebyshev Type II Band-pass":
-            b, a = cheby2_bandpass(lowcut, highcut, sr, order)
-        elif filter_type == "Elliptic Band-pass":
-            b, a = ellip_bandpass(lowcut, highcut, sr, order)
-        elif filter_type == "Bessel Band-pass":
-            b, a = bessel_bandpass(lowcut, highcut, sr, order)
-        w, h = freqz(b, a, worN=2000)  # Get the frequency and phase response
-        unwrapped_phase = np.unwrap(
-            np.angle(h)
-        )  # Unwrap phase to avoid discontinuities
-        group_delay = -np.diff(unwrapped_phase) / np.diff(w)  # Calculate group delay
-        return w[1:], group_delay  # Ignore the first frequency bin
-
-    # If no list of filters is provided, use the single filter type
-    if filters is None:
-        filters = [filter_type]
-
-    combined_df = pd.DataFrame()  # DataFrame to store group delays for all filters
+    # If no list of filters is provided, use the single filter type (non-linear
+    # types have no fixed response and are left out)
+    filters = response_filters(filter_type, filters)
+    if not filters:
+        return
 
-    # Loop over each filter type and compute its group delay
-    for filt in filters:
-        w, group_delay = get_group_delay(filt, lowcut, highcut, sr, order)
-        df = pd.DataFrame(
-            {
-                "Frequency (Hz)": (sr * 0.5 / np.pi) * w,  # Convert to Hz
-                "Group Delay (samples)": group_delay,  # Group delay values in samples
-                "Filter": filt,  # Filter type
-            }
-        )
-        combined_df = pd.concat([combined_df, df])
+    # Group delay of every filter, sliced from the shared analysis table
+    analysis = analyze_filters(
+        filters, lowcut, highcut, sr, order, numtaps=numtaps, zero_phase=zero_phase
+    )
+    x, curves = analysis_series(analysis, "Group Delay")
+    combined_df = wide_frame("Frequency (Hz)", x, curves)
 
     # Plot the group delay using Altair
     chart = (
         alt.Chart(combined_df)
+        .transform_fold(
+            list(curves), as_=["Filter", "Group Delay (samples)"]
+        )  # One line per filter
         .mark_line(opacity=0.5)  # Set line opacity
         .encode(
             x=alt.X(
                 "Frequency (Hz)", scale=alt.Scale(domain=(0, sr / 2))
             ),  # X-axis represents frequency
             y=alt.Y(
-                "Group Delay (samples)", title="Group Delay (samples)"
+                "Group Delay (samples):Q", title="Group Delay (samples)"
             ),  # Y-axis represents group delay
-            color="Filter",  # Color by filter type
+            color="Filter:N",  # Color by filter type
             tooltip=[
                 "Frequency (Hz)",
-                "Group Delay (samples)",
-                "Filter",
+                "Group Delay (samples):Q",
+                "Filter:N",
             ],  # Tooltip for interactive plot
         )
         .properties(
@@ -970,78 +732,24 @@ def plot_group_delay(lowcut, highcut, sr, filter_type=None, filters=None, order=
     st.altair_chart(chart, use_container_width=True)
 
 
+@profiled()
 @st.cache_data
-def calculate_snr(original_audio, cleaned_audio):
-    """
-    Calculate the Signal-to-Noise Ratio (SNR) between the original and cleaned audio.
-
-    Parameters:
-    - original_audio: Original audio signal.
-    - cleaned_audio: Cleaned audio signal after noise cancellation.
-
-    Returns:
-    - snr: Calculated SNR in decibels (dB).
-    """
-
-    # Ensure both arrays are of float64 type to avoid overflow issues
-    original_audio = original_audio.astype(np.float64)
-    cleaned_audio = cleaned_audio.astype(np.float64)
-
-    # Clip extreme differences to prevent overflow during squaring
-    diff = np.clip(original_audio - cleaned_audio, -1e6, 1e6)
-
-    # Calculate the power of the original and noise signals
-    signal_power = np.mean(np.square(original_audio))  # Power of the original signal
-    noise_power = np.mean(np.square(diff))  # Power of the noise signal
-
-    # Avoid divide-by-zero errors
-    if noise_power == 0:
-        return np.inf  # Infinite SNR if there's no noise
-
-    # Calculate SNR in decibels (dB)
-    snr = 10 * np.log10(signal_power / noise_power)
-    return snr
-
-
-@st.cache_data
-def plot_snr_vs_frequency(original_audio, cleaned_audio, sr, max_points=5000):
+def plot_snr_vs_frequency(binned, sr):
     """
     Plot the Signal-to-Noise Ratio (SNR) across the frequency spectrum.
 
     Parameters:
-    - original_audio: Original audio signal.
-    - cleaned_audio: Cleaned audio signal after noise cancellation.
+    - binned: SNR per log-spaced frequency bin (LogSpectrum from analysis.snr_spectrum).
     - sr: Sampling rate.
-    - max_points: Maximum number of points to plot.
 
     Returns:
     - None: Displays an interactive Altair plot of the SNR across frequency.
     """
 
-    # Perform FFT on the original and cleaned audio signals
-    original_fft = np.fft.fft(original_audio)
-    cleaned_fft = np.fft.fft(cleaned_audio)
-    freqs = np.fft.fftfreq(len(original_fft), 1 / sr)  # Get the frequencies
-
-    # Extract positive frequencies and their magnitudes
-    positive_freqs = freqs[: len(freqs) // 2]
-    original_magnitude = np.abs(original_fft[: len(freqs) // 2])
-    cleaned_magnitude = np.abs(cleaned_fft[: len(freqs) // 2])
-
-    # Calculate the SNR in the frequency domain
-    snr_values = 10 * np.log10(
-        (original_magnitude**2)
-        / (np.abs(original_magnitude - cleaned_magnitude) ** 2 + 1e-10)
-    )
-
-    # Downsample the data for better plotting performance
-    step = max(1, len(positive_freqs) // max_points)
-    freqs_downsampled = positive_freqs[::step]
-    snr_downsampled = snr_values[::step]
-
-    # Prepare the data for plotting
-    df = pd.DataFrame(
-        {"Frequency (Hz)": freqs_downsampled, "SNR (dB)": snr_downsampled}
+    # Prepare the data for plotting (one line per channel)
+    df = channel_frame(
+        {"Frequency (Hz)": binned.freqs},
+        {"SNR (dB)": binned.mean, "Max SNR (dB)": binned.maximum},
     )
 
     # Plot the SNR vs frequency using Altair
@@ -1057,7 +765,13 @@ def plot_snr_vs_frequency(original_audio, cleaned_audio, sr, max_points=5000):
                 title="Frequency (Hz, log scale)",
             ),
             y=alt.Y("SNR (dB)", title="SNR (dB)"),  # Y-axis represents SNR
-            tooltip=["Frequency (Hz)", "SNR (dB)"],  # Tooltip for interactive plot
+            detail="Channel:N",  # Separate line per channel
+            tooltip=[
+                "Frequency (Hz)",
+                "SNR (dB)",
+                "Max SNR (dB)",
+                "Channel",
+            ],  # Tooltip for interactive plot
         )
         .properties(title="SNR vs Frequency", width=500)  # Set plot title and width
         .interactive()  # Enable interactivity for the plot
@@ -1067,8 +781,79 @@ def plot_snr_vs_frequency(original_audio, cleaned_audio, sr, max_points=5000):
     st.altair_chart(chart, use_container_width=True)
 
 
+@profiled()
+def plot_adaptive_convergence(result, max_points=1000):
+    """
+    Plot how the adaptive tone canceller converges: the tone amplitudes its
+    weights have learned and the power of the residual signal, block by block.
+
+    Parameters:
+    - result: AdaptiveResult of the canceller's run over the noisy signal (the
+      pipeline's adaptive node), so the adaptation is not repeated.
+    - max_points: Maximum number of points per curve.
+
+    Returns:
+    - None: Displays interactive Altair plots of the convergence curves.
+    """
+    step = -(
+        -result.times.size // max_points
+    )  # Keep the curves within the point budget
+    times = result.times[::step]
+
+    # Learned amplitude of every tone (one line per tone and channel)
+    frames = [
+        channel_frame(
+            {"Time (s)": times}, {"Amplitude": result.amplitude[..., ::step, i]}
+        ).assign(Tone=f"{tone:g} Hz")
+        for i, tone in enumerate(result.tones)
+    ]
+    if frames:
+        amplitude_chart = (
+            alt.Chart(pd.concat(frames))
+            .mark_line(opacity=0.7)
+            .encode(
+                x=alt.X("Time (s)", title="Time (s)"),
+                y=alt.Y("Amplitude", title="Learned Tone Amplitude"),
+                color="Tone:N",
+                detail="Channel:N",
+                tooltip=["Time (s)", "Amplitude", "Tone", "Channel"],
+            )
+            .properties(title="Adaptive Canceller Convergence", width=500)
+            .interactive()
+        )
+        st.altair_chart(amplitude_chart, use_container_width=True)
+
+    # Residual power per block (the learning curve)
+    df = channel_frame(
+        {"Time (s)": times}, {"Residual Power (dB)": result.error_power[..., ::step]}
+    )
+    error_chart = (
+        alt.Chart(df)
+        .mark_line(opacity=0.7, color=tertiary_color)
+        .encode(
+            x=alt.X("Time (s)", title="Time (s)"),
+            y=alt.Y("Residual Power (dB)", title="Residual Power (dB)"),
+            detail="Channel:N",
+            tooltip=["Time (s)", "Residual Power (dB)", "Channel"],
+        )
+        .properties(title="Adaptive Canceller Learning Curve", width=500)
+        .interactive()
+    )
+    st.altair_chart(error_chart, use_container_width=True)
+
+
+@profiled()
 @st.cache_data
-def plot_impulse_response(lowcut, highcut, sr, filter_type=None, filters=None, order=5):
+def plot_impulse_response(
+    lowcut,
+    highcut,
+    sr,
+    filter_type=None,
+    filters=None,
+    order=5,
+    numtaps=None,
+    zero_phase=False,
+):
     """
     Plot the impulse response for multiple filters, allowing for comparison of different filter types.
 
@@ -1079,50 +864,43 @@ def plot_impulse_response(lowcut, highcut, sr, filter_type=None, filters=None, o
     - filter_type: Single filter type to plot if filters list is not provided.
     - filters: List of filter types to plot if multiple filters are to be compared.
     - order: Filter order (applicable to IIR filters).
+    - numtaps: Number of taps (applicable to the FIR filter).
+    - zero_phase: Show the effective response of forward-backward filtering.
 
     Returns:
     - None: Displays an interactive Altair plot of the impulse responses.
     """
 
-    # Function to compute the filtered impulse response of the selected filter
-    def get_filtered_impulse(filter_type, lowcut, highcut, sr, order):
-        impulse = np.zeros(100)  # Create an impulse signal
-        impulse[0] = 1  # Set the first sample to 1 (impulse)
-        return apply_filter(impulse, lowcut, highcut, sr, filter_type, order)
+    # If no list of filters is provided, use the single filter type (non-linear
+    # types have no fixed response and are left out)
+    filters = response_filters(filter_type, filters)
+    if not filters:
+        return
 
-    # If no list of filters is provided, use the single filter type
-    if filters is None:
-        filters = [filter_type]
-
-    combined_df = pd.DataFrame()  # DataFrame to store impulse responses for all filters
-    time = np.arange(0, 100) / sr  # Generate time values for the impulse response
-
-    # Loop over each filter type and compute its impulse response
-    for filt in filters:
-        filtered_impulse = get_filtered_impulse(filt, lowcut, highcut, sr, order)
-        df = pd.DataFrame(
-            {
-                "Time (s)": time,  # Time axis
-                "Filtered Impulse Response": filtered_impulse,  # Amplitude of the impulse response
-                "Filter": filt,  # Filter type
-            }
-        )
-        combined_df = pd.concat([combined_df, df])
+    # Impulse response of every filter, sliced from the shared analysis table
+    analysis = analyze_filters(
+        filters, lowcut, highcut, sr, order, numtaps=numtaps, zero_phase=zero_phase
+    )
+    x, curves = analysis_series(analysis, "Impulse")
+    combined_df = wide_frame("Time (s)", x, curves)
 
     # Plot the impulse response using Altair
     chart = (
         alt.Chart(combined_df)
+        .transform_fold(
+            list(curves), as_=["Filter", "Filtered Impulse Response"]
+        )  # One line per filter
         .mark_line(opacity=0.5)  # Set line opacity
         .encode(
             x=alt.X("Time (s)", title="Time (s)"),  # X-axis represents time
             y=alt.Y(
-                "Filtered Impulse Response", title="Amplitude"
+                "Filtered Impulse Response:Q", title="Amplitude"
             ),  # Y-axis represents amplitude
-            color="Filter",  # Color by filter type
+            color="Filter:N",  # Color by filter type
             tooltip=[
                 "Time (s)",
-                "Filtered Impulse Response",
-                "Filter",
+                "Filtered Impulse Response:Q",
+                "Filter:N",
             ],  # Tooltip for interactive plot
         )
         .properties(title="Impulse Response", width=500)  # Set plot title and width
@@ -1133,8 +911,18 @@ def plot_impulse_response(lowcut, highcut, sr, filter_type=None, filters=None, o
     st.altair_chart(chart, use_container_width=True)
 
 
+@profiled()
 @st.cache_data
-def plot_step_response(lowcut, highcut, sr, filter_type=None, filters=None, order=5):
+def plot_step_response(
+    lowcut,
+    highcut,
+    sr,
+    filter_type=None,
+    filters=None,
+    order=5,
+    numtaps=None,
+    zero_phase=False,
+):
     """
     Plot the step response for multiple filters, allowing for comparison of different filter types.
 
@@ -1145,45 +933,43 @@ def plot_step_response(lowcut, highcut, sr, filter_type=None, filters=None, orde
     - filter_type: Single filter type to plot if filters list is not provided.
     - filters: List of filter types to plot if multiple filters are to be compared.
     - order: Filter order (applicable to IIR filters).
+    - numtaps: Number of taps (applicable to the FIR filter).
+    - zero_phase: Show the effective response of forward-backward filtering.
 
     Returns:
     - None: Displays an interactive Altair plot of the step responses.
     """
 
-    # Function to compute the filtered step response of the selected filter
-    def get_filtered_step(filter_type, lowcut, highcut, sr, order):
-        step_signal = np.ones(100)  # Create a step signal (all ones)
-        return apply_filter(step_signal, lowcut, highcut, sr, filter_type, order)
-
-    # If no list of filters is provided, use the single filter type
-    if filters is None:
-        filters = [filter_type]
+    # If no list of filters is provided, use the single filter type (non-linear
+    # types have no fixed response and are left out)
+    filters = response_filters(filter_type, filters)
+    if not filters:
+        return
 
-    combined_df = pd.DataFrame()  # DataFrame to store step responses for all filters
-    time = np.arange(0, 100) / sr  # Generate time values for the step response
-
-    # Loop over each filter type and compute its step response
-    for filt in filters:
-        filtered_step = get_filtered_step(filt, lowcut, highcut, sr, order)
-        df = pd.DataFrame(
-            {"Time (s)": time, "Filtered Step Response": filtered_step, "Filter": filt}
-        )
-        combined_df = pd.concat([combined_df, df])
+    # Step response of every filter, sliced from the shared analysis table
+    analysis = analyze_filters(
+        filters, lowcut, highcut, sr, order, numtaps=numtaps, zero_phase=zero_phase
+    )
+    x, curves = analysis_series(analysis, "Step")
+    combined_df = wide_frame("Time (s)", x, curves)
 
     # Plot the step response using Altair
     chart = (
         alt.Chart(combined_df)
+        .transform_fold(
+            list(curves), as_=["Filter", "Filtered Step Response"]
+        )  # One line per filter
         .mark_line(opacity=0.5)  # Set line opacity
         .encode(
             x=alt.X("Time (s)", title="Time (s)"),  # X-axis represents time
             y=alt.Y(
-                "Filtered Step Response", title="Amplitude"
+                "Filtered Step Response:Q", title="Amplitude"
             ),  # Y-axis represents amplitude
-            color="Filter",  # Color by filter type
+            color="Filter:N",  # Color by filter type
             tooltip=[
                 "Time (s)",
-                "Filtered Step Response",
-                "Filter",
+                "Filtered Step Response:Q",
+                "Filter:N",
             ],  # Tooltip for interactive plot
         )
         .properties(title="Step Response", width=500)  # Set plot title and width
@@ -1194,48 +980,60 @@ def plot_step_response(lowcut, highcut, sr, filter_type=None, filters=None, orde
     st.altair_chart(chart, use_container_width=True)
 
 
-@st.cache_data
+@profiled()
+@st.cache_data(hash_funcs=HASH_FUNCS)
 def plot_time_domain_comparison(
-    audio_data, lowcut, highcut, sr, filters, order=5, max_points=5000
+    audio_data, lowcut, highcut, sr, filters, order=5, zero_phase=False, max_points=None
 ):
     """
-    Plot the time-domain comparison of multiple filtered signals with downsampling to avoid large data sizes.
+    Plot the time-domain comparison of multiple filtered signals as min/max envelopes to avoid large data sizes.
 
     Parameters:
-    - audio_data: Input audio signal.
+    - audio_data: Input audio signal (SignalHandle).
     - lowcut: Low cutoff frequency.
     - highcut: High cutoff frequency.
     - sr: Sampling rate.
     - filters: List of filter types to compare.
     - order: Filter order (applicable to IIR filters).
-    - max_points: Maximum number of points to plot (downsampling to prevent large data).
+    - zero_phase: Filter forward and backward (no phase distortion).
+    - max_points: Maximum number of points of the chart, shared by all filters
+      (defaults to the chart point budget).
     """
-    time = np.linspace(0, len(audio_data) / sr, len(audio_data))
-
-    # Downsample the time-domain signal to reduce data size
-    step = max(1, len(audio_data) // max_points)
-    time_downsampled = time[::step]
-
-    combined_df = pd.DataFrame({"Time (s)": time_downsampled})
-
-    # Loop through each filter type and apply the filter
-    for filt in filters:
-        filtered_signal = apply_filter(audio_data, lowcut, highcut, sr, filt, order)
-        filtered_downsampled = filtered_signal[::step]
-        combined_df[filt] = filtered_downsampled
-
-    # Melt the DataFrame for plotting
-    df_melted = combined_df.melt("Time (s)", var_name="Filter", value_name="Amplitude")
+    # Run the filters concurrently and reduce every output to a peak-preserving
+    # min/max envelope with its share of the chart's point budget
+    envelopes = compare_filters(
+        audio_data,
+        sr,
+        lowcut,
+        highcut,
+        filters,
+        order,
+        zero_phase,
+        series_budget(len(filters), max_points),
+    )
+    combined_df = stacked_frame(
+        {
+            filt: {
+                "Time (s)": envelope.times,
+                "Min Amplitude": envelope.minimum,
+                "Max Amplitude": envelope.maximum,
+            }
+            for filt, envelope in envelopes.items()
+        },
+        "Filter",
+        max_points,
+    )
 
-    # Create an Altair line chart to plot the time-domain comparison
+    # Create an Altair band chart to plot the time-domain comparison
     chart = (
-        alt.Chart(df_melted)
-        .mark_line(opacity=0.5)
+        alt.Chart(combined_df)
+        .mark_area(opacity=0.3)
         .encode(
             x=alt.X("Time (s)", title="Time (s)"),
-            y=alt.Y("Amplitude", title="Amplitude"),
+            y=alt.Y("Min Amplitude", title="Amplitude"),
+            y2="Max Amplitude",
             color="Filter",
-            tooltip=["Time (s)", "Amplitude", "Filter"],
+            tooltip=["Time (s)", "Min Amplitude", "Max Amplitude", "Filter"],
         )
         .properties(
             title="Time-Domain Comparison of Filters",
@@ -1248,8 +1046,11 @@ def plot_time_domain_comparison(
     st.altair_chart(chart, use_container_width=True)
 
 
+@profiled()
 @st.cache_data
-def plot_poles_zeros(filter_type, lowcut, highcut, sr, order=5):
+def plot_poles_zeros(
+    filter_type, lowcut, highcut, sr, order=5, numtaps=None, zero_phase=False
+):
     """
     Plot the poles and zeros of the designed filter in the z-plane for filter stability analysis.
 
@@ -1259,41 +1060,45 @@ def plot_poles_zeros(filter_type, lowcut, highcut, sr, order=5):
     - highcut: High cutoff frequency.
     - sr: Sampling rate.
     - order: Filter order (for IIR filters).
+    - numtaps: Number of taps (for the FIR filter).
+    - zero_phase: Whether the response plots show forward-backward filtering
+      (the roots are those of the design either way; passing it lets this plot
+      share their analysis table).
 
     Returns:
     - None: Displays the poles and zeros plot in Streamlit.
     """
-    # Get the filter coefficients based on the filter type
-    if filter_type == "Butterworth Band-pass":
-        b, a = butter_bandpass(lowcut, highcut, sr, order)
-    elif filter_type == "FIR Band-pass":
-        b, a = fir_bandpass(lowcut, highcut, sr), 1.0
-    elif filter_type == "IIR Band-pass":
-        b, a = iir_bandpass(lowcut, highcut, sr, order)
-    elif filter_type == "Chebyshev Type I Band-pass":
-        b, a = cheby1_bandpass(lowcut, highcut, sr, order)
-    elif filter_type == "Chebyshev Type II Band-pass":
-        b, a = cheby2_bandpass(lowcut, highcut, sr, order)
-    elif filter_type == "Elliptic Band-pass":
-        b, a = ellip_bandpass(lowcut, highcut, sr, order)
-    elif filter_type == "Bessel Band-pass":
-        b, a = bessel_bandpass(lowcut, highcut, sr, order)
-
-    # Calculate poles and zeros
-    z, p, k = signal.tf2zpk(b, a)
-
-    # Convert to real and imaginary components
-    zeros_real, zeros_imag = np.real(z), np.imag(z)
-    poles_real, poles_imag = np.real(p), np.imag(p)
-
-    # Create DataFrames for poles and zeros
-    df_zeros = pd.DataFrame(
-        {"Real": zeros_real, "Imaginary": zeros_imag, "Type": "Zero"}
+    # A non-linear engine has no transfer function
+    if not filter_bank.is_linear(filter_type):
+        st.info(f"{filter_type} has no poles and zeros to plot.")
+        return
+
+    # Root-finding on a long FIR polynomial takes minutes, so skip the plot there
+    if filter_bank.is_fir(filter_type) and (numtaps or 0) > MAX_ROOT_TAPS:
+        st.info(
+            f"Poles and zeros are only plotted for FIR filters with up to "
+            f"{MAX_ROOT_TAPS} taps."
+        )
+        return
+
+    # Zeros and poles (real and imaginary parts) from the shared analysis table
+    analysis = analyze_filters(
+        [filter_type],
+        lowcut,
+        highcut,
+        sr,
+        order,
+        numtaps=numtaps,
+        zero_phase=zero_phase,
     )
-    df_poles = pd.DataFrame(
-        {"Real": poles_real, "Imaginary": poles_imag, "Type": "Pole"}
+    roots = analysis[analysis["Quantity"].isin(["Zero", "Pole"])]
+    df_combined = pd.DataFrame(
+        {
+            "Real": roots["X"].to_numpy(),
+            "Imaginary": roots["Y"].to_numpy(),
+            "Type": roots["Quantity"].astype(str).to_numpy(),
+        }
     )
-    df_combined = pd.concat([df_zeros, df_poles])
 
     # Create an Altair plot for poles and zeros
     chart = (
@@ -1339,21 +1144,131 @@ with st.container():
 # Add a gap between the title container and the first expander
 st.markdown("<div style='margin-bottom: 20px;'></div>", unsafe_allow_html=True)
 
+# Per-stage timings of this rerun, shown in the "Performance" panel
+if "profiler" not in st.session_state:
+    st.session_state.profiler = Profiler()
+profiler = st.session_state.profiler
+profiler.track_memory = st.session_state.get("profile_memory_checkbox", False)
+profiler.begin()
+activate(profiler)
+
 # 1. Upload Audio Section with improved feedback and layout
 with st.expander("1. Upload Audio", expanded=True):
     st.write("**Upload an audio file to begin.**")
     audio_file = st.file_uploader("Upload your audio file", type=["wav", "mp3"])
 
     if audio_file is not None:
+        import altair as alt
+        import pandas as pd
+        from charts import channel_frame, series_budget, stacked_frame, wide_frame
+        from comparison import MAX_ROOT_TAPS, analyze_filters, compare_filters
+        from envelope import get_envelope
+        from features import get_features
+        from filters import filter_bank
+        from pipeline import build_pipeline
+        from previews import DEFAULT_PREVIEW_FORMAT, PREVIEW_FORMATS
+        from spectrum import (
+            DEFAULT_LOG_BINS,
+            DEFAULT_NPERSEG,
+            get_log_spectrum,
+            range_samples,
+        )
+
+        all_filters = filter_bank.names
+
+        # Processing graph kept across reruns: every widget change recomputes
+        # only the steps downstream of the parameters it touches
+        if "pipeline" not in st.session_state:
+            st.session_state.pipeline = build_pipeline()
+        pipeline = st.session_state.pipeline
+        pipeline.begin()
+
         # Make the audio player as wide as in section 2 and 3
         st.audio(audio_file, format="audio/wav")
 
-        # Load the audio data
-        audio_data, sr = load_audio(audio_file)
-        st.success("**Audio loaded successfully!**")
+        # Load the audio data (WAV samples are mapped without decoding); the
+        # upload is hashed in full once per rerun (a sampled fingerprint would
+        # miss edits that keep the length), so an unchanged file is not reloaded
+        pipeline.update(
+            upload=SignalHandle(
+                np.frombuffer(audio_file.getbuffer(), np.uint8), exact=True
+            )
+        )
+        audio_signal, sr = pipeline["load"]
+        if audio_signal.ndim == 1:
+            st.success("**Audio loaded successfully!**")
+        else:
+            # Multichannel audio keeps its (channels, samples) layout throughout
+            st.success(
+                f"**Audio loaded successfully!** ({audio_signal.shape[0]} channels)"
+            )
+
+        # Encoding of the noisy and cleaned previews: compressed formats and an
+        # optional length cap or lower rate keep long recordings quick to send
+        col1, col2, col3 = st.columns(3)
+        preview_format = col1.selectbox(
+            "Preview Format",
+            list(PREVIEW_FORMATS),
+            index=list(PREVIEW_FORMATS).index(DEFAULT_PREVIEW_FORMAT),
+            key="preview_format_select",
+        )
+        preview_seconds = col2.selectbox(
+            "Preview Length",
+            [None, 30, 60, 120],
+            format_func=lambda s: "Full" if s is None else f"First {s} s",
+            key="preview_seconds_select",
+        )
+        preview_rate = col3.selectbox(
+            "Preview Sampling Rate",
+            [None, 24000, 16000],
+            format_func=lambda r: "Original" if r is None else f"{r // 1000} kHz",
+            key="preview_rate_select",
+        )
+        pipeline.update(
+            preview_format=preview_format,
+            preview_seconds=preview_seconds,
+            preview_rate=preview_rate,
+        )
+
+        # Choose how the cutoffs are estimated: one FFT of the whole signal, or
+        # averaged Welch periodograms over a selectable (e.g. noise-only) range
+        col1, col2 = st.columns(2)
+        estimator = col1.radio(
+            "Cutoff Estimator",
+            ["Full FFT", "Welch (averaged)"],
+            horizontal=True,
+            help="Welch averages many short spectra, which gives steadier "
+            "suggestions and can be limited to a time range.",
+            key="estimator_radio",
+        )
+        duration = audio_signal.shape[-1] / sr
+        analysis_range = (0.0, duration)
+        if estimator == "Welch (averaged)":
+            analysis_range = col2.slider(
+                "Analysis Range (s)",
+                0.0,
+                duration,
+                (0.0, duration),
+                key="analysis_range_slider",
+            )
+            # A range shorter than one Welch segment has no complete segment
+            # to average, so fall back to the whole signal
+            n_samples = audio_signal.shape[-1]
+            first, last = range_samples(n_samples, sr, *analysis_range)
+            min_samples = max(min(DEFAULT_NPERSEG, n_samples), 1)
+            if last - first < min_samples:
+                st.warning(
+                    f"The analysis range must span at least {min_samples / sr:.3f} s "
+                    "(one Welch segment); analysing the whole signal instead."
+                )
+                analysis_range = (0.0, duration)
+        pipeline.update(
+            estimator="welch" if estimator == "Welch (averaged)" else "fft",
+            analysis_range=tuple(analysis_range),
+        )
 
         # Automatically suggest bandpass filter cutoff frequencies
-        lowcut_suggested, highcut_suggested = suggest_bandpass_values(audio_data, sr)
+        lowcut_suggested, highcut_suggested = pipeline["suggestion"]
 
         # Push high cutoff to the far right using 3 columns with a uniform gap
         col1, col2, col3, col4, col5 = st.columns([0.5, 1, 1, 1, 0.5])
@@ -1361,8 +1276,8 @@ with st.expander("1. Upload Audio", expanded=True):
         col4.metric("Suggested High Cutoff", f"{highcut_suggested} Hz")
 
         # Display time-domain and frequency-domain analyses of the original audio
-        plot_time_domain(audio_data, None, sr)  # Time-domain representation
-        plot_frequency_domain(audio_data, None, sr)  # Frequency-domain representation
+        plot_time_domain(audio_signal, None, sr)  # Time-domain representation
+        plot_frequency_domain(audio_signal, None, sr)  # Frequency-domain representation
 
 # 2. Add Noise Section with refined controls
 if audio_file is not None:
@@ -1380,50 +1295,34 @@ if audio_file is not None:
             noise_level = st.slider("Select Noise Level", 0.0, 1.0, 0.05)
 
             # Generate and add noise based on user selection
-            duration = len(audio_data) / sr
-            time = np.linspace(0.0, duration, len(audio_data))
-            low_freq_noise = (
-                np.sin(2 * np.pi * 50 * time)
-                if noise_type in ["Low Frequency", "Both"]
-                else np.zeros_like(audio_data)
-            )
-            high_freq_noise = (
-                np.sin(2 * np.pi * 8000 * time)
-                if noise_type in ["High Frequency", "Both"]
-                else np.zeros_like(audio_data)
+            pipeline.update(
+                add_noise=True, noise_type=noise_type, noise_level=noise_level
             )
-            noise = noise_level * (low_freq_noise + high_freq_noise)
-
-            noisy_audio = audio_data + noise
+            noisy_signal = pipeline["noise"]
 
             # Play the noisy audio for preview
-            noisy_audio_buffer = io.BytesIO()
-            sf.write(noisy_audio_buffer, noisy_audio, sr, format="WAV")
-            noisy_audio_buffer.seek(0)
-
             st.success("Noise added successfully!")
-            st.audio(noisy_audio_buffer, format="audio/wav")
+            play_preview(pipeline["noisy_preview"])
 
             # Plot noisy vs original audio
             st.subheader("Noisy Audio Analysis")
             plot_time_domain(
-                noisy_audio, audio_data, sr, noisy="Noisy", cleaned="Original"
+                noisy_signal, audio_signal, sr, noisy="Noisy", cleaned="Original"
             )
-            plot_frequency_domain(noisy_audio, None, sr)
+            plot_frequency_domain(noisy_signal, None, sr)
 
             # Display suggested cutoff frequencies for noisy audio
-            lowcut_suggested, highcut_suggested = suggest_bandpass_values(
-                noisy_audio, sr
-            )
+            lowcut_suggested, highcut_suggested = pipeline["noisy_suggestion"]
             # Push high cutoff to the far right using 3 columns with a uniform gap
             col1, col2, col3, col4, col5 = st.columns([0.5, 1, 1, 1, 0.5])
             col2.metric("Suggested Low Cutoff", f"{lowcut_suggested} Hz")
             col4.metric("Suggested High Cutoff", f"{highcut_suggested} Hz")
         else:
-            noisy_audio = audio_data
+            pipeline.update(add_noise=False, noise_type=None, noise_level=None)
+            noisy_signal = pipeline["noise"]
 
 # 3. Apply Noise Cancellation Section with better layout and feedback
-if audio_file is not None and noisy_audio is not None:
+if audio_file is not None:
     with st.expander("3. Apply Noise Cancellation", expanded=False):
         st.write("Apply a **noise cancellation filter** to the noisy audio.")
 
@@ -1441,57 +1340,131 @@ if audio_file is not None and noisy_audio is not None:
             "High Frequency Cutoff", 50, 8000, highcut_suggested, key="highcut_slider"
         )
 
-        filter_order, rp, rs = filter_customization_panel(
-            noisy_audio, lowcut, highcut, sr, filter_type
+        # Forward-backward filtering removes the phase distortion of IIR filters
+        zero_phase = st.checkbox(
+            "Zero-phase filtering (forward-backward)",
+            help="Filters the audio forward and then backward, so the waveform is "
+            "not shifted or distorted in phase. The magnitude response is applied "
+            "twice, so a lower order gives the same attenuation.",
+            key="zero_phase_checkbox",
+        )
+
+        filter_order, rp, rs, numtaps, fir_method = filter_customization_panel(
+            noisy_signal, lowcut, highcut, sr, filter_type, zero_phase=zero_phase
         )
 
         # Apply the filter and display audio
+        cleaned_signal = None
         if lowcut > 0 and highcut > lowcut:
-            cleaned_audio = apply_filter(
-                noisy_audio, lowcut, highcut, sr, filter_type, filter_order, rp, rs
+            pipeline.update(
+                filter_type=filter_type,
+                lowcut=lowcut,
+                highcut=highcut,
+                order=filter_order,
+                rp=rp,
+                rs=rs,
+                numtaps=numtaps,
+                fir_method=fir_method,
+                zero_phase=zero_phase,
             )
+            cleaned_signal = pipeline["filter"]
 
             # Play the cleaned (filtered) audio for preview
-            cleaned_audio_buffer = io.BytesIO()
-            sf.write(cleaned_audio_buffer, cleaned_audio, sr, format="WAV")
-            cleaned_audio_buffer.seek(0)
-
             st.success("Noise cancellation applied successfully!")
-            st.audio(cleaned_audio_buffer, format="audio/wav")
+            play_preview(pipeline["cleaned_preview"])
 
             # Plot noisy vs cleaned audio
-            plot_time_domain(noisy_audio, cleaned_audio, sr)
-            plot_frequency_domain(noisy_audio, cleaned_audio, sr, lowcut, highcut)
+            plot_time_domain(noisy_signal, cleaned_signal, sr)
+            plot_frequency_domain(noisy_signal, cleaned_signal, sr, lowcut, highcut)
 
 # 4. Analysis and Comparison Section with cleaner analysis layout
-if audio_file is not None and noisy_audio is not None:
+if audio_file is not None and cleaned_signal is not None:
     with st.expander("4. Analysis & Comparison", expanded=False):
         st.write(
             "Analyze the **results of noise cancellation** using advanced metrics and plots."
         )
 
         # Spectral centroid, filter response, and SNR comparison
-        plot_spectral_centroid(audio_data, sr)
-        plot_filter_response(lowcut, highcut, sr, filter_type, order=filter_order)
-        plot_phase_response(lowcut, highcut, sr, filter_type, order=filter_order)
-        plot_group_delay(lowcut, highcut, sr, filter_type, order=filter_order)
+        plot_spectral_centroid(audio_signal, sr)
+        plot_filter_response(
+            lowcut,
+            highcut,
+            sr,
+            filter_type,
+            order=filter_order,
+            numtaps=numtaps,
+            zero_phase=zero_phase,
+        )
+        plot_phase_response(
+            lowcut,
+            highcut,
+            sr,
+            filter_type,
+            order=filter_order,
+            numtaps=numtaps,
+            zero_phase=zero_phase,
+        )
+        plot_group_delay(
+            lowcut,
+            highcut,
+            sr,
+            filter_type,
+            order=filter_order,
+            numtaps=numtaps,
+            zero_phase=zero_phase,
+        )
 
         # Display SNR after filtering with a metric
-        snr = calculate_snr(noisy_audio, cleaned_audio)
-        st.metric("Signal-to-Noise Ratio (SNR)", f"{snr:.2f} dB")
+        metrics = pipeline["metrics"]
+        st.metric("Signal-to-Noise Ratio (SNR)", f"{metrics.snr:.2f} dB")
+        if metrics.channel_snr is not None:
+            # Per-channel SNR, computed in one batched call
+            for col, (channel, value) in zip(
+                st.columns(len(metrics.channel_snr)),
+                enumerate(metrics.channel_snr, start=1),
+            ):
+                col.metric(f"Channel {channel} SNR", f"{value:.2f} dB")
 
         # Plot SNR across the frequency spectrum
-        plot_snr_vs_frequency(noisy_audio, cleaned_audio, sr)
+        plot_snr_vs_frequency(metrics.snr_spectrum, sr)
+
+        # Convergence of the adaptive canceller's weights
+        if filter_type == "Adaptive Tone Canceller (NLMS)":
+            plot_adaptive_convergence(pipeline["adaptive"])
 
         # Plot the impulse response of the filter
-        plot_impulse_response(lowcut, highcut, sr, filter_type, order=filter_order)
+        plot_impulse_response(
+            lowcut,
+            highcut,
+            sr,
+            filter_type,
+            order=filter_order,
+            numtaps=numtaps,
+            zero_phase=zero_phase,
+        )
 
         # Plot the step response of the filter
-        plot_step_response(lowcut, highcut, sr, filter_type, order=filter_order)
+        plot_step_response(
+            lowcut,
+            highcut,
+            sr,
+            filter_type,
+            order=filter_order,
+            numtaps=numtaps,
+            zero_phase=zero_phase,
+        )
 
         # Filter design display (poles and zeros plot)
         # st.write("**Filter Design: Poles and Zeros Plot**")
-        plot_poles_zeros(filter_type, lowcut, highcut, sr, order=filter_order)
+        plot_poles_zeros(
+            filter_type,
+            lowcut,
+            highcut,
+            sr,
+            order=filter_order,
+            numtaps=numtaps,
+            zero_phase=zero_phase,
+        )
 
     with st.expander("5. Compare Filters", expanded=False):
         st.write(
@@ -1501,7 +1474,12 @@ if audio_file is not None and noisy_audio is not None:
             filters_to_compare = all_filters
             # Spectral centroid, filter response, and SNR comparison
             plot_filter_response(
-                lowcut, highcut, sr, filter_type, filters=filters_to_compare
+                lowcut,
+                highcut,
+                sr,
+                filter_type,
+                filters=filters_to_compare,
+                zero_phase=zero_phase,
             )
             plot_phase_response(
                 lowcut,
@@ -1510,6 +1488,7 @@ if audio_file is not None and noisy_audio is not None:
                 filter_type,
                 filters=filters_to_compare,
                 order=filter_order,
+                zero_phase=zero_phase,
             )
             plot_group_delay(
                 lowcut,
@@ -1518,19 +1497,112 @@ if audio_file is not None and noisy_audio is not None:
                 filter_type,
                 filters=filters_to_compare,
                 order=filter_order,
+                zero_phase=zero_phase,
             )
 
             # Plot the impulse response of the filter
             plot_impulse_response(
-                lowcut, highcut, sr, filter_type, filters=filters_to_compare
+                lowcut,
+                highcut,
+                sr,
+                filter_type,
+                filters=filters_to_compare,
+                zero_phase=zero_phase,
             )
 
             # Plot the step response of the filter
             plot_step_response(
-                lowcut, highcut, sr, filter_type, filters=filters_to_compare
+                lowcut,
+                highcut,
+                sr,
+                filter_type,
+                filters=filters_to_compare,
+                zero_phase=zero_phase,
             )
 
             # Time-domain comparison of filtered signals
             plot_time_domain_comparison(
-                audio_data, lowcut, highcut, sr, filters_to_compare, order=filter_order
+                audio_signal,
+                lowcut,
+                highcut,
+                sr,
+                filters_to_compare,
+                order=filter_order,
+                zero_phase=zero_phase,
             )
+
+# Steps of the processing graph evaluated on this interaction
+if audio_file is not None:
+    with st.expander("Pipeline Activity", expanded=False):
+        runs = pipeline.runs
+        recomputed = [run.name for run in runs if run.recomputed]
+        st.write(
+            f"**Recomputed:** {', '.join(recomputed) or 'nothing'} "
+            f"({len(recomputed)} of {len(runs)} steps)"
+        )
+        st.dataframe(
+            pd.DataFrame(
+                {
+                    "Step": [run.name for run in runs],
+                    "Status": [
+                        "recomputed" if run.recomputed else "cached" for run in runs
+                    ],
+                    "Time (ms)": [run.seconds * 1e3 for run in runs],
+                }
+            ),
+            hide_index=True,
+            use_container_width=True,
+        )
+
+# Time, allocations and cache activity of every stage of this rerun
+with st.expander("Performance", expanded=False):
+    col1, col2 = st.columns(2)
+    col1.checkbox(
+        "Track allocations",
+        help="Records the peak memory allocated by every stage from the next "
+        "interaction on (uses tracemalloc, which slows the app down).",
+        key="profile_memory_checkbox",
+    )
+    # The trace file is configured on the server; the panel only switches it on
+    write_trace = col2.checkbox(
+        "Append to trace file (JSONL)",
+        disabled=TRACE_PATH is None,
+        help="Appends the measurements of every interaction as one JSON line to "
+        "the trace file set on the server with the CLEARWAVE_TRACE environment "
+        "variable (unavailable if it is not set).",
+        key="write_trace_checkbox",
+    )
+    stages = profiler.summary()
+    st.write(
+        f"**Total:** {profiler.elapsed() * 1e3:.0f} ms for this interaction, "
+        f"{len(stages)} stages measured"
+    )
+    if stages:
+        st.dataframe(
+            {
+                # Indent nested stages (e.g. pipeline nodes run inside a plot)
+                "Stage": ["\u2003" * s["depth"] + s["name"] for s in stages],
+                "Wall (ms)": [s["wall_s"] * 1e3 for s in stages],
+                "CPU (ms)": [s["cpu_s"] * 1e3 for s in stages],
+                "Allocated (MB)": [
+                    (
+                        None
+                        if s["allocated_bytes"] is None
+                        else s["allocated_bytes"] / 1024**2
+                    )
+                    for s in stages
+                ],
+                "Cache Hits": [s["cache_hits"] for s in stages],
+                "Cache Misses": [s["cache_misses"] for s in stages],
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
+    if write_trace and TRACE_PATH:
+        profiler.write_trace(
+            TRACE_PATH,
+            file=audio_file.name if audio_file is not None else None,
+            filter_type=filter_type if audio_file is not None else None,
+            total_s=profiler.elapsed(),
+        )
+activate(None)
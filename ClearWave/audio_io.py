@@ -0,0 +1,273 @@
+import io
+import mmap
+import struct
+from collections import namedtuple
+
+import numpy as np
+import soundfile as sf
+
+from signals import content_hash, signal_dtype
+from spectrum import FingerprintCache
+from streaming import DEFAULT_BLOCKSIZE
+
+# Layout of the sample data of a WAV file that can be mapped without decoding:
+# sampling rate, channel count, sample dtype, scale to [-1, 1), byte offset and frame count
+WavLayout = namedtuple(
+    "WavLayout", ["sr", "channels", "dtype", "scale", "offset", "frames"]
+)
+
+# (format tag, bits per sample) of the WAV encodings that map directly onto numpy
+WAV_DTYPES = {
+    (1, 16): ("<i2", 1 / 2**15),
+    (1, 32): ("<i4", 1 / 2**31),
+    (3, 32): ("<f4", 1.0),
+    (3, 64): ("<f8", 1.0),
+}
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Subtypes that cannot be read block by block efficiently and are decoded once instead
+COMPRESSED_SUBTYPES = {
+    "MPEG_LAYER_I",
+    "MPEG_LAYER_II",
+    "MPEG_LAYER_III",
+    "VORBIS",
+    "OPUS",
+}
+
+
+def parse_wav_header(buffer):
+    """
+    Locate the sample data of a plain PCM or float WAV file.
+
+    Parameters:
+    - buffer: The raw file contents (bytes, memoryview or mmap).
+
+    Returns:
+    - WavLayout of the sample data, or None if the file is not a WAV file whose
+      samples can be used as they are (e.g. 8/24-bit PCM or RF64).
+    """
+    if len(buffer) < 12 or buffer[0:4] != b"RIFF" or buffer[8:12] != b"WAVE":
+        return None
+
+    fmt = None
+    position = 12
+    while position + 8 <= len(buffer):
+        chunk_id = bytes(buffer[position : position + 4])
+        (size,) = struct.unpack("<I", buffer[position + 4 : position + 8])
+        body = position + 8
+        if chunk_id == b"fmt ":
+            tag, channels, sr, _, block_align, bits = struct.unpack(
+                "<HHIIHH", buffer[body : body + 16]
+            )
+            if tag == WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                # The real format tag is the start of the sub-format GUID
+                (tag,) = struct.unpack("<H", buffer[body + 24 : body + 26])
+            fmt = (tag, bits, channels, sr, block_align)
+        elif chunk_id == b"data":
+            if fmt is None or (fmt[0], fmt[1]) not in WAV_DTYPES:
+                return None
+            tag, bits, channels, sr, block_align = fmt
+            dtype, scale = WAV_DTYPES[(tag, bits)]
+            # Streamed files may leave the size unset, so clamp it to the file
+            available = min(size, len(buffer) - body)
+            return WavLayout(
+                sr, channels, np.dtype(dtype), scale, body, available // block_align
+            )
+        position = body + size + (size & 1)  # Chunks are padded to even sizes
+    return None
+
+
+def _raw_buffer(source):
+    # Zero-copy access to the encoded bytes: memory-map files on disk and reuse
+    # the buffer of in-memory uploads
+    if isinstance(source, (bytes, bytearray, memoryview, np.ndarray)):
+        return memoryview(source)
+    if hasattr(source, "getbuffer"):
+        return source.getbuffer()
+    if hasattr(source, "read"):
+        source.seek(0)
+        return memoryview(source.read())
+    with open(source, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _to_float32(frames, scale, mono):
+    # Convert raw (frames, channels) samples to float32 in [-1, 1), mixing down
+    # to mono by averaging the channels the way librosa.load does
+    if mono:
+        block = np.mean(frames, axis=1, dtype=np.float32)
+    else:
+        block = frames.T.astype(np.float32)
+    if scale != 1.0:
+        block *= scale
+    return block
+
+
+def _decode(raw):
+    # One-time decode of a compressed file, first with libsndfile and then with
+    # librosa's audioread backend for anything libsndfile cannot open
+    try:
+        data, sr = sf.read(io.BytesIO(raw), dtype="float32", always_2d=True)
+        return data.T, sr
+    except (sf.LibsndfileError, RuntimeError):
+        import librosa  # Only needed for formats libsndfile cannot decode
+
+        data, sr = librosa.load(io.BytesIO(raw), sr=None, mono=False)
+        return np.atleast_2d(data), sr
+
+
+# Decoded compressed files, keyed by a full hash of their encoded bytes: an
+# edit between the positions a sampled fingerprint reads would go unnoticed
+decode_cache = FingerprintCache(_decode, max_entries=4, key_func=content_hash)
+
+
+class AudioSource:
+    """
+    Block-wise reader over an audio file on disk or in memory.
+
+    16/32-bit PCM and float WAV files are mapped straight onto numpy arrays, so
+    opening one only parses the header and every block is converted on demand.
+    Other formats libsndfile can seek in (FLAC, AIFF, 24-bit WAV, ...) are read
+    block by block, and compressed formats (MP3, Ogg) are decoded once and cached.
+    """
+
+    def __init__(self, source):
+        """
+        Parameters:
+        - source: Path of an audio file, its raw bytes (bytes or a uint8 array),
+          or a file-like object (such as a Streamlit upload).
+        """
+        self.raw = _raw_buffer(source)
+        self.layout = parse_wav_header(self.raw)
+        self.decoded = None
+
+        if self.layout is not None:
+            self.sr, self.channels, self.frames = (
+                self.layout.sr,
+                self.layout.channels,
+                self.layout.frames,
+            )
+            return
+
+        try:
+            info = sf.info(io.BytesIO(self.raw))
+            compressed = info.subtype in COMPRESSED_SUBTYPES
+        except (sf.LibsndfileError, RuntimeError):
+            compressed = True
+        if compressed:
+            self.decoded, self.sr = decode_cache.get(np.frombuffer(self.raw, np.uint8))
+            self.channels, self.frames = self.decoded.shape
+        else:
+            self.sr, self.channels, self.frames = (
+                info.samplerate,
+                info.channels,
+                info.frames,
+            )
+
+    @property
+    def duration(self):
+        """
+        Length of the recording in seconds.
+        """
+        return self.frames / self.sr
+
+    def samples(self):
+        """
+        Return the raw (frames, channels) samples of a mapped WAV file, without copying.
+        """
+        layout = self.layout
+        return np.frombuffer(
+            self.raw,
+            dtype=layout.dtype,
+            count=layout.frames * layout.channels,
+            offset=layout.offset,
+        ).reshape(layout.frames, layout.channels)
+
+    def blocks(self, blocksize=DEFAULT_BLOCKSIZE, mono=True):
+        """
+        Yield the recording as consecutive float32 blocks.
+
+        Parameters:
+        - blocksize: Number of frames per block.
+        - mono: Mix the channels down to one (1-D blocks); otherwise blocks are
+          shaped (channels, frames).
+
+        Yields:
+        - float32 blocks of at most `blocksize` frames.
+        """
+        if self.layout is not None:
+            samples = self.samples()
+            for start in range(0, self.frames, blocksize):
+                yield _to_float32(
+                    samples[start : start + blocksize], self.layout.scale, mono
+                )
+        elif self.decoded is not None:
+            for start in range(0, self.frames, blocksize):
+                block = self.decoded[:, start : start + blocksize]
+                yield block.mean(axis=0) if mono else block
+        else:
+            with sf.SoundFile(io.BytesIO(self.raw)) as f:
+                for block in f.blocks(blocksize, dtype="float32", always_2d=True):
+                    yield _to_float32(block, 1.0, mono)
+
+    def read(self, mono=True, blocksize=DEFAULT_BLOCKSIZE, dtype=np.float32):
+        """
+        Read the whole recording.
+
+        Mono WAV files already stored in the requested type are returned as a
+        read-only view of the file; all other files are converted block by block
+        into one preallocated array, so no intermediate full-length copies are made.
+
+        Parameters:
+        - mono: Mix the channels down to one.
+        - blocksize: Number of frames converted at a time.
+        - dtype: Floating-point type of the result (float32 or float64).
+
+        Returns:
+        - Array of `dtype`, 1-D if mono, otherwise shaped (channels, frames).
+        """
+        layout = self.layout
+        if mono and layout is not None and layout.channels == 1:
+            if layout.dtype == dtype:
+                return self.samples()[:, 0]
+
+        shape = (self.frames,) if mono else (self.channels, self.frames)
+        out = np.empty(shape, dtype=dtype)
+        start = 0
+        for block in self.blocks(blocksize, mono):
+            stop = start + block.shape[-1]
+            out[..., start:stop] = block
+            start = stop
+        # libsndfile frame counts can be estimates for some formats
+        return out[..., :start]
+
+
+def _load(raw, mono, dtype):
+    source = AudioSource(raw.data)
+    data = source.read(mono, dtype=dtype)
+    data.setflags(write=False)  # Shared between reruns and views, keep immutable
+    return data, source.sr
+
+
+# Loaded recordings, keyed by a full hash of their encoded bytes
+audio_cache = FingerprintCache(_load, max_entries=4, key_func=content_hash)
+
+
+def load_audio(source, mono=True, dtype=None):
+    """
+    Load an audio file as floating-point samples, a drop-in for librosa.load(source, sr=None).
+
+    The result is cached by a full hash of the encoded bytes (which runs at
+    memory speed), so repeated loads of the same upload only cost the hash.
+
+    Parameters:
+    - source: Path of an audio file, its raw bytes, or a file-like object.
+    - mono: Mix the channels down to one.
+    - dtype: Type of the samples (defaults to the signal type, float32 unless configured).
+
+    Returns:
+    - audio_data: Samples (read-only), 1-D if mono, otherwise (channels, frames).
+    - sr: Sampling rate.
+    """
+    raw = np.frombuffer(_raw_buffer(source), np.uint8)
+    return audio_cache.get(raw, mono, np.dtype(dtype or signal_dtype()))
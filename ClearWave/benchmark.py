@@ -0,0 +1,255 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from itertools import product
+
+import numpy as np
+import scipy
+
+from filters import DEFAULT_NUMTAPS, apply_filter, filter_bank
+
+# Sweeps over filter order, ripple (rp, rs), FIR length, sample rate and duration (s).
+# "quick" is meant for a before/after check while developing, "full" for releases.
+SWEEPS = {
+    "quick": {
+        "orders": [4, 8],
+        "ripples": [(0.5, 20)],
+        "numtaps": [DEFAULT_NUMTAPS, 1001],
+        "sample_rates": [44100],
+        "durations": [10],
+    },
+    "full": {
+        "orders": [2, 4, 6, 8, 12],
+        "ripples": [(0.1, 40), (0.5, 20), (1.0, 60)],
+        "numtaps": [DEFAULT_NUMTAPS, 501, 2001],
+        "sample_rates": [16000, 44100, 48000],
+        "durations": [10, 60],
+    },
+}
+
+# Slowdown (relative to the baseline throughput) reported as a regression
+REGRESSION_THRESHOLD = 0.20
+
+
+def synthetic_signal(sr, duration, seed=0):
+    """
+    Generate a reproducible test signal: two tones inside the pass band plus
+    white noise, as float32 like the loaded audio.
+
+    Parameters:
+    - sr: Sampling rate.
+    - duration: Length in seconds.
+    - seed: Seed of the noise generator.
+
+    Returns:
+    - float32 numpy array of sr * duration samples.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sr * duration)) / sr
+    tones = 0.4 * np.sin(2 * np.pi * 440 * t) + 0.2 * np.sin(2 * np.pi * 1200 * t)
+    return (tones + 0.1 * rng.standard_normal(t.size)).astype(np.float32)
+
+
+def benchmark_cases(sweep, filter_types=None):
+    """
+    List the parameter combinations of a sweep, one per distinct design.
+
+    Parameters that a filter type ignores (e.g. ripple for Butterworth) are not
+    swept for it, using the same key the filter bank caches designs under.
+
+    Parameters:
+    - sweep: Dictionary with the orders, ripples, numtaps, sample rates and durations.
+    - filter_types: Filter types to include (defaults to all registered types).
+
+    Returns:
+    - List of dictionaries with the arguments of one apply_filter call plus 'duration'.
+    """
+    cases, seen = [], set()
+    for filter_type, sr, duration in product(
+        filter_types or filter_bank.names, sweep["sample_rates"], sweep["durations"]
+    ):
+        lowcut, highcut = 300.0, min(3400.0, 0.45 * sr)
+        for order, (rp, rs), numtaps in product(
+            sweep["orders"], sweep["ripples"], sweep["numtaps"]
+        ):
+            key = filter_bank.key(
+                filter_type, lowcut, highcut, sr, order, rp, rs, numtaps
+            )
+            if (key, duration) in seen:
+                continue
+            seen.add((key, duration))
+            _, _, _, _, order, rp, rs, numtaps = key
+            cases.append(
+                {
+                    "filter_type": filter_type,
+                    "lowcut": lowcut,
+                    "highcut": highcut,
+                    "fs": sr,
+                    "order": order,
+                    "rp": rp,
+                    "rs": rs,
+                    "numtaps": numtaps,
+                    "duration": duration,
+                }
+            )
+    return cases
+
+
+def run_case(case, repeats=5):
+    """
+    Measure one filter configuration.
+
+    Design and filtering are timed separately (best of `repeats` runs, the
+    design without the filter bank's cache). Peak memory is measured with
+    tracemalloc in a separate run, so tracing does not distort the timings.
+
+    Parameters:
+    - case: Dictionary produced by benchmark_cases.
+    - repeats: Number of timed runs.
+
+    Returns:
+    - The case dictionary extended with the measurements.
+    """
+    params = {k: v for k, v in case.items() if k != "duration"}
+    design_args = {k: v for k, v in params.items() if k != "filter_type"}
+    data = synthetic_signal(case["fs"], case["duration"])
+
+    design_times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        filter_bank.design(params["filter_type"], cached=False, **design_args)
+        design_times.append(time.perf_counter() - start)
+
+    apply_filter(data[: case["fs"]], **params)  # Warm up (design cache, FFT plans)
+    filter_times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        apply_filter(data, **params)
+        filter_times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    apply_filter(data, **params)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    filter_time = min(filter_times)
+    return dict(
+        case,
+        samples=data.size,
+        design_time_s=min(design_times),
+        filter_time_s=filter_time,
+        throughput_sps=data.size / filter_time,
+        peak_memory_bytes=peak,
+        peak_memory_ratio=peak / data.nbytes,  # Relative to the input signal
+    )
+
+
+def environment():
+    """
+    Describe the machine and library versions the results were measured with.
+    """
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def case_id(result):
+    """
+    Identify a result independently of its measurements, for comparing runs.
+    """
+    fields = ("filter_type", "fs", "duration", "order", "rp", "rs", "numtaps")
+    return tuple(result[f] for f in fields)
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare the throughput of two benchmark runs.
+
+    Parameters:
+    - results: Result list of the current run.
+    - baseline: Result list of the reference run.
+    - threshold: Relative slowdown that counts as a regression.
+
+    Returns:
+    - List of (case id, baseline throughput, current throughput) for every regression.
+    """
+    reference = {case_id(r): r["throughput_sps"] for r in baseline}
+    regressions = []
+    for result in results:
+        before = reference.get(case_id(result))
+        if before and result["throughput_sps"] < (1 - threshold) * before:
+            regressions.append((case_id(result), before, result["throughput_sps"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark ClearWave's filter designs and filtering on synthetic signals."
+    )
+    parser.add_argument(
+        "--sweep", choices=sorted(SWEEPS), default="quick", help="Parameter sweep."
+    )
+    parser.add_argument(
+        "--filter",
+        dest="filter_types",
+        action="append",
+        choices=filter_bank.names,
+        help="Filter type to include (repeatable; default: all).",
+    )
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per case.")
+    parser.add_argument(
+        "--output", default="benchmark.json", help="JSON file for the results."
+    )
+    parser.add_argument(
+        "--baseline", help="Earlier results to check for throughput regressions."
+    )
+    args = parser.parse_args(argv)
+
+    cases = benchmark_cases(SWEEPS[args.sweep], args.filter_types)
+    results = []
+    for i, case in enumerate(cases, start=1):
+        result = run_case(case, args.repeats)
+        results.append(result)
+        print(
+            f"[{i}/{len(cases)}] {case['filter_type']} order={case['order']} "
+            f"rp={case['rp']} rs={case['rs']} taps={case['numtaps']} "
+            f"sr={case['fs']} {case['duration']}s: "
+            f"{result['throughput_sps'] / 1e6:.1f} Msamples/s, "
+            f"design {result['design_time_s'] * 1e3:.2f} ms, "
+            f"peak {result['peak_memory_bytes'] / 2**20:.1f} MiB",
+            file=sys.stderr,
+        )
+
+    with open(args.output, "w") as f:
+        json.dump(
+            {"environment": environment(), "sweep": args.sweep, "results": results},
+            f,
+            indent=2,
+        )
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline)
+        for case, before, after in regressions:
+            print(
+                f"REGRESSION {case}: {before / 1e6:.1f} -> {after / 1e6:.1f} Msamples/s",
+                file=sys.stderr,
+            )
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+
+# Most data points one chart sends to the browser, shared by all of its series
+# (a point is one value of one series; a min/max band row counts once)
+CHART_POINT_BUDGET = 5000
+
+
+def series_budget(n_series, max_points=None):
+    """
+    Split a chart's point budget between its series.
+
+    Parameters:
+    - n_series: Number of series drawn in the chart.
+    - max_points: Points per chart (defaults to CHART_POINT_BUDGET).
+
+    Returns:
+    - Number of points each series may use (at least 2).
+    """
+    max_points = max_points or CHART_POINT_BUDGET
+    return max(2, max_points // max(1, n_series))
+
+
+def decimate(values, max_rows):
+    """
+    Choose at most `max_rows` positions along the last axis of one or more
+    curves sharing an x axis.
+
+    The curves are split into equal buckets and the lowest and highest point of
+    every curve in every bucket is kept (plus both ends), so notches, peaks and
+    phase wraps survive where plain striding would skip them. Buckets are
+    widened until the positions kept by all curves fit the budget.
+
+    Parameters:
+    - values: Curve values, shaped (n,) or (curves, n); NaNs are ignored.
+    - max_rows: Maximum number of positions to keep.
+
+    Returns:
+    - Increasing integer positions (all of them if there are at most max_rows).
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    n = values.shape[-1]
+    if n <= max_rows:
+        return np.arange(n)
+
+    buckets = max(1, max_rows // 2)
+    while True:
+        size = -(-n // buckets)  # Ceiling division
+        padded = np.full((values.shape[0], -(-n // size) * size), np.nan)
+        padded[:, :n] = values
+        blocks = padded.reshape(values.shape[0], -1, size)
+        offsets = np.arange(blocks.shape[1]) * size
+        missing = np.isnan(blocks)
+        low = np.where(missing, np.inf, blocks).argmin(axis=-1) + offsets
+        high = np.where(missing, -np.inf, blocks).argmax(axis=-1) + offsets
+        keep = np.unique(np.concatenate([low.ravel(), high.ravel(), [0, n - 1]]))
+        keep = keep[keep < n]  # Drop the padding of the last bucket
+        if len(keep) <= max_rows or buckets == 1:
+            return keep
+        buckets //= 2
+
+
+def _column(values):
+    # Compact Arrow type of a chart column: float32 numbers, dictionary-encoded
+    # labels (one small code per row instead of the repeated string)
+    values = np.asarray(values)
+    if values.dtype.kind == "f":
+        return values.astype(np.float32, copy=False)
+    if values.dtype.kind in "OUS":
+        return pd.Categorical(values)
+    return values
+
+
+def wide_frame(x_name, x, series, max_points=None):
+    """
+    Build the table of several curves on a shared x axis, one column per curve.
+
+    The x values are sent once instead of once per curve; charts turn the curve
+    columns into (series, value) pairs in the browser with `transform_fold`,
+    so no long-format copy is built on the server.
+
+    Parameters:
+    - x_name: Name of the x column (e.g. "Frequency (Hz)").
+    - x: Shared x values.
+    - series: Dictionary mapping each curve's name to its values (same length as x).
+    - max_points: Points for the whole chart (defaults to CHART_POINT_BUDGET).
+
+    Returns:
+    - DataFrame with the x column and one float32 column per curve.
+    """
+    keep = decimate(list(series.values()), series_budget(len(series), max_points))
+    return pd.DataFrame(
+        {
+            x_name: _column(np.asarray(x)[keep]),
+            **{name: _column(np.asarray(y)[keep]) for name, y in series.items()},
+        }
+    )
+
+
+def stacked_frame(series, label, max_points=None):
+    """
+    Build a long-format table of several series with their own x values (e.g.
+    min/max bands of different signals), stacked without intermediate frames.
+
+    Every series is decimated on its value columns (all but the first, which is
+    its x axis) to its share of the chart's budget, and the label column is
+    dictionary-encoded.
+
+    Parameters:
+    - series: Dictionary mapping each series' label to a dictionary of equally
+      long columns, x first (the same column names for every series).
+    - label: Name of the column holding the series label (e.g. "Signal").
+    - max_points: Points for the whole chart (defaults to CHART_POINT_BUDGET).
+
+    Returns:
+    - DataFrame with the series' columns and the label column.
+    """
+    budget = series_budget(len(series), max_points)
+    kept = []
+    for columns in series.values():
+        values = list(columns.values())
+        keep = decimate(values[1:], budget) if len(values) > 1 else slice(None)
+        kept.append({name: np.asarray(v)[keep] for name, v in columns.items()})
+
+    names = list(next(iter(series.values())))
+    lengths = [len(next(iter(columns.values()))) for columns in kept]
+    return pd.DataFrame(
+        {
+            **{
+                name: _column(np.concatenate([c[name] for c in kept])) for name in names
+            },
+            label: pd.Categorical.from_codes(
+                np.repeat(np.arange(len(series)), lengths), categories=list(series)
+            ),
+        }
+    )
+
+
+def channel_frame(shared, per_channel, max_points=None):
+    """
+    Build a long-format table from values that may carry a leading channel axis.
+
+    Parameters:
+    - shared: Dictionary of 1-D columns common to all channels (e.g. time or frequency).
+    - per_channel: Dictionary of columns shaped (n,) or (channels, n).
+    - max_points: Points for the whole chart (defaults to CHART_POINT_BUDGET).
+
+    Returns:
+    - DataFrame with one row per point and channel, plus a 'Channel' column.
+    """
+    per_channel = {name: np.atleast_2d(v) for name, v in per_channel.items()}
+    n_channels, n_points = next(iter(per_channel.values())).shape
+    # Keep the same positions on every channel, so the lines stay aligned
+    keep = decimate(
+        np.concatenate(list(per_channel.values())),
+        series_budget(n_channels, max_points),
+    )
+    return pd.DataFrame(
+        {
+            **{
+                name: _column(np.tile(np.asarray(v)[keep], n_channels))
+                for name, v in shared.items()
+            },
+            **{name: _column(v[:, keep].ravel()) for name, v in per_channel.items()},
+            "Channel": np.repeat(
+                np.arange(1, n_channels + 1, dtype=np.uint8), len(keep)
+            ),
+        }
+    )
@@ -0,0 +1,434 @@
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import soundfile as sf
+
+from analysis import (
+    SNRAccumulator,
+    calculate_snr,
+    suggest_bandpass_values,
+    suggest_bandpass_values_welch,
+)
+from audio_io import AudioSource, load_audio
+from filters import apply_filter, filter_bank
+from realtime import DEFAULT_FRAME_SIZE, simulate_file, write_timings
+from signals import DEFAULT_SIGNAL_DTYPE, SIGNAL_DTYPES, set_signal_dtype
+from spectrum import clear_caches
+from streaming import filter_file
+
+# File extensions picked up by the batch mode
+AUDIO_EXTENSIONS = (".wav", ".mp3")
+
+# Columns of the batch report
+REPORT_FIELDS = [
+    "file",
+    "sample_rate",
+    "channels",
+    "duration_s",
+    "filter",
+    "lowcut_suggested",
+    "highcut_suggested",
+    "lowcut",
+    "highcut",
+    "snr_db",
+    "output",
+    "error",
+]
+
+
+def find_audio_files(input_dir, recursive=False):
+    """
+    List the WAV/MP3 files of a directory in a stable order.
+
+    Parameters:
+    - input_dir: Directory to scan.
+    - recursive: Whether to include subdirectories.
+
+    Returns:
+    - List of file paths.
+    """
+    paths = []
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        paths.extend(
+            os.path.join(root, name)
+            for name in sorted(files)
+            if name.lower().endswith(AUDIO_EXTENSIONS)
+        )
+        if not recursive:
+            break
+    return paths
+
+
+def _channel_blocks(source):
+    # Blocks of a recording in the batch layout: 1-D for mono files, otherwise
+    # (channels, frames)
+    for block in source.blocks(mono=False):
+        yield block[0] if source.channels == 1 else block
+
+
+def process_file(path, input_dir, output_dir, options):
+    """
+    Clean one recording and collect its report row. Runs inside a worker process.
+
+    With the Welch estimator, linear filters run causally are streamed from the
+    input file to the output file block by block, so memory stays flat however
+    long the recording is; zero-phase filtering, the full-FFT estimator and the
+    non-linear types need the whole recording in memory.
+
+    Parameters:
+    - path: Path of the input audio file.
+    - input_dir: Root input directory (used to mirror the folder layout).
+    - output_dir: Directory the cleaned WAV file is written to.
+    - options: Dictionary with the filter settings from the command line.
+
+    Returns:
+    - Dictionary with one report row (see REPORT_FIELDS).
+    """
+    relative = os.path.relpath(path, input_dir)
+    row = {"file": relative, "filter": options["filter_type"]}
+    # Workers may not inherit the parent's setting
+    set_signal_dtype(options.get("dtype", DEFAULT_SIGNAL_DTYPE))
+    streamed = (
+        filter_bank.is_linear(options["filter_type"])
+        and not options["zero_phase"]
+        and options["estimator"] == "welch"
+    )
+    try:
+        if streamed:
+            source = AudioSource(path)
+            sr, channels, frames = source.sr, source.channels, source.frames
+            lowcut_suggested, highcut_suggested = suggest_bandpass_values_welch(
+                None,
+                sr,
+                options["start"],
+                options["end"],
+                blocks=_channel_blocks(source),
+            )
+        else:
+            # Keep the channel layout; mono files are processed as 1-D signals
+            audio_data, sr = load_audio(path, mono=False)
+            channels, frames = audio_data.shape
+            if channels == 1:
+                audio_data = audio_data[0]
+            if options["estimator"] == "welch":
+                lowcut_suggested, highcut_suggested = suggest_bandpass_values_welch(
+                    audio_data, sr, options["start"], options["end"]
+                )
+            else:
+                lowcut_suggested, highcut_suggested = suggest_bandpass_values(
+                    audio_data, sr
+                )
+
+        # Explicit cutoffs win over the suggested ones
+        lowcut = options["lowcut"] or lowcut_suggested
+        highcut = options["highcut"] or highcut_suggested
+        highcut = min(highcut, sr / 2 - 1)  # Keep the band below Nyquist
+        if not 0 < lowcut < highcut:
+            raise ValueError(f"invalid band {lowcut}-{highcut} Hz")
+
+        output_path = os.path.join(output_dir, os.path.splitext(relative)[0] + ".wav")
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        filter_type = options["filter_type"]
+        design = (options["order"], options["rp"], options["rs"], options["numtaps"])
+        if streamed:
+            block_filter = filter_bank.block_filter(
+                filter_type, lowcut, highcut, sr, *design, length=frames
+            )
+            snr = SNRAccumulator()
+            filter_file(source, output_path, block_filter, monitor=snr.update)
+            snr_db = snr.snr()
+        else:
+            cleaned_audio = apply_filter(
+                audio_data,
+                lowcut,
+                highcut,
+                sr,
+                filter_type,
+                *design,
+                zero_phase=options["zero_phase"],
+            )
+            sf.write(
+                output_path, cleaned_audio.T, sr
+            )  # soundfile expects (frames, channels)
+            snr_db = calculate_snr(audio_data, cleaned_audio)
+
+        row.update(
+            sample_rate=sr,
+            channels=channels,
+            duration_s=round(frames / sr, 3),
+            lowcut_suggested=lowcut_suggested,
+            highcut_suggested=highcut_suggested,
+            lowcut=lowcut,
+            highcut=highcut,
+            snr_db=round(float(snr_db), 3),
+            output=os.path.relpath(output_path, output_dir),
+        )
+    except Exception as e:
+        # Report the failure and keep going with the other files
+        row["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        # The worker will not see this recording again; drop its decoded
+        # samples and spectra so memory does not grow with the cache budgets
+        clear_caches()
+    return row
+
+
+def run_batch(
+    input_dir, output_dir, options, workers=None, recursive=False, report=None
+):
+    """
+    Clean every recording of a directory in a process pool and write a CSV report.
+
+    Parameters:
+    - input_dir: Directory with WAV/MP3 files.
+    - output_dir: Directory for the cleaned WAV files.
+    - options: Dictionary with the filter settings.
+    - workers: Number of worker processes (defaults to the number of CPU cores).
+    - recursive: Whether to include subdirectories.
+    - report: Path of the CSV report (defaults to report.csv in output_dir).
+
+    Returns:
+    - List of report rows, in input file order.
+    """
+    paths = find_audio_files(input_dir, recursive)
+    os.makedirs(output_dir, exist_ok=True)
+    report = report or os.path.join(output_dir, "report.csv")
+
+    rows = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(process_file, path, input_dir, output_dir, options): path
+            for path in paths
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            row = future.result()
+            rows[futures[future]] = row
+            status = row.get("error") or f"SNR {row['snr_db']} dB"
+            print(f"[{done}/{len(paths)}] {row['file']}: {status}", file=sys.stderr)
+
+    ordered = [rows[path] for path in paths]
+    with open(report, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(ordered)
+    return ordered
+
+
+def run_realtime(path, options, frame_size=DEFAULT_FRAME_SIZE, output=None):
+    """
+    Simulate live processing of a recording and return its latency report.
+
+    Parameters:
+    - path: Path of the input audio file.
+    - options: Dictionary with the filter settings.
+    - frame_size: Number of samples per frame.
+    - output: Optional path of a WAV file for the processed audio.
+
+    Returns:
+    - RealtimeReport of the run.
+    """
+    source = AudioSource(path)
+    sr = source.sr
+    lowcut, highcut = options["lowcut"], options["highcut"]
+    if not (lowcut and highcut):
+        # Suggest the missing cutoffs from a streamed Welch estimate of the file
+        suggested = suggest_bandpass_values_welch(None, sr, blocks=source.blocks())
+        lowcut, highcut = lowcut or suggested[0], highcut or suggested[1]
+    highcut = min(highcut, sr / 2 - 1)  # Keep the band below Nyquist
+
+    block_filter = filter_bank.block_filter(
+        options["filter_type"],
+        lowcut,
+        highcut,
+        sr,
+        options["order"],
+        options["rp"],
+        options["rs"],
+        options["numtaps"],
+        length=frame_size,
+    )
+    return simulate_file(path, block_filter, frame_size, output)
+
+
+def filter_type_arg(value):
+    """
+    Resolve a filter type from its full name or a case-insensitive prefix
+    (e.g. "fir" or "elliptic").
+    """
+    matches = [
+        name for name in filter_bank.names if name.lower().startswith(value.lower())
+    ]
+    if value in filter_bank.names:
+        return value
+    if len(matches) != 1:
+        raise argparse.ArgumentTypeError(
+            f"unknown or ambiguous filter type {value!r} "
+            f"(choose from {', '.join(filter_bank.names)})"
+        )
+    return matches[0]
+
+
+def build_parser():
+    """
+    Build the command-line interface.
+    """
+    parser = argparse.ArgumentParser(
+        prog="clearwave", description="Headless ClearWave noise cancellation."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser(
+        "batch", help="Clean every WAV/MP3 file of a directory."
+    )
+    batch.add_argument("input_dir", help="Directory with the recordings.")
+    batch.add_argument("output_dir", help="Directory for the cleaned WAV files.")
+    add_filter_arguments(batch)
+    batch.add_argument(
+        "--zero-phase",
+        action="store_true",
+        help="Filter forward and backward (no phase distortion).",
+    )
+    add_cutoff_arguments(batch)
+    batch.add_argument(
+        "--estimator",
+        choices=["fft", "welch"],
+        default="fft",
+        help="Cutoff estimator: one full FFT or averaged Welch periodograms "
+        "(welch streams linear, causal filters with constant memory).",
+    )
+    batch.add_argument(
+        "--start", type=float, help="Start (s) of the range the Welch estimator uses."
+    )
+    batch.add_argument(
+        "--end", type=float, help="End (s) of the range the Welch estimator uses."
+    )
+    batch.add_argument(
+        "--workers", type=int, help="Worker processes (default: all CPU cores)."
+    )
+    batch.add_argument(
+        "--recursive", action="store_true", help="Include subdirectories."
+    )
+    batch.add_argument(
+        "--report", help="CSV report path (default: OUTPUT_DIR/report.csv)."
+    )
+
+    realtime = commands.add_parser(
+        "realtime",
+        help="Simulate live processing of a recording in fixed frames and "
+        "report per-frame latency.",
+    )
+    realtime.add_argument("input", help="Audio file to stream.")
+    add_filter_arguments(realtime)
+    add_cutoff_arguments(realtime)
+    realtime.add_argument(
+        "--frame-size",
+        type=int,
+        default=DEFAULT_FRAME_SIZE,
+        help="Samples per frame (default: %(default)s).",
+    )
+    realtime.add_argument("--output", help="WAV file for the processed audio.")
+    realtime.add_argument("--timings", help="CSV file for the per-frame timings.")
+    return parser
+
+
+def add_filter_arguments(parser):
+    """
+    Add the filter selection and design options shared by the subcommands.
+    """
+    parser.add_argument(
+        "--filter",
+        dest="filter_type",
+        type=filter_type_arg,
+        default=filter_bank.names[0],
+        help="Filter type or a prefix of it, e.g. 'fir' (default: %(default)s).",
+    )
+    parser.add_argument("--order", type=int, default=5, help="Filter order.")
+    parser.add_argument("--rp", type=float, help="Passband ripple (dB).")
+    parser.add_argument("--rs", type=float, help="Stopband attenuation (dB).")
+    parser.add_argument("--numtaps", type=int, help="Number of FIR taps.")
+    parser.add_argument(
+        "--dtype",
+        choices=SIGNAL_DTYPES,
+        default=DEFAULT_SIGNAL_DTYPE,
+        help="Floating-point type of the signal path (default: %(default)s).",
+    )
+
+
+def add_cutoff_arguments(parser):
+    """
+    Add the cutoff options shared by the subcommands.
+    """
+    parser.add_argument(
+        "--lowcut", type=float, help="Low cutoff (Hz); suggested value if omitted."
+    )
+    parser.add_argument(
+        "--highcut", type=float, help="High cutoff (Hz); suggested value if omitted."
+    )
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command == "batch":
+        options = {
+            "filter_type": args.filter_type,
+            "order": args.order,
+            "rp": args.rp,
+            "rs": args.rs,
+            "numtaps": args.numtaps,
+            "dtype": args.dtype,
+            "zero_phase": args.zero_phase,
+            "estimator": args.estimator,
+            "start": args.start,
+            "end": args.end,
+            "lowcut": args.lowcut,
+            "highcut": args.highcut,
+        }
+        rows = run_batch(
+            args.input_dir,
+            args.output_dir,
+            options,
+            workers=args.workers,
+            recursive=args.recursive,
+            report=args.report,
+        )
+        failed = sum(1 for row in rows if row.get("error"))
+        print(f"Processed {len(rows) - failed}/{len(rows)} files.", file=sys.stderr)
+        return 1 if failed else 0
+
+    if args.command == "realtime":
+        set_signal_dtype(args.dtype)
+        options = {
+            "filter_type": args.filter_type,
+            "order": args.order,
+            "rp": args.rp,
+            "rs": args.rs,
+            "numtaps": args.numtaps,
+            "lowcut": args.lowcut,
+            "highcut": args.highcut,
+        }
+        try:
+            report = run_realtime(args.input, options, args.frame_size, args.output)
+        except ValueError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 2
+        if args.timings:
+            write_timings(report, args.timings)
+        ms = 1e3
+        print(
+            f"{args.filter_type}, {report.frames} frames of {report.frame_size} "
+            f"samples at {report.sr} Hz (deadline {report.deadline_s * ms:.3f} ms)\n"
+            f"  mean {report.mean_s * ms:.3f} ms, p50 {report.p50_s * ms:.3f} ms, "
+            f"p99 {report.p99_s * ms:.3f} ms, max {report.max_s * ms:.3f} ms\n"
+            f"  deadline misses: {report.misses} ({report.miss_rate:.2%}), "
+            f"real-time factor {report.realtime_factor:.1f}x"
+        )
+        return 1 if report.misses else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
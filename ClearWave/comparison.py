@@ -0,0 +1,329 @@
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from envelope import minmax_envelope
+from filters import apply_filter, filter_bank
+from spectrum import FingerprintCache
+
+# Quantities of the filter analysis table. X holds the frequency (Hz) of the
+# frequency-domain rows, the time (s) of the time-domain rows and the real part
+# of the zeros and poles; Y holds the value or the imaginary part.
+ANALYSIS_QUANTITIES = (
+    "Gain",
+    "Phase",
+    "Group Delay",
+    "Impulse",
+    "Step",
+    "Zero",
+    "Pole",
+)
+
+# Number of samples of the impulse and step responses
+RESPONSE_SAMPLES = 100
+
+# Largest FIR filter whose zeros are computed (root-finding on a long
+# polynomial takes minutes)
+MAX_ROOT_TAPS = 512
+
+
+def _section_responses(sections, w):
+    # Response of every second-order section on the grid w: (sections, points)
+    zm1 = np.exp(-1j * w)
+    powers = np.stack([np.ones_like(zm1), zm1, zm1 * zm1])
+    return (sections[:, :3] @ powers) / (sections[:, 3:] @ powers)
+
+
+def _fir_response(taps, worN):
+    # Response of FIR taps on the grid pi * k / worN from one real FFT, as in
+    # freqz; taps longer than the FFT use a multiple of it and keep every m-th bin
+    m = -(-len(taps) // (2 * worN))
+    return np.fft.rfft(taps, 2 * worN * m)[: worN * m : m]
+
+
+def _quadratic_roots(coeffs):
+    # Both roots of c0 z^2 + c1 z + c2 for every row of coeffs, with the form
+    # of the quadratic formula that avoids cancellation: (rows, 2)
+    c0, c1, c2 = coeffs.T.astype(complex)
+    root = np.sqrt(c1 * c1 - 4 * c0 * c2)
+    root = np.where((c1.conj() * root).real < 0, -root, root)
+    q = -0.5 * (c1 + root)
+    other = np.where(q == 0, 0, c2 / np.where(q == 0, 1, q))  # Both roots are 0 if q is
+    return np.stack([q / c0, other], axis=1)
+
+
+@functools.lru_cache(maxsize=32)
+def _analyze_filters(keys, worN, zero_phase):
+    designs = [filter_bank.design(*key) for key in keys]
+    fir = [filter_bank.is_fir(key[0]) for key in keys]
+    iir = [i for i, is_fir in enumerate(fir) if not is_fir]
+    w = np.linspace(0, np.pi, worN, endpoint=False)  # Shared grid (as freqz)
+
+    # Frequency responses: the sections of all IIR designs are evaluated in one
+    # batch and multiplied per design; FIR designs take one FFT each
+    h = np.empty((len(keys), worN), dtype=complex)
+    zeros, poles = [np.empty(0)] * len(keys), [np.empty(0)] * len(keys)
+    if iir:
+        sections = np.concatenate([designs[i] for i in iir])
+        starts = np.cumsum([0] + [len(designs[i]) for i in iir])
+        h[iir] = np.multiply.reduceat(
+            _section_responses(sections, w), starts[:-1], axis=0
+        )
+        # Zeros and poles of all sections at once, split back per design
+        section_zeros = _quadratic_roots(sections[:, :3]).ravel()
+        section_poles = _quadratic_roots(sections[:, 3:]).ravel()
+        for i, start, stop in zip(iir, 2 * starts[:-1], 2 * starts[1:]):
+            zeros[i], poles[i] = section_zeros[start:stop], section_poles[start:stop]
+    for i in np.flatnonzero(fir):
+        h[i] = _fir_response(designs[i], worN)
+        if len(designs[i]) <= MAX_ROOT_TAPS:
+            zeros[i] = np.roots(designs[i])
+    if zero_phase:
+        h = np.abs(h) ** 2 + 0j  # Forward-backward filtering: |H|^2, no phase
+
+    gain = np.abs(h)
+    phase = np.angle(h)
+    # Group delay from the unwrapped phase, for all designs in one call
+    group_delay = -np.diff(np.unwrap(phase, axis=-1), axis=-1) / np.diff(w)
+
+    # Impulse and step responses, filtered together as two channels
+    probes = np.zeros((2, RESPONSE_SAMPLES))
+    probes[0, 0] = 1
+    probes[1] = 1
+
+    chunks = []  # (filter index, quantity, x, y) of every block of rows
+    for i, key in enumerate(keys):
+        filter_type, lowcut, highcut, sr, order, rp, rs, numtaps = key
+        impulse, step = apply_filter(
+            probes,
+            lowcut,
+            highcut,
+            sr,
+            filter_type,
+            order,
+            rp,
+            rs,
+            numtaps,
+            zero_phase=zero_phase,
+        )
+        freqs = w * (sr / (2 * np.pi))
+        time = np.arange(RESPONSE_SAMPLES) / sr
+        chunks += [
+            (i, "Gain", freqs, gain[i]),
+            (i, "Phase", freqs, phase[i]),
+            # Differences of the phase start at the second bin
+            (i, "Group Delay", freqs[1:], group_delay[i]),
+            (i, "Impulse", time, impulse),
+            (i, "Step", time, step),
+            (i, "Zero", zeros[i].real, zeros[i].imag),
+            (i, "Pole", poles[i].real, poles[i].imag),
+        ]
+
+    # Categories are built from integer codes; repeating the strings is far slower
+    lengths = [len(x) for _, _, x, _ in chunks]
+    quantities = [ANALYSIS_QUANTITIES.index(c[1]) for c in chunks]
+    return pd.DataFrame(
+        {
+            "Filter": pd.Categorical.from_codes(
+                np.repeat([c[0] for c in chunks], lengths),
+                categories=[key[0] for key in keys],
+            ),
+            "Quantity": pd.Categorical.from_codes(
+                np.repeat(quantities, lengths), categories=ANALYSIS_QUANTITIES
+            ),
+            "X": np.concatenate([c[2] for c in chunks]),
+            "Y": np.concatenate([c[3] for c in chunks]),
+        }
+    )
+
+
+def analyze_filters(
+    filters,
+    lowcut,
+    highcut,
+    sr,
+    order=5,
+    rp=None,
+    rs=None,
+    numtaps=None,
+    worN=2000,
+    zero_phase=False,
+):
+    """
+    Return the (cached) analysis of a set of designs as one tidy table.
+
+    Magnitude, phase and group delay are evaluated on a frequency grid shared
+    by all designs (the second-order sections of every IIR design in one
+    batch), together with the impulse and step responses and the zeros and
+    poles. The frequency, phase, group-delay, impulse, step and pole/zero plots
+    all slice the same table, so a set of designs is analysed once however
+    many plots show it. The table is shared between callers and must not be
+    modified.
+
+    Parameters:
+    - filters: Linear filter types to analyse.
+    - lowcut: Low cutoff frequency.
+    - highcut: High cutoff frequency.
+    - sr: Sampling rate.
+    - order: Filter order (applicable to IIR filters).
+    - rp: Passband ripple (applicable to Chebyshev I and Elliptic filters).
+    - rs: Stopband attenuation (applicable to Chebyshev II and Elliptic filters).
+    - numtaps: Number of taps (applicable to the FIR filter).
+    - worN: Number of frequencies between 0 and the Nyquist frequency.
+    - zero_phase: Describe forward-backward filtering (|H|^2, no phase shift).
+
+    Returns:
+    - DataFrame with the columns Filter, Quantity (one of ANALYSIS_QUANTITIES),
+      X and Y; FIR filters longer than MAX_ROOT_TAPS have no Zero rows.
+
+    Raises:
+    - ValueError: If a filter type is not linear.
+    """
+    for filter_type in filters:
+        if not filter_bank.is_linear(filter_type):
+            raise ValueError(f"{filter_type} has no fixed frequency response")
+    keys = tuple(
+        filter_bank.key(filter_type, lowcut, highcut, sr, order, rp, rs, numtaps)
+        for filter_type in dict.fromkeys(filters)  # Each type once, in order
+    )
+    return _analyze_filters(keys, worN, zero_phase)
+
+
+def _filter_shared(
+    name, shape, dtype, sr, lowcut, highcut, filter_type, order, zero_phase, points
+):
+    # Worker task: filter the signal held in shared memory and reduce the output
+    # to its min/max envelope, so only a few kilobytes travel back
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        data = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        filtered = apply_filter(
+            data, lowcut, highcut, sr, filter_type, order, zero_phase=zero_phase
+        )
+        del data  # Release the view before closing the block
+        return minmax_envelope(filtered, sr, points)
+    finally:
+        block.close()
+
+
+_executor = None  # Worker pool shared by all comparisons
+_executor_workers = None
+
+
+def get_executor(workers):
+    """
+    Return the shared worker pool, starting it on first use (or when it has
+    fewer than `workers` workers).
+
+    Workers are spawned rather than forked, so they do not inherit the state of
+    the (multi-threaded) Streamlit server, and the pool is kept alive between
+    reruns so the start-up cost is only paid once. A wider pool is reused for
+    smaller comparisons, since it only spawns workers as tasks need them.
+    """
+    global _executor, _executor_workers
+    if _executor is not None and _executor_workers < workers:
+        _executor.shutdown(wait=False)
+        _executor = None
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        _executor_workers = workers
+    return _executor
+
+
+def _compare_filters(
+    data, sr, lowcut, highcut, filters, order, zero_phase, max_points, workers
+):
+    global _executor
+    # No more workers than filters: every spawned worker re-imports scipy
+    workers = min(len(filters), workers or os.cpu_count() or 1)
+    if workers <= 1 or len(filters) <= 1:
+        return {
+            filt: minmax_envelope(
+                apply_filter(
+                    data, lowcut, highcut, sr, filt, order, zero_phase=zero_phase
+                ),
+                sr,
+                max_points,
+            )
+            for filt in filters
+        }
+
+    # Copy the signal into shared memory once; every task maps the same block
+    # instead of receiving its own pickled copy
+    data = np.ascontiguousarray(data)
+    block = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+    try:
+        np.ndarray(data.shape, dtype=data.dtype, buffer=block.buf)[...] = data
+        args = (block.name, data.shape, data.dtype.str, sr, lowcut, highcut)
+        futures = {
+            filt: get_executor(workers).submit(
+                _filter_shared, *args, filt, order, zero_phase, max_points
+            )
+            for filt in filters
+        }
+        return {filt: future.result() for filt, future in futures.items()}
+    except BrokenProcessPool:
+        # A crashed worker takes the pool down; start a fresh one next time
+        _executor = None
+        raise
+    finally:
+        block.close()
+        block.unlink()
+
+
+# Envelopes of the filtered signals, per signal and comparison settings
+comparison_cache = FingerprintCache(_compare_filters, max_entries=4)
+
+
+def compare_filters(
+    data,
+    sr,
+    lowcut,
+    highcut,
+    filters,
+    order=5,
+    zero_phase=False,
+    max_points=5000,
+    workers=None,
+):
+    """
+    Filter one signal with several filter types concurrently and return the
+    min/max envelope of each output.
+
+    The filters run in a pool of worker processes that share the input through
+    shared memory; with a single core (or a single filter) they run in-process.
+
+    Parameters:
+    - data: Input audio signal (1-D numpy array).
+    - sr: Sampling rate.
+    - lowcut: Low cutoff frequency.
+    - highcut: High cutoff frequency.
+    - filters: Filter types to compare.
+    - order: Filter order (applicable to IIR filters).
+    - zero_phase: Filter forward and backward (no phase distortion).
+    - max_points: Maximum number of envelope points per filter.
+    - workers: Number of worker processes (defaults to the number of cores, and never
+      more than the number of filters; 1 runs in-process).
+
+    Returns:
+    - Dictionary mapping each filter type to the Envelope of its output.
+    """
+    return comparison_cache.get(
+        data,
+        sr,
+        lowcut,
+        highcut,
+        tuple(filters),
+        order,
+        zero_phase,
+        max_points,
+        workers,
+    )
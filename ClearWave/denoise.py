@@ -0,0 +1,167 @@
+import numpy as np
+from scipy import fft as sp_fft
+from scipy.signal import get_window
+
+from signals import output_dtype
+
+# STFT settings of the spectral denoiser (hop of a quarter frame, where the
+# squared Hann window overlap-adds to a constant)
+DEFAULT_DENOISE_N_FFT = 1024
+DEFAULT_DENOISE_CHUNK_FRAMES = 512
+
+# Gain rule: how strongly the noise estimate is subtracted, and the lowest gain
+# applied (keeps some residual noise instead of "musical" artifacts)
+DEFAULT_OVER_SUBTRACTION = 1.5
+DEFAULT_GAIN_FLOOR = 0.1
+
+# Fraction of the quietest frames used to estimate the noise profile
+DEFAULT_NOISE_QUANTILE = 0.1
+
+
+class SpectralDenoiser:
+    """
+    STFT spectral-subtraction / Wiener denoiser.
+
+    The noise power spectrum is estimated from the quietest frames of the
+    signal. Every STFT frame is then multiplied by the gain
+    max(1 - over_subtraction * noise / power, gain_floor) inside the pass band
+    (and by gain_floor outside it), and the signal is resynthesized by weighted
+    overlap-add. Frames are processed in chunks of `chunk_frames`, so besides
+    the output only one chunk of the STFT is held in memory. Since the gains are
+    real, the result has no phase distortion.
+    """
+
+    def __init__(
+        self,
+        lowcut,
+        highcut,
+        fs,
+        n_fft=DEFAULT_DENOISE_N_FFT,
+        over_subtraction=DEFAULT_OVER_SUBTRACTION,
+        gain_floor=DEFAULT_GAIN_FLOOR,
+        noise_quantile=DEFAULT_NOISE_QUANTILE,
+        chunk_frames=DEFAULT_DENOISE_CHUNK_FRAMES,
+    ):
+        """
+        Parameters:
+        - lowcut: Low edge of the band where noise is reduced (Hz).
+        - highcut: High edge of the band where noise is reduced (Hz).
+        - fs: Sampling frequency (Hz).
+        - n_fft: STFT frame length (a multiple of 4).
+        - over_subtraction: Factor applied to the noise estimate.
+        - gain_floor: Lowest gain applied to any bin.
+        - noise_quantile: Fraction of the quietest frames averaged into the noise profile.
+        - chunk_frames: Number of STFT frames processed at once.
+        """
+        self.n_fft = n_fft
+        self.hop = n_fft // 4
+        self.over_subtraction = over_subtraction
+        self.gain_floor = gain_floor
+        self.noise_quantile = noise_quantile
+        self.chunk_frames = chunk_frames
+        self.window = get_window("hann", n_fft)
+        # Squared-window overlap-add sum, constant for a periodic Hann at n_fft / 4
+        self.norm = np.sum(self.window**2) / self.hop
+        freqs = sp_fft.rfftfreq(n_fft, 1 / fs)
+        self.band = (freqs >= lowcut) & (freqs <= highcut)
+
+    def _frames(self, data, first, count):
+        # Frames `first` .. `first + count` of the signal, zero-padded past its
+        # edges. Frame t starts at sample (t + 1) * hop - n_fft, so every sample
+        # is covered by exactly n_fft / hop frames.
+        start = (first + 1) * self.hop - self.n_fft
+        stop = start + (count - 1) * self.hop + self.n_fft
+        segment = np.zeros(data.shape[:-1] + (stop - start,))
+        lo, hi = max(start, 0), min(stop, data.shape[-1])
+        segment[..., lo - start : hi - start] = data[..., lo:hi]
+        windows = np.lib.stride_tricks.sliding_window_view(segment, self.n_fft, axis=-1)
+        return windows[..., :: self.hop, :] * self.window, start
+
+    def _chunks(self, data):
+        # Iterate over (frames, start sample) chunk by chunk
+        n_frames = (data.shape[-1] - 1) // self.hop + self.n_fft // self.hop
+        for first in range(0, n_frames, self.chunk_frames):
+            yield self._frames(data, first, min(self.chunk_frames, n_frames - first))
+
+    def noise_profile(self, data):
+        """
+        Estimate the noise power spectrum from the quietest frames of a signal.
+
+        Parameters:
+        - data: Input audio signal (time on the last axis).
+
+        Returns:
+        - Mean power spectrum of the quietest frames, one per channel.
+        """
+        # First pass: frame energies only (cheap, no FFT) to find the quiet frames
+        energies = np.concatenate(
+            [np.sum(np.square(frames), axis=-1) for frames, _ in self._chunks(data)],
+            axis=-1,
+        )
+        threshold = np.quantile(energies, self.noise_quantile, axis=-1, keepdims=True)
+
+        # Second pass: average the power spectra of the frames below the threshold
+        total = np.zeros(data.shape[:-1] + (self.n_fft // 2 + 1,))
+        count = np.zeros(data.shape[:-1] + (1,))
+        first = 0
+        for frames, _ in self._chunks(data):
+            quiet = energies[..., first : first + frames.shape[-2]] <= threshold
+            power = np.square(np.abs(sp_fft.rfft(frames, axis=-1)))
+            total += np.sum(power * quiet[..., np.newaxis], axis=-2)
+            count += np.sum(quiet, axis=-1, keepdims=True)
+            first += frames.shape[-2]
+        return total / np.maximum(count, 1)
+
+    def apply(self, data):
+        """
+        Denoise a signal.
+
+        Parameters:
+        - data: Input audio signal (numpy array, time on the last axis).
+
+        Returns:
+        - Denoised audio data, the same shape as the input.
+        """
+        noise = self.noise_profile(data)[..., np.newaxis, :]
+        n = data.shape[-1]
+        out = np.zeros(data.shape, dtype=output_dtype(data))
+
+        for frames, start in self._chunks(data):
+            spectrum = sp_fft.rfft(frames, axis=-1)
+            power = np.maximum(np.square(np.abs(spectrum)), np.finfo(float).tiny)
+            gain = np.maximum(
+                1 - self.over_subtraction * noise / power, self.gain_floor
+            )
+            gain = np.where(self.band, gain, self.gain_floor)
+            frames = sp_fft.irfft(spectrum * gain, self.n_fft, axis=-1) * self.window
+
+            # Overlap-add: a frame spans n_fft / hop hops, so add each hop-sized
+            # slice of all frames in one vectorized step
+            count = frames.shape[-2]
+            length = (count - 1) * self.hop + self.n_fft
+            segment = np.zeros(data.shape[:-1] + (length,))
+            for k in range(self.n_fft // self.hop):
+                piece = frames[..., k * self.hop : (k + 1) * self.hop]
+                segment[
+                    ..., k * self.hop : k * self.hop + count * self.hop
+                ] += piece.reshape(data.shape[:-1] + (count * self.hop,))
+            lo, hi = max(start, 0), min(start + length, n)
+            out[..., lo:hi] += segment[..., lo - start : hi - start]
+
+        out /= self.norm
+        return out
+
+
+def spectral_denoiser(lowcut, highcut, fs):
+    """
+    Design a spectral-subtraction / Wiener denoiser for a band.
+
+    Parameters:
+    - lowcut: Low edge of the band where noise is reduced (Hz).
+    - highcut: High edge of the band where noise is reduced (Hz).
+    - fs: Sampling frequency (Hz).
+
+    Returns:
+    - SpectralDenoiser with the default settings.
+    """
+    return SpectralDenoiser(lowcut, highcut, fs)
@@ -0,0 +1,147 @@
+from collections import namedtuple
+
+import numpy as np
+
+from spectrum import FingerprintCache
+
+# Longest signal whose samples a pyramid keeps, so short signals can be drawn
+# sample by sample (longer ones are drawn from the finest level at most)
+SAMPLE_LEVEL_LIMIT = 65536
+
+# Peak-preserving view of a signal: bucket start times (s) and the min/max per bucket
+Envelope = namedtuple("Envelope", ["times", "minimum", "maximum"])
+
+
+def _reduce(minimum, maximum, factor):
+    # Merge every `factor` neighbouring buckets into one, keeping the extremes
+    full = len(minimum) // factor * factor
+    lower = minimum[:full].reshape(-1, factor).min(axis=1)
+    upper = maximum[:full].reshape(-1, factor).max(axis=1)
+    if full < len(minimum):
+        lower = np.append(lower, minimum[full:].min())
+        upper = np.append(upper, maximum[full:].max())
+    return lower, upper
+
+
+def _channel_extremes(data):
+    # Collapse any leading (channel) axes so one envelope covers every channel
+    if data.ndim == 1:
+        return data, data
+    leading = tuple(range(data.ndim - 1))
+    return data.min(axis=leading), data.max(axis=leading)
+
+
+def minmax_envelope(data, sr, max_points=5000):
+    """
+    Reduce a signal to at most `max_points` min/max buckets in one pass.
+
+    Unlike plain stride decimation, every bucket keeps its highest and lowest
+    sample, so transients and added noise tones stay visible. For multichannel
+    signals the buckets span all channels.
+
+    Parameters:
+    - data: Input audio signal (numpy array, time on the last axis).
+    - sr: Sampling rate.
+    - max_points: Maximum number of buckets to return.
+
+    Returns:
+    - Envelope(times, minimum, maximum) as float32 arrays.
+    """
+    bucket = max(1, -(-data.shape[-1] // max_points))  # Ceiling division
+    minimum, maximum = _reduce(*_channel_extremes(data), bucket)
+    times = np.arange(len(minimum), dtype=np.float32) * (bucket / sr)
+    return Envelope(times, minimum.astype(np.float32), maximum.astype(np.float32))
+
+
+class WaveformPyramid:
+    """
+    Multi-resolution min/max envelope of a signal.
+
+    The pyramid is built once per signal: the first level holds the min/max of
+    every `base_bucket` samples and each further level merges `factor` buckets of
+    the level below. A chart then only reads the level that fits its point budget,
+    so drawing an hour-long recording costs the same as drawing a short clip.
+    """
+
+    def __init__(self, data, sr, base_bucket=16, factor=2):
+        """
+        Parameters:
+        - data: Input audio signal (numpy array, time on the last axis; multichannel
+          signals share one envelope spanning all channels).
+        - sr: Sampling rate.
+        - base_bucket: Number of samples per bucket at the finest level.
+        - factor: Number of buckets merged from one level to the next.
+        """
+        self.length = data.shape[-1]
+        self.sr = sr
+        self.buckets = []  # Samples per bucket at each level
+        self.levels = []  # (minimum, maximum) float32 arrays at each level
+
+        # Only a float32 copy of the per-sample extremes of short signals is
+        # kept; the signal itself is not referenced, so caching a pyramid does
+        # not keep the recording alive
+        self.samples = None
+        if self.length <= SAMPLE_LEVEL_LIMIT:
+            minimum, maximum = _channel_extremes(data)
+            self.samples = (
+                np.array(minimum, dtype=np.float32),
+                np.array(maximum, dtype=np.float32),
+            )
+
+        bucket = base_bucket
+        minimum, maximum = _reduce(*_channel_extremes(data), base_bucket)
+        while True:
+            self.buckets.append(bucket)
+            self.levels.append((minimum.astype(np.float32), maximum.astype(np.float32)))
+            if len(minimum) <= 1:
+                break
+            minimum, maximum = _reduce(minimum, maximum, factor)
+            bucket *= factor
+
+    @property
+    def nbytes(self):
+        """
+        Memory held by the pyramid (its levels and, for short signals, the samples).
+        """
+        levels = self.levels + ([self.samples] if self.samples is not None else [])
+        return sum(lower.nbytes + upper.nbytes for lower, upper in levels)
+
+    def envelope(self, max_points=5000):
+        """
+        Return the finest envelope that fits within a point budget.
+
+        Parameters:
+        - max_points: Maximum number of points to plot.
+
+        Returns:
+        - Envelope(times, minimum, maximum) as float32 arrays.
+        """
+        if self.samples is not None and self.length <= max_points:
+            # Short signals are drawn sample by sample
+            minimum, maximum = self.samples
+            times = np.arange(len(minimum), dtype=np.float32) / self.sr
+            return Envelope(times, minimum, maximum)
+
+        for bucket, (minimum, maximum) in zip(self.buckets, self.levels):
+            if len(minimum) <= max_points:
+                times = np.arange(len(minimum), dtype=np.float32) * (bucket / self.sr)
+                return Envelope(times, minimum, maximum)
+
+
+# Pyramids are built once per signal and shared by all time-domain views
+pyramid_cache = FingerprintCache(WaveformPyramid, max_entries=16)
+
+
+def get_envelope(data, sr, max_points=5000):
+    """
+    Return a peak-preserving envelope of a signal from its (cached) pyramid.
+
+    Parameters:
+    - data: Input audio signal.
+    - sr: Sampling rate.
+    - max_points: Maximum number of points to plot.
+
+    Returns:
+    - Envelope(times, minimum, maximum) as float32 arrays.
+    """
+    return pyramid_cache.get(data, sr).envelope(max_points)
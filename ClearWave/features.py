@@ -0,0 +1,124 @@
+from collections import namedtuple
+
+import numpy as np
+from scipy import fft as sp_fft
+from scipy.signal import get_window
+
+from spectrum import FingerprintCache
+
+# Frame-wise spectral features of a signal, all float32 arrays of one value per frame
+SpectralFeatures = namedtuple(
+    "SpectralFeatures",
+    ["times", "centroid", "bandwidth", "flatness", "rolloff", "energy"],
+)
+
+# STFT settings, matching librosa's defaults so the values are comparable
+DEFAULT_N_FFT = 2048
+DEFAULT_HOP_LENGTH = 512
+DEFAULT_CHUNK_FRAMES = 1024
+ROLLOFF_PERCENT = 0.85
+FLATNESS_AMIN = 1e-10
+
+
+def _frame_chunk(data, first, count, n_fft, hop_length):
+    # Cut `count` centered frames starting at frame `first`, zero-padding past
+    # the signal edges the same way as librosa's center=True, pad_mode='constant'
+    start = first * hop_length - n_fft // 2
+    stop = start + (count - 1) * hop_length + n_fft
+    segment = np.zeros(data.shape[:-1] + (stop - start,), dtype=np.float32)
+    lo, hi = max(start, 0), min(stop, data.shape[-1])
+    if hi > lo:
+        segment[..., lo - start : hi - start] = data[..., lo:hi]
+    windows = np.lib.stride_tricks.sliding_window_view(segment, n_fft, axis=-1)
+    return windows[..., ::hop_length, :]
+
+
+def compute_features(
+    data,
+    sr,
+    n_fft=DEFAULT_N_FFT,
+    hop_length=DEFAULT_HOP_LENGTH,
+    chunk_frames=DEFAULT_CHUNK_FRAMES,
+):
+    """
+    Compute spectral centroid, bandwidth, flatness, rolloff and energy from a
+    single magnitude STFT.
+
+    The STFT is evaluated in float32, `chunk_frames` frames at a time, and every
+    feature is derived from the same chunk in one vectorized pass, so the full
+    spectrogram never has to be held in memory. Multichannel signals, shaped
+    (channels, samples), are analysed in the same batched pass.
+
+    Parameters:
+    - data: Input audio signal (numpy array, time on the last axis).
+    - sr: Sampling rate.
+    - n_fft: FFT window length.
+    - hop_length: Number of samples between frames.
+    - chunk_frames: Number of frames transformed at once (None for all frames).
+
+    Returns:
+    - SpectralFeatures with the frame times (s) and one value per frame (and
+      channel) for each feature.
+    """
+    n_frames = 1 + data.shape[-1] // hop_length
+    chunk_frames = chunk_frames or n_frames
+    window = get_window("hann", n_fft).astype(np.float32)
+    freqs = sp_fft.rfftfreq(n_fft, 1 / sr).astype(np.float32)
+
+    columns = {
+        name: np.empty(data.shape[:-1] + (n_frames,), dtype=np.float32)
+        for name in SpectralFeatures._fields
+    }
+    columns["times"] = np.empty(n_frames, dtype=np.float32)
+    columns["times"][:] = np.arange(n_frames) * hop_length / sr
+
+    for first in range(0, n_frames, chunk_frames):
+        count = min(chunk_frames, n_frames - first)
+        frames = _frame_chunk(data, first, count, n_fft, hop_length) * window
+        magnitude = np.abs(sp_fft.rfft(frames, axis=-1))  # (..., frames, bins)
+        power = np.square(magnitude)
+        rows = (Ellipsis, slice(first, first + count))
+
+        # Normalize each frame to unit sum; silent frames are left as they are
+        total = magnitude.sum(axis=-1, keepdims=True)
+        weights = magnitude / np.where(total > np.finfo(np.float32).tiny, total, 1)
+
+        # Centroid and bandwidth: mean and spread of the frequency distribution
+        centroid = weights @ freqs
+        columns["centroid"][rows] = centroid
+        deviation = np.square(freqs - centroid[..., np.newaxis])
+        columns["bandwidth"][rows] = np.sqrt(np.sum(weights * deviation, axis=-1))
+
+        # Rolloff: frequency below which ROLLOFF_PERCENT of the magnitude lies
+        cumulative = np.cumsum(magnitude, axis=-1)
+        threshold = ROLLOFF_PERCENT * cumulative[..., -1:]
+        columns["rolloff"][rows] = freqs[np.argmax(cumulative >= threshold, axis=-1)]
+
+        # Flatness: geometric over arithmetic mean of the power spectrum
+        clipped = np.maximum(power, FLATNESS_AMIN)
+        geometric = np.exp(np.mean(np.log(clipped), axis=-1))
+        columns["flatness"][rows] = geometric / np.mean(clipped, axis=-1)
+
+        columns["energy"][rows] = power.sum(axis=-1)
+
+    for values in columns.values():
+        values.setflags(write=False)  # Shared between views, keep immutable
+    return SpectralFeatures(**columns)
+
+
+# Feature cache shared by the cutoff suggestion and the analysis views
+feature_cache = FingerprintCache(compute_features, max_entries=16)
+
+
+def get_features(data, sr):
+    """
+    Return the (cached) spectral features of a signal.
+
+    Parameters:
+    - data: Input audio signal.
+    - sr: Sampling rate.
+
+    Returns:
+    - SpectralFeatures of the signal.
+    """
+    return feature_cache.get(data, sr)
@@ -0,0 +1,534 @@
+import functools
+
+import numpy as np
+from scipy.signal import (
+    butter,
+    firwin,
+    freqz,
+    sosfreqz,
+    iirfilter,
+    cheby1,
+    cheby2,
+    ellip,
+    bessel,
+    sos2zpk,
+    tf2zpk,
+)
+
+from adaptive import tone_canceller
+from denoise import spectral_denoiser
+from streaming import (
+    SOSBlockFilter,
+    filter_array,
+    fir_block_filter,
+    zero_phase_filter,
+)
+
+# Fallback ripple values used when a filter type needs them but none are given
+DEFAULT_RP = 0.5
+DEFAULT_RS = 20
+DEFAULT_NUMTAPS = 101
+
+
+def butter_bandpass(lowcut, highcut, fs, order=5):
+    """
+    Design a Butterworth band-pass filter, which provides a smooth frequency response.
+
+    Parameters:
+    - lowcut: Low cutoff frequency (Hz).
+    - highcut: High cutoff frequency (Hz).
+    - fs: Sampling frequency (Hz).
+    - order: Filter order, which defines the steepness of the filter transition.
+
+    Returns:
+    - sos: Second-order sections of the IIR filter, shape (n_sections, 6).
+    """
+    nyquist = 0.5 * fs  # Nyquist frequency, half the sampling rate
+    low = lowcut / nyquist  # Normalize the low cutoff frequency
+    high = highcut / nyquist  # Normalize the high cutoff frequency
+    sos = butter(
+        order, [low, high], btype="band", output="sos"
+    )  # Design Butterworth band-pass filter
+    return sos
+
+
+def fir_bandpass(lowcut, highcut, fs, numtaps=DEFAULT_NUMTAPS):
+    """
+    Design a FIR band-pass filter with a specified number of taps.
+
+    Parameters:
+    - lowcut: Low cutoff frequency (Hz).
+    - highcut: High cutoff frequency (Hz).
+    - fs: Sampling frequency (Hz).
+    - numtaps: Number of filter taps, controlling the filter order.
+
+    Returns:
+    - taps: FIR filter coefficients, defining the filter's impulse response.
+    """
+    nyquist = 0.5 * fs  # Nyquist frequency
+    taps = firwin(
+        numtaps, [lowcut / nyquist, highcut / nyquist], pass_zero=False
+    )  # Design FIR band-pass filter
+    return taps
+
+
+def iir_bandpass(lowcut, highcut, fs, order=5):
+    """
+    Design a general IIR band-pass filter (Butterworth by default).
+
+    Parameters:
+    - lowcut: Low cutoff frequency (Hz).
+    - highcut: High cutoff frequency (Hz).
+    - fs: Sampling frequency (Hz).
+    - order: Filter order.
+
+    Returns:
+    - sos: Second-order sections of the IIR filter, shape (n_sections, 6).
+    """
+    nyquist = 0.5 * fs  # Nyquist frequency
+    low = lowcut / nyquist  # Normalize low cutoff frequency
+    high = highcut / nyquist  # Normalize high cutoff frequency
+    sos = iirfilter(
+        order, [low, high], btype="band", ftype="butter", output="sos"
+    )  # Design IIR filter with Butterworth characteristics
+    return sos
+
+
+def cheby1_bandpass(lowcut, highcut, fs, order=5, rp=DEFAULT_RP):
+    """
+    Design a Chebyshev Type I band-pass filter with ripple in the passband.
+
+    Parameters:
+    - lowcut: Low cutoff frequency (Hz).
+    - highcut: High cutoff frequency (Hz).
+    - fs: Sampling frequency (Hz).
+    - order: Filter order.
+    - rp: Maximum ripple allowed in the passband (in dB).
+
+    Returns:
+    - sos: Second-order sections of the IIR filter, shape (n_sections, 6).
+    """
+    nyquist = 0.5 * fs  # Nyquist frequency
+    low = lowcut / nyquist  # Normalize low cutoff frequency
+    high = highcut / nyquist  # Normalize high cutoff frequency
+    sos = cheby1(
+        order, rp, [low, high], btype="band", output="sos"
+    )  # Design Chebyshev Type I band-pass filter
+    return sos
+
+
+def cheby2_bandpass(lowcut, highcut, fs, order=5, rs=DEFAULT_RS):
+    """
+    Design a Chebyshev Type II band-pass filter with attenuation in the stopband.
+
+    Parameters:
+    - lowcut: Low cutoff frequency (Hz).
+    - highcut: High cutoff frequency (Hz).
+    - fs: Sampling frequency (Hz).
+    - order: Filter order.
+    - rs: Minimum attenuation required in the stopband (in dB).
+
+    Returns:
+    - sos: Second-order sections of the IIR filter, shape (n_sections, 6).
+    """
+    nyquist = 0.5 * fs  # Nyquist frequency
+    low = lowcut / nyquist  # Normalize low cutoff frequency
+    high = highcut / nyquist  # Normalize high cutoff frequency
+    sos = cheby2(
+        order, rs, [low, high], btype="band", output="sos"
+    )  # Design Chebyshev Type II band-pass filter
+    return sos
+
+
+def ellip_bandpass(lowcut, highcut, fs, order=5, rp=DEFAULT_RP, rs=DEFAULT_RS):
+    """
+    Design an elliptic (Cauer) band-pass filter with ripple in the passband and stopband.
+
+    Parameters:
+    - lowcut: Low cutoff frequency (Hz).
+    - highcut: High cutoff frequency (Hz).
+    - fs: Sampling frequency (Hz).
+    - order: Filter order.
+    - rp: Maximum ripple allowed in the passband (in dB).
+    - rs: Minimum attenuation required in the stopband (in dB).
+
+    Returns:
+    - sos: Second-order sections of the IIR filter, shape (n_sections, 6).
+    """
+    nyquist = 0.5 * fs  # Nyquist frequency
+    low = lowcut / nyquist  # Normalize low cutoff frequency
+    high = highcut / nyquist  # Normalize high cutoff frequency
+    sos = ellip(
+        order, rp, rs, [low, high], btype="band", output="sos"
+    )  # Design elliptic band-pass filter
+    return sos
+
+
+def bessel_bandpass(lowcut, highcut, fs, order=5):
+    """
+    Design a Bessel band-pass filter with a maximally flat group delay.
+
+    Parameters:
+    - lowcut: Low cutoff frequency (Hz).
+    - highcut: High cutoff frequency (Hz).
+    - fs: Sampling frequency (Hz).
+    - order: Filter order.
+
+    Returns:
+    - sos: Second-order sections of the IIR filter, shape (n_sections, 6).
+    """
+    nyquist = 0.5 * fs  # Nyquist frequency
+    low = lowcut / nyquist  # Normalize low cutoff frequency
+    high = highcut / nyquist  # Normalize high cutoff frequency
+    sos = bessel(
+        order, [low, high], btype="band", output="sos"
+    )  # Design Bessel band-pass filter
+    return sos
+
+
+class FilterBank:
+    """
+    Registry of the available filter types with a bounded LRU cache of their designs.
+
+    Every filter is designed once per (type, lowcut, highcut, fs, order, rp, rs,
+    numtaps) and reused by the filtering, response and pole/zero views. IIR types
+    are kept as second-order sections so high orders stay numerically stable.
+    Non-linear types (the spectral denoiser, the adaptive canceller) are designed as an engine
+    object with an apply(data) method and have no fixed frequency response.
+    """
+
+    def __init__(self, cache_size=128):
+        """
+        Parameters:
+        - cache_size: Maximum number of filter designs kept in the cache.
+        """
+        self._designers = {}
+        self._design_cached = functools.lru_cache(maxsize=cache_size)(self._design)
+
+    def register(self, name, designer, params=("order",), fir=False, linear=True):
+        """
+        Register a filter type.
+
+        Parameters:
+        - name: Display name of the filter type (e.g., 'Butterworth Band-pass').
+        - designer: Function called as designer(lowcut, highcut, fs, **params).
+        - params: Names of the keyword parameters the designer takes
+          ('order', 'rp', 'rs', 'numtaps').
+        - fir: True if the designer returns FIR taps instead of second-order sections.
+        - linear: False if the designer returns a non-linear engine with an
+          apply(data) method instead of filter coefficients.
+        """
+        self._designers[name] = (designer, tuple(params), fir, linear)
+        self._design_cached.cache_clear()
+
+    @property
+    def names(self):
+        """
+        Names of all registered filter types, in registration order.
+        """
+        return list(self._designers)
+
+    def is_fir(self, filter_type):
+        """
+        Check whether a filter type is designed as FIR taps.
+        """
+        return self._designers[filter_type][2]
+
+    def is_linear(self, filter_type):
+        """
+        Check whether a filter type is a linear filter with a frequency response,
+        impulse response and poles/zeros.
+        """
+        return self._designers[filter_type][3]
+
+    def key(
+        self, filter_type, lowcut, highcut, fs, order=5, rp=None, rs=None, numtaps=None
+    ):
+        """
+        Build the cache key of a design, dropping parameters the type does not use
+        so that e.g. a ripple slider does not invalidate a Butterworth design.
+
+        Returns:
+        - Tuple (type, lowcut, highcut, fs, order, rp, rs, numtaps).
+        """
+        params = self._designers[filter_type][1]
+        order = order if "order" in params else None
+        rp = (rp if rp is not None else DEFAULT_RP) if "rp" in params else None
+        rs = (rs if rs is not None else DEFAULT_RS) if "rs" in params else None
+        if "numtaps" in params:
+            numtaps = numtaps if numtaps is not None else DEFAULT_NUMTAPS
+        else:
+            numtaps = None
+        return (filter_type, lowcut, highcut, fs, order, rp, rs, numtaps)
+
+    def _design(self, filter_type, lowcut, highcut, fs, order, rp, rs, numtaps):
+        designer, params, _, linear = self._designers[filter_type]
+        values = {"order": order, "rp": rp, "rs": rs, "numtaps": numtaps}
+        coeffs = designer(lowcut, highcut, fs, **{p: values[p] for p in params})
+        if linear:
+            coeffs.setflags(
+                write=False
+            )  # Cached designs are shared, keep them immutable
+        return coeffs
+
+    def design(
+        self,
+        filter_type,
+        lowcut,
+        highcut,
+        fs,
+        order=5,
+        rp=None,
+        rs=None,
+        numtaps=None,
+        cached=True,
+    ):
+        """
+        Return the (cached) design of a filter.
+
+        Parameters:
+        - cached: Set to False to always run the designer (e.g. to time it).
+
+        Returns:
+        - Second-order sections for IIR types, FIR taps for FIR types (a writable
+          copy, so it can be passed to sosfilt/sosfiltfilt directly), or the
+          engine of a non-linear type.
+        """
+        key = self.key(filter_type, lowcut, highcut, fs, order, rp, rs, numtaps)
+        coeffs = self._design_cached(*key) if cached else self._design(*key)
+        if self.is_linear(filter_type):
+            # The cached arrays stay read-only; every caller gets its own copy
+            return coeffs.copy()
+        return coeffs
+
+    def block_filter(
+        self,
+        filter_type,
+        lowcut,
+        highcut,
+        fs,
+        order=5,
+        rp=None,
+        rs=None,
+        numtaps=None,
+        fir_method="auto",
+        length=None,
+    ):
+        """
+        Create a streaming filter (with its own carried state) for a design.
+
+        Parameters:
+        - fir_method: FIR execution mode, 'direct', 'fft' (overlap-add) or 'auto'.
+        - length: Signal length in samples, used to pick the cheaper FIR mode.
+
+        Returns:
+        - A fresh SOSBlockFilter (IIR), BlockFilter / OverlapAddFIR (FIR), or a
+          fresh engine of a non-linear type that can run block by block.
+
+        Raises:
+        - ValueError: If a non-linear type needs the whole signal at once.
+        """
+        if not self.is_linear(filter_type):
+            # Designed uncached, so every stream gets its own carried state
+            engine = self.design(
+                filter_type, lowcut, highcut, fs, order, rp, rs, numtaps, cached=False
+            )
+            if not hasattr(engine, "process"):
+                raise ValueError(f"{filter_type} cannot run block by block")
+            return engine
+        coeffs = self.design(filter_type, lowcut, highcut, fs, order, rp, rs, numtaps)
+        if self.is_fir(filter_type):
+            return fir_block_filter(coeffs, fir_method, length)
+        return SOSBlockFilter(coeffs)
+
+    def apply(
+        self,
+        data,
+        filter_type,
+        lowcut,
+        highcut,
+        fs,
+        order=5,
+        rp=None,
+        rs=None,
+        numtaps=None,
+        fir_method="auto",
+        zero_phase=False,
+        padtype="odd",
+        padlen=None,
+    ):
+        """
+        Filter a signal with the selected design (sosfilt for IIR types, direct
+        or overlap-add FFT convolution for FIR types, the engine's own chunked
+        processing for non-linear types).
+
+        Parameters:
+        - zero_phase: Filter forward and backward (sosfiltfilt / filtfilt) for an
+          output without phase distortion and a squared magnitude response.
+          Ignored by non-linear types, whose real spectral gains add no phase shift.
+        - padtype: Edge extension used in zero-phase mode ('odd', 'even', 'constant' or None).
+        - padlen: Number of samples of edge extension in zero-phase mode (None for the default).
+
+        Returns:
+        - Filtered audio data (numpy array).
+        """
+        if not self.is_linear(filter_type):
+            engine = self.design(
+                filter_type, lowcut, highcut, fs, order, rp, rs, numtaps
+            )
+            return engine.apply(data)
+        if zero_phase:
+            coeffs = self.design(
+                filter_type, lowcut, highcut, fs, order, rp, rs, numtaps
+            )
+            return zero_phase_filter(
+                data, coeffs, self.is_fir(filter_type), padtype, padlen
+            )
+        block_filter = self.block_filter(
+            filter_type,
+            lowcut,
+            highcut,
+            fs,
+            order,
+            rp,
+            rs,
+            numtaps,
+            fir_method,
+            length=data.shape[-1],
+        )
+        return filter_array(data, block_filter)
+
+    def frequency_response(
+        self,
+        filter_type,
+        lowcut,
+        highcut,
+        fs,
+        order=5,
+        rp=None,
+        rs=None,
+        numtaps=None,
+        worN=2000,
+        zero_phase=False,
+    ):
+        """
+        Evaluate the complex frequency response of a design.
+
+        Parameters:
+        - zero_phase: Return the effective response of forward-backward filtering,
+          |H|^2 with zero phase.
+
+        Returns:
+        - w: Normalized frequencies (radians/sample).
+        - h: Complex frequency response values.
+
+        Raises:
+        - ValueError: If the filter type is not linear.
+        """
+        self._check_linear(filter_type)
+        coeffs = self.design(filter_type, lowcut, highcut, fs, order, rp, rs, numtaps)
+        if self.is_fir(filter_type):
+            w, h = freqz(coeffs, 1.0, worN=worN)
+        else:
+            w, h = sosfreqz(coeffs, worN=worN)
+        if zero_phase:
+            h = (np.abs(h) ** 2).astype(h.dtype)
+        return w, h
+
+    def zpk(
+        self, filter_type, lowcut, highcut, fs, order=5, rp=None, rs=None, numtaps=None
+    ):
+        """
+        Return the zeros, poles and gain of a design.
+
+        Raises:
+        - ValueError: If the filter type is not linear.
+        """
+        self._check_linear(filter_type)
+        coeffs = self.design(filter_type, lowcut, highcut, fs, order, rp, rs, numtaps)
+        if self.is_fir(filter_type):
+            return tf2zpk(coeffs, 1.0)
+        return sos2zpk(coeffs)
+
+    def _check_linear(self, filter_type):
+        if not self.is_linear(filter_type):
+            raise ValueError(f"{filter_type} has no fixed frequency response")
+
+    def cache_info(self):
+        """
+        Hit/miss statistics of the design cache.
+        """
+        return self._design_cached.cache_info()
+
+
+# Shared registry of the filter types offered by ClearWave: seven band-pass
+# designs, the spectral denoiser and the adaptive tone canceller
+filter_bank = FilterBank()
+filter_bank.register("Butterworth Band-pass", butter_bandpass)
+filter_bank.register("FIR Band-pass", fir_bandpass, ("numtaps",), fir=True)
+filter_bank.register("IIR Band-pass", iir_bandpass)
+filter_bank.register("Chebyshev Type I Band-pass", cheby1_bandpass, ("order", "rp"))
+filter_bank.register("Chebyshev Type II Band-pass", cheby2_bandpass, ("order", "rs"))
+filter_bank.register("Elliptic Band-pass", ellip_bandpass, ("order", "rp", "rs"))
+filter_bank.register("Bessel Band-pass", bessel_bandpass)
+filter_bank.register(
+    "Spectral Subtraction / Wiener", spectral_denoiser, (), linear=False
+)
+filter_bank.register("Adaptive Tone Canceller (NLMS)", tone_canceller, (), linear=False)
+
+
+def apply_filter(
+    data,
+    lowcut,
+    highcut,
+    fs,
+    filter_type,
+    order=5,
+    rp=None,
+    rs=None,
+    numtaps=None,
+    fir_method="auto",
+    zero_phase=False,
+    padtype="odd",
+    padlen=None,
+):
+    """
+    Apply the selected filter type to the input audio data.
+
+    The design comes from the shared filter bank, and the signal is filtered in
+    fixed-size blocks with the filter state carried between blocks (or, in
+    zero-phase mode, forward and backward in overlapping chunks).
+
+    Parameters:
+    - data: Input audio data (numpy array).
+    - lowcut: Low cutoff frequency (Hz).
+    - highcut: High cutoff frequency (Hz).
+    - fs: Sampling frequency (Hz).
+    - filter_type: Type of filter to apply (e.g., 'Butterworth', 'FIR').
+    - order: Filter order (applicable to IIR filters).
+    - rp: Passband ripple (dB) for Chebyshev I and Elliptic filters (optional).
+    - rs: Stopband attenuation (dB) for Chebyshev II and Elliptic filters (optional).
+    - numtaps: Number of taps for the FIR filter (optional).
+    - fir_method: FIR execution mode, 'direct', 'fft' (overlap-add) or 'auto'.
+    - zero_phase: Filter forward and backward for an output without phase distortion.
+    - padtype: Edge extension used in zero-phase mode ('odd', 'even', 'constant' or None).
+    - padlen: Number of samples of edge extension in zero-phase mode (None for the default).
+
+    Returns:
+    - Filtered audio data (numpy array).
+    """
+    return filter_bank.apply(
+        data,
+        filter_type,
+        lowcut,
+        highcut,
+        fs,
+        order,
+        rp,
+        rs,
+        numtaps,
+        fir_method,
+        zero_phase,
+        padtype,
+        padlen,
+    )  # Stream the data through the cached design
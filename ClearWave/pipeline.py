@@ -0,0 +1,301 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from adaptive import HUM_FREQUENCY, WHINE_FREQUENCY
+from analysis import (
+    calculate_snr,
+    snr_spectrum,
+    suggest_bandpass_values,
+    suggest_bandpass_values_welch,
+)
+from audio_io import load_audio
+from filters import apply_filter, filter_bank
+from previews import get_preview
+from profiling import stage
+from signals import SignalHandle, output_dtype
+from spectrum import get_spectrum
+from streaming import DEFAULT_BLOCKSIZE
+
+# One evaluated node of an interaction: whether it was recomputed and how long it took (s)
+NodeRun = namedtuple("NodeRun", ["name", "recomputed", "seconds"])
+
+# Loaded recording: the samples (SignalHandle, 1-D for mono) and the sampling rate
+Loaded = namedtuple("Loaded", ["signal", "sr"])
+
+# Quality metrics of a cleaned signal: overall SNR (dB), SNR per channel (None
+# for mono) and the SNR per log-spaced frequency bin
+Metrics = namedtuple("Metrics", ["snr", "channel_snr", "snr_spectrum"])
+
+
+class Pipeline:
+    """
+    Dependency graph of memoized processing steps.
+
+    Every node declares its inputs, which are parameters (set with `update`) or
+    other nodes. A node keeps its last value together with the tokens of the
+    inputs it was computed from, and is recomputed only when one of them
+    changes. Nodes producing a value that is equal to the previous one (e.g. a
+    design whose key is unchanged) keep their token, so nothing downstream of
+    them is recomputed either. Nodes are evaluated lazily, on first access.
+    """
+
+    def __init__(self):
+        self._nodes = {}  # name -> (function, input names)
+        self._memo = {}  # name -> (input tokens, value, token)
+        self._params = {}
+        self._runs = {}
+
+    def node(self, name, inputs=()):
+        """
+        Register a node; use as a decorator.
+
+        Parameters:
+        - name: Name of the node.
+        - inputs: Names of the parameters and nodes passed to the function, in order.
+        """
+
+        def register(function):
+            self._nodes[name] = (function, tuple(inputs))
+            self._memo.pop(name, None)
+            return function
+
+        return register
+
+    def update(self, **params):
+        """
+        Set parameter values. Parameters must be hashable and comparable
+        (signals are passed as SignalHandles).
+        """
+        self._params.update(params)
+
+    def begin(self):
+        """
+        Start a new interaction: forget which nodes were evaluated.
+        """
+        self._runs = {}
+
+    @property
+    def runs(self):
+        """
+        NodeRun of every node evaluated since `begin`, in evaluation order.
+        """
+        return list(self._runs.values())
+
+    def _evaluate(self, name):
+        # Return (value, token) of a parameter or node
+        if name not in self._nodes:
+            value = self._params[name]
+            return value, ("param", value)
+
+        function, inputs = self._nodes[name]
+        evaluated = [self._evaluate(i) for i in inputs]
+        key = tuple(token for _, token in evaluated)
+        memo = self._memo.get(name)
+        if memo is not None and memo[0] == key:
+            self._runs.setdefault(name, NodeRun(name, False, 0.0))
+            return memo[1], memo[2]
+
+        start = time.perf_counter()
+        with stage(f"pipeline.{name}"):
+            value = function(*(value for value, _ in evaluated))
+        seconds = time.perf_counter() - start
+        token = _token(value, (name, key))
+        if memo is not None and memo[2] == token:
+            value = memo[1]  # Same result as before; keep the downstream cache valid
+        self._memo[name] = (key, value, token)
+        self._runs[name] = NodeRun(name, True, seconds)
+        return value, token
+
+    def __getitem__(self, name):
+        """
+        Return the value of a node (or parameter), recomputing it only if its inputs changed.
+        """
+        return self._evaluate(name)[0]
+
+
+def _token(value, fallback):
+    # Identify a node's value: signals by their fingerprint, small hashable
+    # values by themselves, anything else by the inputs it was computed from
+    if isinstance(value, SignalHandle):
+        return ("signal", value.fingerprint)
+    if isinstance(value, (str, int, float, bool, bytes, type(None))):
+        return ("value", value)
+    if isinstance(value, tuple) and all(
+        isinstance(item, (str, int, float, bool, type(None), np.number))
+        for item in value
+    ):
+        return ("value", value)
+    return fallback
+
+
+def add_synthetic_noise(audio_data, sr, noise_type, noise_level):
+    """
+    Add the synthetic hum (low frequency) and/or whine (high frequency) tones.
+
+    The tones are synthesized block by block and added in place to one copy of
+    the signal in the signal type, so no full-length float64 time or noise
+    arrays are created. Phases are computed in float64, which keeps the tones
+    exact late into long recordings even in float32.
+
+    Parameters:
+    - audio_data: Input audio signal (time on the last axis).
+    - sr: Sampling rate.
+    - noise_type: 'Low Frequency', 'High Frequency' or 'Both'.
+    - noise_level: Amplitude of each tone.
+
+    Returns:
+    - Noisy audio, the same noise on every channel.
+    """
+    noisy = np.array(audio_data, dtype=output_dtype(audio_data))
+    tones = []
+    if noise_type in ["Low Frequency", "Both"]:
+        tones.append(HUM_FREQUENCY)
+    if noise_type in ["High Frequency", "Both"]:
+        tones.append(WHINE_FREQUENCY)
+    n_samples = noisy.shape[-1]
+    # Same time axis as np.linspace(0, duration, n_samples)
+    step = (n_samples / sr) / (n_samples - 1) if n_samples > 1 else 0.0
+    for start in range(0, n_samples, DEFAULT_BLOCKSIZE):
+        time_axis = np.arange(start, min(start + DEFAULT_BLOCKSIZE, n_samples)) * step
+        block = noisy[..., start : start + time_axis.size]
+        for frequency in tones:
+            block += noise_level * np.sin(2 * np.pi * frequency * time_axis)
+    return noisy
+
+
+def suggest_cutoffs(signal, sr, estimator, analysis_range):
+    """
+    Suggest band-pass cutoffs with the selected estimator.
+
+    Parameters:
+    - signal: Audio signal (SignalHandle).
+    - sr: Sampling rate.
+    - estimator: 'fft' (one FFT of the whole signal) or 'welch' (averaged periodograms).
+    - analysis_range: (start, stop) time range (s) analysed by the Welch estimator.
+
+    Returns:
+    - (lowcut, highcut) in Hz.
+    """
+    if estimator == "welch":
+        return suggest_bandpass_values_welch(signal, sr, *analysis_range)
+    return suggest_bandpass_values(signal, sr)
+
+
+def build_pipeline():
+    """
+    Build ClearWave's processing graph.
+
+    Parameters (set with Pipeline.update):
+    - upload: Raw bytes of the uploaded file (SignalHandle of a uint8 array,
+      identified by a full content hash).
+    - add_noise, noise_type, noise_level: Synthetic noise settings.
+    - estimator, analysis_range: Cutoff estimator ('fft' or 'welch') and Welch range (s).
+    - filter_type, lowcut, highcut, order, rp, rs, numtaps: Filter design.
+    - fir_method, zero_phase: Filter execution.
+    - preview_format, preview_seconds, preview_rate: Encoding, optional length
+      cap (s) and optional maximum sampling rate (Hz) of the audio previews.
+
+    Returns:
+    - Pipeline with the nodes load, noise, suggestion, noisy_suggestion, design,
+      adaptive (the AdaptiveResult of an adaptive filter type, None otherwise),
+      filter, spectra, metrics, noisy_preview and cleaned_preview.
+    """
+    pipeline = Pipeline()
+
+    @pipeline.node("load", ["upload"])
+    def load(upload):
+        audio_data, sr = load_audio(upload.data, mono=False)
+        if audio_data.shape[0] == 1:
+            audio_data = audio_data[0]  # Mono files are processed as 1-D signals
+        return Loaded(SignalHandle(audio_data), sr)
+
+    @pipeline.node("noise", ["load", "add_noise", "noise_type", "noise_level"])
+    def noise(loaded, add_noise, noise_type, noise_level):
+        if not add_noise:
+            return loaded.signal
+        return SignalHandle(
+            add_synthetic_noise(loaded.signal.data, loaded.sr, noise_type, noise_level)
+        )
+
+    @pipeline.node("suggestion", ["load", "estimator", "analysis_range"])
+    def suggestion(loaded, estimator, analysis_range):
+        return suggest_cutoffs(loaded.signal, loaded.sr, estimator, analysis_range)
+
+    @pipeline.node("noisy_suggestion", ["noise", "load", "estimator", "analysis_range"])
+    def noisy_suggestion(noisy, loaded, estimator, analysis_range):
+        return suggest_cutoffs(noisy, loaded.sr, estimator, analysis_range)
+
+    @pipeline.node(
+        "design",
+        ["load", "filter_type", "lowcut", "highcut", "order", "rp", "rs", "numtaps"],
+    )
+    def design(loaded, filter_type, lowcut, highcut, order, rp, rs, numtaps):
+        # Normalized design key (unused parameters dropped); designing here
+        # warms the filter bank's cache for the response plots
+        key = filter_bank.key(
+            filter_type, lowcut, highcut, loaded.sr, order, rp, rs, numtaps
+        )
+        filter_bank.design(*key)
+        return key
+
+    @pipeline.node("adaptive", ["noise", "design"])
+    def adaptive(noisy, key):
+        # Adaptive engines record their convergence while they filter; the
+        # whole run is kept so the convergence plots need no second pass
+        if filter_bank.is_linear(key[0]):
+            return None
+        engine = filter_bank.design(*key)
+        return engine.run(noisy.data) if hasattr(engine, "run") else None
+
+    @pipeline.node(
+        "filter", ["noise", "design", "fir_method", "zero_phase", "adaptive"]
+    )
+    def filtered(noisy, key, fir_method, zero_phase, adaptive_run):
+        if adaptive_run is not None:
+            return SignalHandle(adaptive_run.output)
+        filter_type, lowcut, highcut, fs, order, rp, rs, numtaps = key
+        cleaned = apply_filter(
+            noisy.data,
+            lowcut,
+            highcut,
+            fs,
+            filter_type,
+            order,
+            rp,
+            rs,
+            numtaps,
+            fir_method,
+            zero_phase,
+        )
+        return SignalHandle(cleaned)
+
+    @pipeline.node("spectra", ["noise", "filter", "load"])
+    def spectra(noisy, cleaned, loaded):
+        return get_spectrum(noisy, loaded.sr), get_spectrum(cleaned, loaded.sr)
+
+    @pipeline.node("metrics", ["noise", "filter", "spectra", "load"])
+    def metrics(noisy, cleaned, spectra, loaded):
+        channel_snr = None
+        if noisy.ndim > 1:
+            channel_snr = calculate_snr(noisy, cleaned, per_channel=True)
+        return Metrics(
+            calculate_snr(noisy, cleaned),
+            channel_snr,
+            snr_spectrum(*spectra, loaded.sr),
+        )
+
+    # Previews are encoded only when a player asks for them, and the encoded
+    # bytes are cached by fingerprint, so revisiting a setting costs nothing
+    preview_settings = ["preview_format", "preview_seconds", "preview_rate"]
+
+    @pipeline.node("noisy_preview", ["noise", "load"] + preview_settings)
+    def noisy_preview(noisy, loaded, *settings):
+        return get_preview(noisy, loaded.sr, *settings)
+
+    @pipeline.node("cleaned_preview", ["filter", "load"] + preview_settings)
+    def cleaned_preview(cleaned, loaded, *settings):
+        return get_preview(cleaned, loaded.sr, *settings)
+
+    return pipeline
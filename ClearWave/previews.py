@@ -0,0 +1,142 @@
+import io
+from collections import namedtuple
+from fractions import Fraction
+
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
+
+from spectrum import FingerprintCache
+from streaming import iter_blocks
+
+# Preview encodings offered by the app: libsndfile format, subtype and MIME type
+PREVIEW_FORMATS = {
+    "Ogg Vorbis": ("OGG", "VORBIS", "audio/ogg"),
+    "Ogg Opus": ("OGG", "OPUS", "audio/ogg"),
+    "FLAC": ("FLAC", "PCM_16", "audio/flac"),
+    "WAV": ("WAV", "PCM_16", "audio/wav"),
+}
+DEFAULT_PREVIEW_FORMAT = "Ogg Vorbis"
+
+# Sampling rates (Hz) Opus can encode; other rates are resampled to the next one up
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+
+# Number of frames encoded per write, which bounds the temporary copies
+PREVIEW_BLOCKSIZE = 65536
+
+# Encoded preview: the file bytes, their MIME type, the preview's sampling rate
+# and whether the signal was cut at the length cap
+Preview = namedtuple("Preview", ["data", "mime", "sr", "truncated"])
+
+
+def preview_rate(sr, subtype, max_rate=None):
+    """
+    Choose the sampling rate of a preview.
+
+    Parameters:
+    - sr: Sampling rate of the signal.
+    - subtype: libsndfile subtype of the encoding.
+    - max_rate: Optional upper limit (Hz) for a downsampled preview.
+
+    Returns:
+    - Sampling rate (Hz) the preview is encoded at.
+    """
+    rate = min(sr, max_rate) if max_rate else sr
+    if subtype == "OPUS":
+        rate = next((r for r in OPUS_RATES if r >= rate), OPUS_RATES[-1])
+    return int(rate)
+
+
+def resampled_blocks(data, up, down, blocksize=PREVIEW_BLOCKSIZE):
+    """
+    Resample a signal by up/down in consecutive blocks, with the same output as
+    one scipy.signal.resample_poly call but only one block of temporaries.
+
+    Every block starts on a sample shared by the input and output grids and is
+    resampled together with enough real context on both sides to cover the
+    reach of resample_poly's polyphase filter, which is then discarded.
+
+    Parameters:
+    - data: Audio data (numpy array, time on the last axis).
+    - up: Upsampling factor.
+    - down: Downsampling factor.
+    - blocksize: Approximate number of input samples per block.
+
+    Yields:
+    - Consecutive resampled blocks (time on the last axis).
+    """
+    n = data.shape[-1]
+    n_out = -(-n * up // down)
+    # resample_poly's filter has 10 * max(up, down) taps on each side at the
+    # upsampled rate; the context is rounded up to whole periods of `down`
+    # input samples, so every block starts on the output grid
+    reach = -(-10 * max(up, down) // up) + 1
+    context = -(-reach // down) * down
+    step = max(blocksize // down, 1) * down
+    for start in range(0, n, step):
+        lo, hi = max(start - context, 0), min(start + step + context, n)
+        resampled = resample_poly(data[..., lo:hi], up, down, axis=-1)
+        first = (start - lo) * up // down
+        count = min((start + step) * up // down, n_out) - start * up // down
+        yield resampled[..., first : first + count]
+
+
+def encode_preview(data, sr, preview_format, max_seconds=None, max_rate=None):
+    """
+    Encode a signal for the audio player.
+
+    Parameters:
+    - data: Audio data (numpy array, time on the last axis).
+    - sr: Sampling rate.
+    - preview_format: Key of PREVIEW_FORMATS.
+    - max_seconds: Optional cap on the preview length (s).
+    - max_rate: Optional upper limit (Hz) of the preview's sampling rate.
+
+    Returns:
+    - Preview(data, mime, sr, truncated).
+    """
+    file_format, subtype, mime = PREVIEW_FORMATS[preview_format]
+    truncated = max_seconds is not None and data.shape[-1] > max_seconds * sr
+    if truncated:
+        data = data[..., : int(max_seconds * sr)]
+
+    rate = preview_rate(sr, subtype, max_rate)
+    if rate != sr:
+        # Resampled block by block on the way to the encoder
+        ratio = Fraction(rate, sr).limit_denominator(1000)
+        blocks = resampled_blocks(data, ratio.numerator, ratio.denominator)
+    else:
+        blocks = iter_blocks(data, PREVIEW_BLOCKSIZE)
+
+    channels = 1 if data.ndim == 1 else data.shape[0]
+    buffer = io.BytesIO()
+    with sf.SoundFile(
+        buffer, "w", rate, channels, format=file_format, subtype=subtype
+    ) as outfile:
+        for block in blocks:
+            # soundfile expects (frames, channels); lossy encoders need [-1, 1]
+            outfile.write(np.clip(block, -1.0, 1.0).T)
+    return Preview(buffer.getvalue(), mime, rate, truncated)
+
+
+# Encoded previews, keyed by the signal's fingerprint and the encoding settings
+preview_cache = FingerprintCache(encode_preview, max_entries=16)
+
+
+def get_preview(
+    data, sr, preview_format=DEFAULT_PREVIEW_FORMAT, max_seconds=None, max_rate=None
+):
+    """
+    Return the (cached) encoded preview of a signal.
+
+    Parameters:
+    - data: Audio data (numpy array, or a SignalHandle).
+    - sr: Sampling rate.
+    - preview_format: Key of PREVIEW_FORMATS.
+    - max_seconds: Optional cap on the preview length (s).
+    - max_rate: Optional upper limit (Hz) of the preview's sampling rate.
+
+    Returns:
+    - Preview(data, mime, sr, truncated).
+    """
+    return preview_cache.get(data, sr, preview_format, max_seconds, max_rate)
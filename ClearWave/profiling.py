@@ -0,0 +1,231 @@
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import namedtuple
+
+# Measurements of one profiled stage: wall and CPU time (s), peak bytes
+# allocated above the stage's starting point (None unless allocations are
+# tracked), cache hits and misses during the stage, and the nesting depth
+Stage = namedtuple(
+    "Stage",
+    [
+        "name",
+        "wall_s",
+        "cpu_s",
+        "allocated_bytes",
+        "cache_hits",
+        "cache_misses",
+        "depth",
+    ],
+)
+
+# Trace file the app may append its measurements to, set on the server (the
+# path is never taken from the browser); None disables tracing
+TRACE_PATH = os.environ.get("CLEARWAVE_TRACE") or None
+
+# Profiler of the current thread (Streamlit runs each session's script in its own thread)
+_local = threading.local()
+
+# tracemalloc is process-wide: it runs while at least one profiler tracks
+# allocations, so one session switching tracking off does not stop another's
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+
+def _acquire_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users += 1
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+
+def _release_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users = max(0, _tracing_users - 1)
+        if _tracing_users == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def _counters():
+    # Hits and misses of the fingerprint caches plus the filter design cache.
+    # The modules are looked up rather than imported, so profiling does not
+    # pull in scipy before the app needs it (no module, no cache activity).
+    hits = misses = 0
+    spectrum = sys.modules.get("spectrum")
+    if spectrum is not None:
+        hits, misses = spectrum.cache_counters()
+    filters = sys.modules.get("filters")
+    if filters is not None:
+        info = filters.filter_bank.cache_info()
+        hits, misses = hits + info.hits, misses + info.misses
+    return hits, misses
+
+
+class Profiler:
+    """
+    Per-rerun recorder of the time, allocations and cache activity of every
+    processing and plotting stage.
+
+    Stages may nest (e.g. a pipeline node evaluated inside a plot); each is
+    measured inclusively of its children. Allocation tracking uses tracemalloc,
+    which slows Python-level code down noticeably, so it is off by default.
+
+    Cache hits and misses come from process-wide counters, and tracemalloc
+    traces the whole process, so with several sessions running at once a
+    stage's cache counts and allocations include the other sessions' activity.
+    """
+
+    def __init__(self, track_memory=False):
+        """
+        Parameters:
+        - track_memory: Record the peak bytes allocated by every stage.
+        """
+        self.track_memory = track_memory
+        self.stages = []
+        self.started = time.perf_counter()
+        self._depth = 0
+        self._stack = []  # Per open traced stage: [start bytes, highest peak seen]
+        self._tracing = False  # Whether this profiler holds a tracemalloc user
+
+    def begin(self):
+        """
+        Start a new rerun: drop the stages recorded so far and register or
+        unregister this profiler as a user of tracemalloc as configured.
+        """
+        self.stages = []
+        self.started = time.perf_counter()
+        self._depth = 0
+        self._stack = []
+        if self.track_memory != self._tracing:
+            if self.track_memory:
+                _acquire_tracing()
+            else:
+                _release_tracing()
+            self._tracing = self.track_memory
+
+    def close(self):
+        """
+        Stop tracking allocations (tracemalloc stops once no profiler tracks them).
+        """
+        if self._tracing:
+            self._tracing = False
+            _release_tracing()
+
+    def __del__(self):
+        # A session ending drops its profiler; release its tracemalloc user
+        self.close()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Measure the enclosed block as a stage called `name`.
+        """
+        tracing = self._tracing and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                # Keep the enclosing stage's peak before resetting it for this one
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            self._stack.append([current, current])
+        depth = self._depth
+        self._depth += 1
+        self.stages.append(None)  # Placeholder keeps the stages in call order
+        index = len(self.stages) - 1
+        hits, misses = _counters()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            self._depth -= 1
+            end_hits, end_misses = _counters()
+            allocated = None
+            if tracing:
+                start, highest = self._stack.pop()
+                peak = max(tracemalloc.get_traced_memory()[1], highest)
+                allocated = max(0, peak - start)
+                if self._stack:
+                    self._stack[-1][1] = max(self._stack[-1][1], peak)
+            self.stages[index] = Stage(
+                name,
+                wall,
+                cpu,
+                allocated,
+                end_hits - hits,
+                end_misses - misses,
+                depth,
+            )
+
+    def elapsed(self):
+        """
+        Wall time (s) since the start of the rerun.
+        """
+        return time.perf_counter() - self.started
+
+    def summary(self):
+        """
+        Return the recorded stages as a list of dicts (for tables and traces).
+        """
+        return [stage._asdict() for stage in self.stages if stage is not None]
+
+    def write_trace(self, path, **context):
+        """
+        Append the stages of this rerun as one JSON line to a trace file.
+
+        Parameters:
+        - path: Path of the JSONL trace file.
+        - context: Extra fields stored with the record (e.g. the filter type).
+        """
+        record = {"timestamp": time.time(), **context, "stages": self.summary()}
+        with open(path, "a") as trace:
+            trace.write(json.dumps(record, default=str) + "\n")
+
+
+def activate(profiler):
+    """
+    Make `profiler` record the stages of the current thread (None to stop recording).
+    """
+    _local.profiler = profiler
+
+
+@contextlib.contextmanager
+def stage(name):
+    """
+    Measure the enclosed block with the active profiler, if any.
+    """
+    profiler = getattr(_local, "profiler", None)
+    if profiler is None:
+        yield
+    else:
+        with profiler.stage(name):
+            yield
+
+
+def profiled(name=None):
+    """
+    Decorator measuring every call of a function with the active profiler, if any.
+
+    Parameters:
+    - name: Stage name (defaults to the function's name).
+    """
+
+    def decorate(function):
+        stage_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,148 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+import soundfile as sf
+
+from audio_io import AudioSource
+from signals import signal_dtype
+
+# Frame sizes (samples) offered for the real-time simulation
+FRAME_SIZES = (64, 128, 256, 512, 1024, 2048)
+DEFAULT_FRAME_SIZE = 256
+
+# Summary of a real-time run: the per-frame processing times (s), the frame
+# deadline (s) and the derived latency statistics
+RealtimeReport = namedtuple(
+    "RealtimeReport",
+    [
+        "frame_size",
+        "sr",
+        "frames",
+        "deadline_s",
+        "timings_s",
+        "mean_s",
+        "p50_s",
+        "p99_s",
+        "max_s",
+        "misses",
+        "miss_rate",
+        "realtime_factor",
+    ],
+)
+
+
+def summarize(timings, frame_size, sr):
+    """
+    Derive the latency statistics of a run from its per-frame processing times.
+
+    Parameters:
+    - timings: Processing time of every frame (s).
+    - frame_size: Number of samples per frame.
+    - sr: Sampling rate.
+
+    Returns:
+    - RealtimeReport of the run.
+    """
+    timings = np.asarray(timings, dtype=np.float64)
+    deadline = frame_size / sr  # A frame must be done before the next one arrives
+    misses = int(np.count_nonzero(timings > deadline))
+    mean = float(timings.mean()) if timings.size else 0.0
+    p50, p99 = np.percentile(timings, [50, 99]) if timings.size else (0.0, 0.0)
+    return RealtimeReport(
+        frame_size=frame_size,
+        sr=sr,
+        frames=timings.size,
+        deadline_s=deadline,
+        timings_s=timings,
+        mean_s=mean,
+        p50_s=float(p50),
+        p99_s=float(p99),
+        max_s=float(timings.max()) if timings.size else 0.0,
+        misses=misses,
+        miss_rate=misses / timings.size if timings.size else 0.0,
+        realtime_factor=deadline / mean if mean else float("inf"),
+    )
+
+
+def simulate(frames, block_filter, sr, frame_size, sink=None):
+    """
+    Feed frames through a streaming filter one at a time, as a live audio
+    callback would, and time the processing of every frame.
+
+    Only the filter's `process` call is timed; reading the input and writing the
+    output are left out, as they are the audio driver's job in a live pipeline.
+
+    Parameters:
+    - frames: Iterable of consecutive frames (time on the last axis).
+    - block_filter: Fresh streaming filter with a `process(block)` method.
+    - sr: Sampling rate.
+    - frame_size: Nominal number of samples per frame (sets the deadline).
+    - sink: Optional callable receiving every processed frame.
+
+    Returns:
+    - RealtimeReport of the run.
+    """
+    timings = []
+    for frame in frames:
+        start = time.perf_counter()
+        out = block_filter.process(frame)
+        timings.append(time.perf_counter() - start)
+        if sink is not None:
+            sink(out)
+    return summarize(timings, frame_size, sr)
+
+
+def simulate_file(path, block_filter, frame_size=DEFAULT_FRAME_SIZE, output=None):
+    """
+    Run a recording through a streaming filter in real-time sized frames.
+
+    Parameters:
+    - path: Path of the input audio file.
+    - block_filter: Fresh streaming filter with a `process(block)` method.
+    - frame_size: Number of samples per frame.
+    - output: Optional path of a WAV file for the processed audio.
+
+    Returns:
+    - RealtimeReport of the run.
+    """
+    source = AudioSource(path)
+    frames = (
+        # Every frame is handed over as its own array of the signal type, like a driver buffer
+        np.array(block, dtype=signal_dtype())
+        for block in source.blocks(frame_size, mono=source.channels == 1)
+    )
+    if output is None:
+        return simulate(frames, block_filter, source.sr, frame_size)
+    with sf.SoundFile(
+        output, "w", samplerate=source.sr, channels=source.channels
+    ) as outfile:
+        # soundfile expects (frames, channels)
+        return simulate(
+            frames,
+            block_filter,
+            source.sr,
+            frame_size,
+            sink=lambda out: outfile.write(out.T),
+        )
+
+
+def write_timings(report, path):
+    """
+    Write the per-frame processing times of a run as CSV.
+
+    Parameters:
+    - report: RealtimeReport of the run.
+    - path: Path of the CSV file.
+    """
+    frames = np.arange(report.frames)
+    np.savetxt(
+        path,
+        np.column_stack(
+            [frames, report.timings_s, report.timings_s > report.deadline_s]
+        ),
+        fmt=["%d", "%.9f", "%d"],
+        delimiter=",",
+        header="frame,processing_time_s,deadline_miss",
+        comments="",
+    )
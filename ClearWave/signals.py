@@ -0,0 +1,188 @@
+import hashlib
+import os
+
+import numpy as np
+
+try:
+    import xxhash
+except ImportError:  # Optional speed-up; fall back to hashlib's blake2b
+    xxhash = None
+
+
+# Floating-point types the signal path can run in
+SIGNAL_DTYPES = ("float32", "float64")
+
+# Default type of the loaded, noisy and filtered signals. float32 halves the
+# memory of long recordings; set CLEARWAVE_DTYPE=float64 for double precision.
+# Filter states and metric accumulators stay float64 either way.
+DEFAULT_SIGNAL_DTYPE = os.environ.get("CLEARWAVE_DTYPE", "float32")
+
+
+def _check_dtype(dtype):
+    # Normalize a dtype name or type and make sure it is supported
+    dtype = np.dtype(dtype)
+    if dtype.name not in SIGNAL_DTYPES:
+        raise ValueError(
+            f"unsupported signal dtype {dtype.name!r}, expected one of {SIGNAL_DTYPES}"
+        )
+    return dtype
+
+
+_signal_dtype = _check_dtype(DEFAULT_SIGNAL_DTYPE)
+
+
+def signal_dtype():
+    """
+    Return the floating-point type of the signal path (numpy dtype).
+    """
+    return _signal_dtype
+
+
+def set_signal_dtype(dtype):
+    """
+    Set the floating-point type of the signal path for this process.
+
+    Parameters:
+    - dtype: 'float32' or 'float64' (or the numpy type).
+
+    Raises:
+    - ValueError: If the type is not supported.
+    """
+    global _signal_dtype
+    _signal_dtype = _check_dtype(dtype)
+
+
+def output_dtype(data):
+    """
+    Return the type of a processed signal: the input's type promoted to the
+    signal type, so float32 input stays float32 unless float64 is selected.
+
+    Parameters:
+    - data: Input audio data (numpy array).
+    """
+    return np.result_type(data.dtype, _signal_dtype)
+
+
+def fingerprint(data, samples=4096):
+    """
+    Compute a cheap content fingerprint of a signal.
+
+    Only the shape, dtype and a strided sample of the values (plus the tail) are
+    hashed, so the cost does not grow with the length of the recording. Uses
+    xxHash (XXH3) when the xxhash package is installed, blake2b otherwise.
+
+    Parameters:
+    - data: Audio data (numpy array).
+    - samples: Approximate number of values to hash.
+
+    Returns:
+    - Hex digest identifying the signal.
+    """
+    flat = np.asarray(data).reshape(-1)
+    if xxhash is not None:
+        digest = xxhash.xxh3_128()
+    else:
+        digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((flat.size, np.shape(data), flat.dtype.str)).encode())
+    step = max(1, flat.size // samples)
+    digest.update(np.ascontiguousarray(flat[::step]).tobytes())
+    digest.update(np.ascontiguousarray(flat[-samples:]).tobytes())
+    return digest.hexdigest()
+
+
+def content_hash(data):
+    """
+    Hash every byte of an array, for data that cannot be identified by a sample
+    of its values, such as the encoded bytes of an upload, where an edit between
+    the sampled positions of `fingerprint` would go unnoticed. Runs at memory
+    speed with xxHash (XXH3), which is cheap next to decoding the file.
+
+    Parameters:
+    - data: Array (or any contiguous buffer) to hash.
+
+    Returns:
+    - Hex digest identifying the contents.
+    """
+    data = np.ascontiguousarray(data)
+    if xxhash is not None:
+        digest = xxhash.xxh3_128()
+    else:
+        digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((data.shape, data.dtype.str)).encode())
+    digest.update(data.reshape(-1).view(np.uint8))
+    return digest.hexdigest()
+
+
+class SignalHandle:
+    """
+    Immutable audio signal with a content fingerprint computed once.
+
+    Cached functions take handles instead of raw arrays, so a cache lookup
+    compares the fingerprint (a short string) instead of hashing the samples
+    on every rerun. The wrapped array is read-only, which keeps the fingerprint
+    valid for as long as the handle lives.
+    """
+
+    __slots__ = ("_data", "_fingerprint")
+
+    def __init__(self, data, exact=False):
+        """
+        Parameters:
+        - data: Audio data (numpy array, time on the last axis).
+        - exact: Identify the data by a hash of all of its bytes (content_hash)
+          instead of a sampled fingerprint, e.g. for encoded uploads.
+        """
+        data = np.asarray(data)
+        if data.flags.writeable:
+            data = data.view()  # Read-only view; the caller's array stays writable
+            data.setflags(write=False)
+        object.__setattr__(self, "_data", data)
+        key = content_hash(data) if exact else fingerprint(data)
+        object.__setattr__(self, "_fingerprint", key)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SignalHandle is immutable")
+
+    @property
+    def data(self):
+        """
+        The wrapped (read-only) samples.
+        """
+        return self._data
+
+    @property
+    def fingerprint(self):
+        """
+        Content fingerprint of the samples.
+        """
+        return self._fingerprint
+
+    @property
+    def shape(self):
+        return self._data.shape
+
+    @property
+    def ndim(self):
+        return self._data.ndim
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, SignalHandle) and self._fingerprint == other._fingerprint
+        )
+
+    def __hash__(self):
+        return hash(self._fingerprint)
+
+    def __repr__(self):
+        return f"SignalHandle(shape={self.shape}, dtype={self._data.dtype}, fingerprint={self._fingerprint})"
+
+
+def unwrap(signal):
+    """
+    Return the samples of a SignalHandle, or the argument itself if it is an array.
+    """
+    return signal.data if isinstance(signal, SignalHandle) else signal
+
+
+# hash_funcs for st.cache_data: key handles by their fingerprint
+HASH_FUNCS = {SignalHandle: lambda signal: signal.fingerprint}
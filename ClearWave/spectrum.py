@@ -0,0 +1,421 @@
+import threading
+import weakref
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+from scipy import fft as sp_fft
+from scipy.signal import get_window
+
+from signals import SignalHandle, fingerprint
+from streaming import iter_blocks
+
+# Magnitude spectrum of a real signal: positive frequencies (Hz) and |rfft|
+Spectrum = namedtuple("Spectrum", ["freqs", "magnitude"])
+
+# Spectrum aggregated into log-spaced bins: bin centers (Hz), max and mean per bin
+LogSpectrum = namedtuple("LogSpectrum", ["freqs", "maximum", "mean"])
+
+# Number of log-spaced bins used to draw a spectrum
+DEFAULT_LOG_BINS = 512
+
+# Welch estimator settings: segment length and number of segments transformed at once
+DEFAULT_NPERSEG = 4096
+WELCH_BATCH_SEGMENTS = 64
+
+
+def _nbytes(value):
+    # Total size of the numpy arrays held by a cached value (anything with an
+    # `nbytes` attribute, encoded bytes, or a tuple of those)
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, tuple):
+        return sum(_nbytes(item) for item in value)
+    return getattr(value, "nbytes", 0)
+
+
+# Every FingerprintCache created, for aggregate hit/miss statistics
+_caches = weakref.WeakSet()
+
+
+class FingerprintCache:
+    """
+    Bounded LRU cache of values derived from a signal, keyed by the signal's
+    fingerprint plus any extra parameters, so a long decoded signal never has to
+    be hashed in full.
+
+    Caches are shared by all sessions (Streamlit runs each session's script in
+    its own thread), so the entries are guarded by a lock, and concurrent
+    misses on the same key wait for one computation instead of repeating it.
+    """
+
+    def __init__(
+        self, compute, max_entries=8, max_bytes=512 * 1024**2, key_func=fingerprint
+    ):
+        """
+        Parameters:
+        - compute: Function called as compute(data, *params) on a cache miss.
+        - max_entries: Maximum number of values kept.
+        - max_bytes: Maximum total size of the cached arrays (the newest entry is always kept).
+        - key_func: Function identifying an array passed to `get` (the sampled
+          `fingerprint`, or `content_hash` for data that needs a full hash).
+        """
+        self.compute = compute
+        self.key_func = key_func
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()  # Guards the entries and counters
+        self._pending = {}  # key -> lock held while the value is computed
+        self.hits = 0
+        self.misses = 0
+        _caches.add(self)
+
+    def get(self, data, *params):
+        """
+        Return the cached value for a signal, computing it on a cache miss.
+
+        Parameters:
+        - data: Audio data (numpy array, or a SignalHandle whose fingerprint is reused).
+        - params: Extra hashable parameters that are part of the key (e.g. the sampling rate).
+        """
+        if isinstance(data, SignalHandle):
+            key = (data.fingerprint,) + params
+            data = data.data
+        else:
+            key = (self.key_func(data),) + params
+        with self._lock:
+            if key in self._entries:
+                return self._hit(key)
+            pending = self._pending.setdefault(key, threading.Lock())
+
+        with pending:
+            with self._lock:
+                if key in self._entries:  # Computed by another thread meanwhile
+                    return self._hit(key)
+                self.misses += 1
+            try:
+                value = self.compute(data, *params)
+            except BaseException:
+                with self._lock:
+                    self._pending.pop(key, None)
+                raise
+            with self._lock:
+                self._entries[key] = value
+                self._pending.pop(key, None)
+                self._evict()
+        return value
+
+    def _hit(self, key):
+        # Count a hit and mark the entry as most recently used (lock held)
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def _evict(self):
+        # Drop the least recently used values until both limits hold (lock held)
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries
+            or sum(_nbytes(v) for v in self._entries.values()) > self.max_bytes
+        ):
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all cached values.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        """
+        Number of cached values.
+        """
+        return len(self._entries)
+
+
+def cache_counters():
+    """
+    Return the total number of hits and misses of all fingerprint caches.
+
+    Returns:
+    - (hits, misses)
+    """
+    caches = list(_caches)
+    return sum(c.hits for c in caches), sum(c.misses for c in caches)
+
+
+def clear_caches():
+    """
+    Empty every fingerprint cache (decoded files, spectra, features, ...), e.g.
+    in batch workers, which never see a recording twice.
+    """
+    for cache in list(_caches):
+        cache.clear()
+
+
+def compute_spectrum(data, sr):
+    """
+    Compute the magnitude spectrum of a real signal with one real FFT.
+
+    Multichannel signals, shaped (channels, samples), are transformed in one
+    batched call along the last axis.
+
+    Parameters:
+    - data: Audio data (numpy array, time on the last axis).
+    - sr: Sampling rate.
+
+    Returns:
+    - Spectrum(freqs, magnitude) with float32 arrays; the magnitudes have the
+      shape of the data with the last axis replaced by n // 2 + 1 bins.
+    """
+    magnitude = np.abs(sp_fft.rfft(data, axis=-1, workers=-1)).astype(np.float32)
+    freqs = sp_fft.rfftfreq(data.shape[-1], 1 / sr).astype(np.float32)
+    magnitude.setflags(write=False)  # Shared between views, keep immutable
+    freqs.setflags(write=False)
+    return Spectrum(freqs, magnitude)
+
+
+# Spectrum service shared by all analysis views
+spectrum_cache = FingerprintCache(compute_spectrum)
+
+
+def get_spectrum(data, sr):
+    """
+    Return the (cached) magnitude spectrum of a signal.
+
+    Parameters:
+    - data: Audio data (numpy array).
+    - sr: Sampling rate.
+
+    Returns:
+    - Spectrum(freqs, magnitude) as float32 arrays.
+    """
+    return spectrum_cache.get(data, sr)
+
+
+def log_bin(freqs, values, n_bins=DEFAULT_LOG_BINS, fmin=1.0, fmax=None):
+    """
+    Aggregate values on a linear frequency grid into log-spaced bins.
+
+    Bins narrower than the FFT resolution (at low frequencies) hold a single FFT
+    bin or none at all; empty bins are dropped, so the low end keeps its full
+    resolution while the high end is summarized by its max and mean.
+
+    Parameters:
+    - freqs: Increasing frequencies of the values (Hz).
+    - values: Values to aggregate (e.g. magnitudes), with freqs along the last axis
+      (leading axes such as channels are binned in the same call).
+    - n_bins: Number of log-spaced bins between fmin and fmax.
+    - fmin: Lowest frequency included (Hz, must be > 0).
+    - fmax: Highest frequency included (Hz, defaults to the last frequency).
+
+    Returns:
+    - LogSpectrum(freqs, maximum, mean) with at most n_bins float32 entries
+      (per leading index of `values`).
+    """
+    fmax = fmax if fmax is not None else freqs[-1]
+    edges = np.geomspace(fmin, fmax, n_bins + 1)
+    bounds = np.searchsorted(freqs, edges)
+    bounds[-1] = np.searchsorted(freqs, fmax, side="right")  # Include fmax itself
+    starts, ends = bounds[:-1], bounds[1:]
+    filled = ends > starts
+    if not filled.any():
+        empty = np.empty(np.shape(values)[:-1] + (0,), dtype=np.float32)
+        return LogSpectrum(np.empty(0, dtype=np.float32), empty, empty)
+
+    # reduceat over the start of every non-empty bin; empty bins contribute nothing
+    stop = ends[filled][-1]
+    indices = starts[filled]
+    counts = ends[filled] - indices
+    values = np.asarray(values)[..., :stop]
+    maximum = np.maximum.reduceat(values, indices, axis=-1)
+    mean = np.add.reduceat(values, indices, axis=-1, dtype=np.float64) / counts
+    # Place each bin at the mean frequency of its members, which is exact for
+    # the single-FFT-bin bins at the low end
+    centers = (
+        np.add.reduceat(np.asarray(freqs)[:stop], indices, dtype=np.float64) / counts
+    )
+    return LogSpectrum(
+        centers.astype(np.float32), maximum.astype(np.float32), mean.astype(np.float32)
+    )
+
+
+def compute_log_spectrum(data, sr, n_bins=DEFAULT_LOG_BINS):
+    """
+    Compute the log-frequency binned magnitude spectrum of a signal.
+
+    Parameters:
+    - data: Audio data (numpy array).
+    - sr: Sampling rate.
+    - n_bins: Number of log-spaced bins between 1 Hz and the Nyquist frequency.
+
+    Returns:
+    - LogSpectrum(freqs, maximum, mean) as float32 arrays.
+    """
+    freqs, magnitude = get_spectrum(data, sr)
+    return log_bin(freqs, magnitude, n_bins, fmin=1.0, fmax=sr / 2)
+
+
+# Binned spectra are tiny, so keep more of them than full spectra
+log_spectrum_cache = FingerprintCache(compute_log_spectrum, max_entries=32)
+
+
+def get_log_spectrum(data, sr, n_bins=DEFAULT_LOG_BINS):
+    """
+    Return the (cached) log-frequency binned magnitude spectrum of a signal.
+
+    Parameters:
+    - data: Audio data (numpy array).
+    - sr: Sampling rate.
+    - n_bins: Number of log-spaced bins.
+
+    Returns:
+    - LogSpectrum(freqs, maximum, mean) as float32 arrays.
+    """
+    return log_spectrum_cache.get(data, sr, n_bins)
+
+
+class WelchAccumulator:
+    """
+    Streaming Welch power spectral density estimate.
+
+    Blocks of any length are fed through `update`; every complete segment is
+    windowed, detrended and transformed, and only the running sum of the
+    periodograms plus less than one segment of leftover samples is kept. The
+    result matches scipy.signal.welch over the concatenated blocks, while memory
+    stays bounded no matter how long the signal is.
+    """
+
+    def __init__(self, sr, nperseg=DEFAULT_NPERSEG, noverlap=None, window="hann"):
+        """
+        Parameters:
+        - sr: Sampling rate.
+        - nperseg: Segment length in samples.
+        - noverlap: Overlap between segments (defaults to half a segment).
+        - window: Window applied to each segment (any scipy.signal.get_window spec).
+        """
+        self.sr = sr
+        self.nperseg = nperseg
+        self.step = nperseg - (nperseg // 2 if noverlap is None else noverlap)
+        self.window = get_window(window, nperseg)
+        self.reset()
+
+    def reset(self):
+        """
+        Discard all accumulated segments.
+        """
+        self.leftover = None  # Samples not yet covered by a complete segment
+        self.total = None  # Sum of the periodograms
+        self.segments = 0
+
+    def update(self, block):
+        """
+        Add the next block of samples (time on the last axis).
+        """
+        block = np.asarray(block, dtype=np.float64)
+        if self.leftover is not None:
+            block = np.concatenate([self.leftover, block], axis=-1)
+        n_segments = max(0, (block.shape[-1] - self.nperseg) // self.step + 1)
+        if n_segments:
+            windows = np.lib.stride_tricks.sliding_window_view(
+                block, self.nperseg, axis=-1
+            )[..., :: self.step, :]
+
+        for first in range(0, n_segments, WELCH_BATCH_SEGMENTS):
+            segments = windows[
+                ..., first : min(first + WELCH_BATCH_SEGMENTS, n_segments), :
+            ]
+            # Constant detrend, as in scipy.signal.welch
+            segments = segments - segments.mean(axis=-1, keepdims=True)
+            power = np.square(np.abs(sp_fft.rfft(segments * self.window, axis=-1)))
+            total = power.sum(axis=-2)
+            self.total = total if self.total is None else self.total + total
+        self.segments += n_segments
+        self.leftover = block[..., n_segments * self.step :].copy()
+
+    def psd(self):
+        """
+        Return the one-sided power spectral density averaged over all segments.
+
+        Returns:
+        - Spectrum(freqs, magnitude) with the PSD (units**2/Hz) as magnitude.
+        """
+        if self.segments == 0:
+            raise ValueError(
+                f"need at least {self.nperseg} samples for a Welch estimate"
+            )
+        psd = self.total / (self.segments * self.sr * np.sum(self.window**2))
+        # Fold the negative frequencies in (DC and Nyquist appear only once)
+        psd[..., 1 : None if self.nperseg % 2 else -1] *= 2
+        freqs = sp_fft.rfftfreq(self.nperseg, 1 / self.sr)
+        return Spectrum(freqs, psd)
+
+
+def range_samples(n, sr, start=None, end=None):
+    """
+    Convert a time range to sample positions, clipped to the signal.
+
+    Parameters:
+    - n: Signal length in samples (np.inf if unknown, e.g. for a block stream).
+    - sr: Sampling rate.
+    - start: Start of the range (s), defaults to the beginning.
+    - end: End of the range (s), defaults to the end.
+
+    Returns:
+    - (first, last) sample positions, with first <= last.
+    """
+    first = 0 if start is None else min(max(int(start * sr), 0), n)
+    last = n if end is None else min(max(int(end * sr), first), n)
+    return first, last
+
+
+def _range_blocks(blocks, first, last):
+    # Yield the parts of consecutive blocks that fall in [first, last)
+    position = 0
+    for block in blocks:
+        lo, hi = max(first - position, 0), min(last - position, block.shape[-1])
+        position += block.shape[-1]
+        if hi > lo:
+            yield block[..., lo:hi]
+        if position >= last:
+            break
+
+
+def welch_psd(data, sr, start=None, end=None, nperseg=DEFAULT_NPERSEG, blocks=None):
+    """
+    Estimate the power spectral density of a signal (or a time range of it) with
+    averaged Welch periodograms in one streaming pass.
+
+    Parameters:
+    - data: Audio data (numpy array, time on the last axis), or None if `blocks` is given.
+    - sr: Sampling rate.
+    - start: Start of the analysed range (s), defaults to the beginning.
+    - end: End of the analysed range (s), defaults to the end.
+    - nperseg: Segment length in samples (shortened for signals shorter than a segment).
+    - blocks: Iterable of consecutive blocks to analyse instead of `data`
+      (e.g. AudioSource.blocks()), so a file never has to be loaded in full.
+      The range is applied to the block stream.
+
+    Returns:
+    - Spectrum(freqs, magnitude) with the PSD as magnitude.
+
+    Raises:
+    - ValueError: If the range is shorter than one segment.
+    """
+    if blocks is None:
+        n = data.shape[-1]
+        first, last = range_samples(n, sr, start, end)
+        nperseg = min(nperseg, n)
+        if last - first < max(nperseg, 1):
+            raise ValueError(
+                f"the analysis range has {last - first} samples, "
+                f"need at least {max(nperseg, 1)} for a Welch estimate"
+            )
+        # A view; the range is streamed block by block
+        blocks = iter_blocks(data[..., first:last])
+    elif start is not None or end is not None:
+        blocks = _range_blocks(blocks, *range_samples(np.inf, sr, start, end))
+    accumulator = WelchAccumulator(sr, nperseg)
+    for block in blocks:
+        accumulator.update(block)
+    return accumulator.psd()
@@ -0,0 +1,415 @@
+import numpy as np
+import soundfile as sf
+from scipy import fft as sp_fft
+from scipy.signal import filtfilt, lfilter, sosfilt, sosfiltfilt
+
+from signals import output_dtype
+
+# Number of samples handled per block by the streaming engine
+DEFAULT_BLOCKSIZE = 65536
+
+# Measured cost of one FFT butterfly relative to one direct-form multiply-add,
+# used to decide when overlap-add convolution beats direct FIR filtering. With
+# the default blocks the two paths break even at about 55-60 taps (stereo
+# 44.1 kHz, lfilter vs. overlap-add); shorter blocks favour the FFT earlier.
+FFT_COST_FACTOR = 3.5
+
+# Number of output samples produced per chunk by the overlapped zero-phase filter
+DEFAULT_ZERO_PHASE_CHUNK = 2**20
+
+# Impulse-response level (relative to its peak) below which a chunk boundary is
+# considered to have no influence on the zero-phase output
+SETTLING_TOLERANCE = 1e-9
+
+
+class BlockFilter:
+    """
+    Run a filter block by block, carrying the filter state between blocks.
+
+    Feeding consecutive blocks through `process` produces exactly the same output
+    as a single `lfilter` call over the whole signal, while only one block has to
+    be held in memory at a time.
+    """
+
+    def __init__(self, b, a=1.0):
+        """
+        Parameters:
+        - b: Numerator coefficients (or FIR taps) of the filter.
+        - a: Denominator coefficients of the filter (1.0 for FIR filters).
+        """
+        self.b = np.atleast_1d(b)
+        self.a = np.atleast_1d(a)
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the carried state so the next block starts from rest.
+        """
+        self.zi = None  # Delay-line state (len(b) - 1 input samples for FIR filters)
+
+    def process(self, block):
+        """
+        Filter one block of samples along the last axis.
+
+        Parameters:
+        - block: Block of audio samples (numpy array, time on the last axis).
+
+        Returns:
+        - Filtered block, the same length as the input block.
+        """
+        if self.zi is None:
+            # Start from rest, which is what a one-shot lfilter call does
+            state_len = max(len(self.a), len(self.b)) - 1
+            self.zi = np.zeros(block.shape[:-1] + (state_len,))
+        # One call filters every channel, FIR and IIR alike
+        out, self.zi = lfilter(self.b, self.a, block, axis=-1, zi=self.zi)
+        return out
+
+
+class SOSBlockFilter:
+    """
+    Run a filter given as second-order sections block by block, carrying the
+    per-section state between blocks.
+
+    Feeding consecutive blocks through `process` produces exactly the same output
+    as a single `sosfilt` call over the whole signal.
+    """
+
+    def __init__(self, sos):
+        """
+        Parameters:
+        - sos: Second-order sections of the filter, shape (n_sections, 6).
+        """
+        # sosfilt needs a writable array, so take a private copy of the sections
+        self.sos = np.array(np.atleast_2d(sos), dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the carried state so the next block starts from rest.
+        """
+        self.zi = None
+
+    def process(self, block):
+        """
+        Filter one block of samples along the last axis.
+
+        Parameters:
+        - block: Block of audio samples (numpy array, time on the last axis).
+
+        Returns:
+        - Filtered block, the same length as the input block.
+        """
+        if self.zi is None:
+            # sosfilt expects the state as (n_sections, ..., 2)
+            self.zi = np.zeros((self.sos.shape[0],) + block.shape[:-1] + (2,))
+        out, self.zi = sosfilt(self.sos, block, zi=self.zi)
+        return out
+
+
+class OverlapAddFIR:
+    """
+    Run a FIR filter block by block using overlap-add FFT convolution.
+
+    Each block is convolved with the taps in the frequency domain and the
+    len(taps) - 1 samples that spill past the block are carried into the next
+    one, so the output matches direct-form filtering up to rounding while the
+    cost per sample grows with log(len(taps)) instead of len(taps).
+    """
+
+    def __init__(self, taps):
+        """
+        Parameters:
+        - taps: FIR filter coefficients.
+        """
+        self.taps = np.asarray(taps, dtype=np.float64)
+        self._spectra = {}  # FFT of the taps per transform length
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the carried state so the next block starts from rest.
+        """
+        self.tail = None
+
+    def process(self, block):
+        """
+        Filter one block of samples along the last axis.
+
+        Parameters:
+        - block: Block of audio samples (numpy array, time on the last axis).
+
+        Returns:
+        - Filtered block, the same length as the input block.
+        """
+        n = block.shape[-1]
+        overlap = len(self.taps) - 1
+        if self.tail is None:
+            self.tail = np.zeros(block.shape[:-1] + (overlap,))
+        nfft = sp_fft.next_fast_len(n + overlap, real=True)
+        if nfft not in self._spectra:
+            self._spectra[nfft] = sp_fft.rfft(self.taps, nfft)
+        spectrum = sp_fft.rfft(block.astype(np.float64, copy=False), nfft, axis=-1)
+        full = sp_fft.irfft(spectrum * self._spectra[nfft], nfft)
+        full = full[..., : n + overlap]
+        full[..., :overlap] += self.tail  # Add the spill-over of the previous blocks
+        self.tail = full[..., n:].copy()
+        return full[..., :n]
+
+
+def fft_is_cheaper(numtaps, blocksize):
+    """
+    Estimate whether overlap-add FFT convolution is cheaper than direct-form
+    filtering for a given tap count and block length.
+
+    Parameters:
+    - numtaps: Number of FIR taps.
+    - blocksize: Number of samples filtered per block (the signal length if shorter).
+
+    Returns:
+    - True if the FFT path is expected to be faster.
+    """
+    nfft = sp_fft.next_fast_len(blocksize + numtaps - 1, real=True)
+    direct_cost = blocksize * numtaps
+    fft_cost = FFT_COST_FACTOR * nfft * np.log2(nfft)
+    return fft_cost < direct_cost
+
+
+def fir_block_filter(taps, method="auto", length=None, blocksize=DEFAULT_BLOCKSIZE):
+    """
+    Create a streaming FIR filter, choosing between direct-form and FFT execution.
+
+    Parameters:
+    - taps: FIR filter coefficients.
+    - method: 'direct', 'fft' (overlap-add) or 'auto' to pick the cheaper one.
+    - length: Signal length in samples, if known, used by the 'auto' cost estimate.
+    - blocksize: Number of samples per block.
+
+    Returns:
+    - A fresh BlockFilter or OverlapAddFIR.
+    """
+    if method == "auto":
+        if length is not None:
+            blocksize = min(blocksize, max(length, 1))
+        method = "fft" if fft_is_cheaper(len(taps), blocksize) else "direct"
+    if method == "fft":
+        return OverlapAddFIR(taps)
+    return BlockFilter(taps, 1.0)
+
+
+def iter_blocks(data, blocksize=DEFAULT_BLOCKSIZE):
+    """
+    Split an array into consecutive fixed-size blocks along the last axis.
+
+    Parameters:
+    - data: Input audio data (numpy array).
+    - blocksize: Number of samples per block (the last block may be shorter).
+
+    Yields:
+    - Views into the input array, so no samples are copied.
+    """
+    for start in range(0, data.shape[-1], blocksize):
+        yield data[..., start : start + blocksize]
+
+
+def filter_blocks(blocks, block_filter):
+    """
+    Filter an iterable of consecutive blocks with carried filter state.
+
+    Parameters:
+    - blocks: Iterable of consecutive audio blocks.
+    - block_filter: A fresh BlockFilter, SOSBlockFilter or OverlapAddFIR.
+
+    Yields:
+    - Filtered blocks, one per input block.
+    """
+    for block in blocks:
+        yield block_filter.process(block)
+
+
+def filter_array(data, block_filter, blocksize=DEFAULT_BLOCKSIZE):
+    """
+    Filter an in-memory signal block by block, writing into a preallocated output.
+
+    Parameters:
+    - data: Input audio data (numpy array, time on the last axis).
+    - block_filter: A fresh BlockFilter, SOSBlockFilter or OverlapAddFIR.
+    - blocksize: Number of samples per block.
+
+    Returns:
+    - Filtered audio data, identical to filtering the whole array in one call
+      (each block is filtered in float64 and stored in the signal type).
+    """
+    out = np.empty(data.shape, dtype=output_dtype(data))
+    start = 0
+    for filtered in filter_blocks(iter_blocks(data, blocksize), block_filter):
+        out[..., start : start + filtered.shape[-1]] = filtered
+        start += filtered.shape[-1]
+    return out
+
+
+def _write_filtered(blocks, dst, sr, channels, block_filter, format, subtype, monitor):
+    # Filter consecutive (channels, frames) blocks into an audio file
+    with sf.SoundFile(
+        dst,
+        "w",
+        samplerate=sr,
+        channels=channels,
+        format=format,
+        subtype=subtype,
+    ) as outfile:
+        for block in blocks:
+            filtered = block_filter.process(block).astype(
+                output_dtype(block), copy=False
+            )
+            if monitor is not None:
+                monitor(block, filtered)
+            # soundfile uses (frames, channels)
+            outfile.write(filtered.T)
+    return sr
+
+
+def filter_file(
+    src,
+    dst,
+    block_filter,
+    blocksize=DEFAULT_BLOCKSIZE,
+    format=None,
+    subtype=None,
+    monitor=None,
+):
+    """
+    Stream an audio file through a filter into another file.
+
+    Only one block is decoded, filtered and encoded at a time, so peak memory
+    stays constant no matter how long the recording is.
+
+    Parameters:
+    - src: Path or file-like object of the input audio, or an open reader with
+      `sr`, `channels` and a blocks(blocksize, mono) method (an audio_io.AudioSource).
+    - dst: Path or file-like object for the filtered audio.
+    - block_filter: A fresh BlockFilter, SOSBlockFilter or OverlapAddFIR.
+    - blocksize: Number of frames per block.
+    - format: Output container (e.g. 'WAV'), inferred from `dst` if omitted.
+    - subtype: Output sample format (e.g. 'PCM_16'), container default if omitted.
+    - monitor: Function called as monitor(block, filtered) for every block, both
+      shaped (channels, frames), e.g. to measure the SNR in the same pass.
+
+    Returns:
+    - sr: Sampling rate of the processed file.
+    """
+    if hasattr(src, "blocks") and hasattr(src, "sr"):
+        blocks = src.blocks(blocksize, mono=False)
+        return _write_filtered(
+            blocks, dst, src.sr, src.channels, block_filter, format, subtype, monitor
+        )
+    with sf.SoundFile(src) as infile:
+        # Filter along time per channel
+        blocks = (
+            block.T
+            for block in infile.blocks(blocksize, dtype="float64", always_2d=True)
+        )
+        return _write_filtered(
+            blocks,
+            dst,
+            infile.samplerate,
+            infile.channels,
+            block_filter,
+            format,
+            subtype,
+            monitor,
+        )
+
+
+def settling_samples(coeffs, fir=False, tol=SETTLING_TOLERANCE):
+    """
+    Estimate how many samples the impulse response of a filter lasts.
+
+    Parameters:
+    - coeffs: Second-order sections, or FIR taps if `fir` is True.
+    - fir: True if `coeffs` are FIR taps.
+    - tol: Level below which the response is considered to have died out.
+
+    Returns:
+    - Number of samples (the tap count for FIR filters).
+    """
+    if fir:
+        return len(coeffs)
+    # The slowest pole decays as radius**n; double the estimate to cover the
+    # polynomial growth of repeated poles and the gain of the other sections
+    poles = np.concatenate([np.roots(section[3:]) for section in coeffs])
+    radius = np.max(np.abs(poles), initial=0.0)
+    if radius == 0:
+        return 2 * len(coeffs)
+    return 2 * int(np.ceil(np.log(tol) / np.log(radius))) + 2 * len(coeffs)
+
+
+def _filtfilt(data, coeffs, fir, padtype, padlen):
+    # Forward-backward filtering of a whole (in-memory) segment along the last axis
+    if padlen is None:
+        # scipy's default edge extension, shortened for signals that are too short
+        # for it (e.g. the 100-sample impulse and step responses)
+        if fir:
+            padlen = 3 * len(coeffs)
+        else:
+            trailing = min((coeffs[:, 2] == 0).sum(), (coeffs[:, 5] == 0).sum())
+            padlen = 3 * (2 * len(coeffs) + 1 - trailing)
+        padlen = min(padlen, data.shape[-1] - 1)
+    if fir:
+        return filtfilt(coeffs, 1.0, data, padtype=padtype, padlen=padlen)
+    return sosfiltfilt(coeffs, data, padtype=padtype, padlen=padlen)
+
+
+def zero_phase_filter(
+    data,
+    coeffs,
+    fir=False,
+    padtype="odd",
+    padlen=None,
+    chunk_size=DEFAULT_ZERO_PHASE_CHUNK,
+    overlap=None,
+):
+    """
+    Filter a signal forward and backward, so the output has no phase shift and
+    the magnitude response is applied twice.
+
+    Signals longer than `chunk_size` are processed in overlapping chunks: each
+    chunk is filtered together with `overlap` samples of real context on both
+    sides, which are then discarded. As long as the overlap covers the filter's
+    impulse response the result matches filtering the whole signal at once,
+    while only one chunk (instead of several padded copies of the whole signal)
+    is held in memory at a time.
+
+    Parameters:
+    - data: Input audio data (numpy array, time on the last axis).
+    - coeffs: Second-order sections, or FIR taps if `fir` is True.
+    - fir: True if `coeffs` are FIR taps.
+    - padtype: Edge extension applied at the ends of the signal ('odd', 'even',
+      'constant' or None), as in scipy.signal.sosfiltfilt.
+    - padlen: Number of samples of edge extension (None for scipy's default).
+    - chunk_size: Number of output samples per chunk (None to filter in one call).
+    - overlap: Context samples on each side of a chunk (estimated from the filter if omitted).
+
+    Returns:
+    - Filtered audio data, the same shape as the input, in the signal type.
+    """
+    coeffs = np.array(
+        coeffs, dtype=np.float64
+    )  # The filtering routines need a writable copy
+    n = data.shape[-1]
+    if chunk_size is not None and overlap is None:
+        overlap = settling_samples(coeffs, fir)
+    if chunk_size is None or n <= chunk_size + 2 * overlap:
+        # Chunking would not save anything (short signal or very long response)
+        filtered = _filtfilt(data, coeffs, fir, padtype, padlen)
+        return filtered.astype(output_dtype(data), copy=False)
+
+    out = np.empty(data.shape, dtype=output_dtype(data))
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        lo, hi = max(start - overlap, 0), min(stop + overlap, n)
+        # Only the true signal edges need the requested padding; inside the
+        # signal the context samples absorb the start-up transients
+        filtered = _filtfilt(data[..., lo:hi], coeffs, fir, padtype, padlen)
+        out[..., start:stop] = filtered[..., start - lo : stop - lo]
+    return out
@@ -0,0 +1,102 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from adaptive import ToneCanceller
+from pipeline import build_pipeline
+from signals import SignalHandle
+
+SR = 22050
+TONES = (50.0, 8000.0)
+
+
+@pytest.fixture
+def signal():
+    # Seeded stereo noise with a hum and a whine of different amplitudes
+    rng = np.random.default_rng(0)
+    t = np.arange(3 * SR) / SR
+    tones = 0.3 * np.sin(2 * np.pi * 50 * t + 0.4) + 0.1 * np.sin(2 * np.pi * 8000 * t)
+    return 0.05 * rng.standard_normal((2, t.size)) + tones
+
+
+def reference_nlms(data, fs, tones, step_size, blocksize):
+    # Block NLMS with the reference regenerated at absolute time for every
+    # block, instead of rotating the weights between blocks
+    tones = np.asarray(tones)
+    weights = np.zeros(data.shape[:-1] + (2 * tones.size,))
+    out = np.empty_like(data)
+    for start in range(0, data.shape[-1], blocksize):
+        t = np.arange(start, min(start + blocksize, data.shape[-1])) / fs
+        phase = 2 * np.pi * np.outer(t, tones)
+        reference = np.hstack([np.sin(phase), np.cos(phase)])
+        error = data[..., start : start + t.size] - weights @ reference.T
+        energy = np.sum(np.square(reference)) + np.finfo(float).eps
+        weights = weights + (step_size / energy) * (error @ reference)
+        out[..., start : start + t.size] = error
+    return out
+
+
+def test_run_matches_reference_nlms(signal):
+    canceller = ToneCanceller(SR, TONES, step_size=0.05, blocksize=200)
+    expected = reference_nlms(signal, SR, TONES, 0.05, 200)
+    np.testing.assert_allclose(canceller.run(signal).output, expected, atol=1e-9)
+
+
+def test_process_streams_like_run(signal):
+    canceller = ToneCanceller(SR, TONES, step_size=0.2)
+    # Blocks that do not line up with the NLMS blocks
+    streamed = np.concatenate(
+        [canceller.process(signal[..., i : i + 1000]) for i in range(0, SR * 3, 1000)],
+        axis=-1,
+    )
+    run = ToneCanceller(SR, TONES, step_size=0.2).run(signal).output
+    # Every call starts a new NLMS block at its first sample, so after the
+    # first call the updates fall on other samples than in one run
+    np.testing.assert_allclose(streamed[..., :1000], run[..., :1000], atol=1e-12)
+    assert np.std(streamed[..., -SR:]) == pytest.approx(0.05, rel=0.1)
+
+
+def test_run_learns_the_tone_amplitudes(signal):
+    result = ToneCanceller(SR, TONES, step_size=0.2).run(signal)
+    # The learned amplitudes converge to the tones, leaving only the noise
+    np.testing.assert_allclose(
+        result.amplitude[..., -1, :], [[0.3, 0.1]] * 2, atol=0.02
+    )
+    assert np.std(result.output[..., -SR:]) == pytest.approx(0.05, rel=0.1)
+    assert result.error_power[..., -1].max() < result.error_power[..., 0].min()
+
+
+def test_tones_above_nyquist_are_ignored():
+    assert ToneCanceller(8000, TONES).tones.tolist() == [50.0]
+
+
+def test_pipeline_adapts_once(monkeypatch, signal):
+    calls = []
+    run = ToneCanceller.run
+    monkeypatch.setattr(
+        ToneCanceller, "run", lambda self, data: calls.append(1) or run(self, data)
+    )
+    pipeline = build_pipeline()
+    upload = io.BytesIO()
+    sf.write(upload, signal.T, SR, format="WAV", subtype="FLOAT")
+    pipeline.update(
+        upload=SignalHandle(np.frombuffer(upload.getvalue(), np.uint8), exact=True),
+        add_noise=False,
+        noise_type="Both",
+        noise_level=0.0,
+        filter_type="Adaptive Tone Canceller (NLMS)",
+        lowcut=100,
+        highcut=5000,
+        order=5,
+        rp=None,
+        rs=None,
+        numtaps=None,
+        fir_method="auto",
+        zero_phase=False,
+    )
+    cleaned = pipeline["filter"]
+    result = pipeline["adaptive"]
+    assert len(calls) == 1
+    np.testing.assert_array_equal(cleaned.data, result.output)
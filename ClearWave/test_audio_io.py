@@ -0,0 +1,93 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from audio_io import AudioSource, load_audio, parse_wav_header
+from signals import SignalHandle, fingerprint
+
+SR = 8000
+
+
+def wav_bytes(samples, subtype, sr=SR):
+    # Encode (frames, channels) samples as an in-memory WAV file
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, sr, format="WAV", subtype=subtype)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def samples():
+    # Seeded stereo noise within [-1, 1)
+    return np.random.default_rng(0).uniform(-0.9, 0.9, (5000, 2))
+
+
+@pytest.mark.parametrize(
+    "subtype, dtype",
+    [("PCM_16", "<i2"), ("PCM_32", "<i4"), ("FLOAT", "<f4"), ("DOUBLE", "<f8")],
+)
+def test_parse_wav_header_maps_plain_encodings(samples, subtype, dtype):
+    raw = wav_bytes(samples, subtype)
+    layout = parse_wav_header(raw)
+    assert (layout.sr, layout.channels, layout.frames) == (SR, 2, 5000)
+    assert layout.dtype == np.dtype(dtype)
+    assert layout.offset + 5000 * 2 * layout.dtype.itemsize <= len(raw)
+
+
+def test_parse_wav_header_reads_extensible_format():
+    # libsndfile writes WAVE_FORMAT_EXTENSIBLE headers for more than two channels
+    raw = wav_bytes(np.zeros((100, 4)), "PCM_16")
+    assert parse_wav_header(raw).channels == 4
+
+
+@pytest.mark.parametrize("subtype", ["PCM_U8", "PCM_24", "ULAW"])
+def test_parse_wav_header_rejects_encodings_that_need_decoding(samples, subtype):
+    assert parse_wav_header(wav_bytes(samples, subtype)) is None
+
+
+def test_parse_wav_header_rejects_other_files():
+    assert parse_wav_header(b"not a wav file") is None
+
+
+@pytest.mark.parametrize("subtype", ["PCM_16", "PCM_24", "FLOAT"])
+@pytest.mark.parametrize("mono", [True, False])
+def test_audio_source_matches_soundfile(samples, subtype, mono):
+    raw = wav_bytes(samples, subtype)
+    expected = sf.read(io.BytesIO(raw), dtype="float32")[0].T
+    if mono:
+        expected = expected.mean(axis=0)
+    # Blocks that do not divide the file, for the mapped and the decoded path
+    data = AudioSource(raw).read(mono=mono, blocksize=999)
+    assert data.dtype == np.float32
+    np.testing.assert_allclose(data, expected, rtol=0, atol=1e-7)
+
+
+def test_audio_source_maps_the_file(tmp_path, samples):
+    path = tmp_path / "mono.wav"
+    sf.write(path, samples[:, 0], SR, subtype="FLOAT")
+    data = AudioSource(str(path)).read()
+    # Mono float32 files are returned as a read-only view of the mapping
+    assert not data.flags.owndata and not data.flags.writeable
+    np.testing.assert_array_equal(data, sf.read(path, dtype="float32")[0])
+
+
+def test_load_audio_sees_edits_between_fingerprint_samples(tmp_path, samples):
+    path = tmp_path / "take.wav"
+    sf.write(path, samples, SR, subtype="PCM_16")
+    first, _ = load_audio(str(path), mono=False)
+
+    # Change one sample that the sampled fingerprint of the bytes does not read
+    raw = np.fromfile(path, np.uint8)
+    edited = raw.copy()
+    position = len(raw) // 2 + 1
+    step = max(1, raw.size // 4096)
+    assert position % step and position < len(raw) - 4096
+    edited[position] ^= 0x40
+    assert fingerprint(edited) == fingerprint(raw)
+    edited.tofile(path)
+
+    second, _ = load_audio(str(path), mono=False)
+    assert not np.array_equal(first, second)
+    # Uploads are identified the same way
+    assert SignalHandle(edited, exact=True) != SignalHandle(raw, exact=True)
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from charts import channel_frame, decimate, series_budget, stacked_frame, wide_frame
+
+
+@pytest.fixture
+def curves():
+    # Two seeded random walks with a narrow notch and a narrow peak
+    walks = np.cumsum(np.random.default_rng(0).standard_normal((2, 100000)), axis=-1)
+    walks[0, 31337] = walks[0].min() - 100
+    walks[1, 77777] = walks[1].max() + 100
+    return walks
+
+
+def test_short_curves_are_kept_whole():
+    np.testing.assert_array_equal(decimate(np.arange(10.0), 10), np.arange(10))
+
+
+@pytest.mark.parametrize("max_rows", [100, 999, 5000])
+def test_decimate_keeps_extremes_within_budget(curves, max_rows):
+    keep = decimate(curves, max_rows)
+    assert len(keep) <= max_rows
+    assert np.all(np.diff(keep) > 0)
+    assert keep[0] == 0 and keep[-1] == curves.shape[-1] - 1
+    # The notch and peak survive, as do every curve's overall extremes
+    assert {31337, 77777} <= set(keep)
+    for curve in curves:
+        assert curve[keep].min() == curve.min() and curve[keep].max() == curve.max()
+
+
+def test_decimate_keeps_every_bucket_extreme(curves):
+    # 500 equal buckets of 200 points, with room for both ends: each bucket's
+    # min and max are kept
+    keep = decimate(curves[0], 1002)
+    buckets = curves[0].reshape(500, 200)
+    offsets = np.arange(500) * 200
+    assert set(buckets.argmin(axis=-1) + offsets) <= set(keep)
+    assert set(buckets.argmax(axis=-1) + offsets) <= set(keep)
+
+
+def test_decimate_ignores_nans(curves):
+    curve = curves[0].copy()
+    curve[1000:50000] = np.nan
+    keep = decimate(curve, 1000)
+    assert len(keep) <= 1000
+    assert np.nanmin(curve[keep]) == np.nanmin(curve)
+    assert np.nanmax(curve[keep]) == np.nanmax(curve)
+
+
+def test_wide_frame_shares_the_budget(curves):
+    x = np.arange(curves.shape[-1])
+    frame = wide_frame("x", x, {"a": curves[0], "b": curves[1]}, max_points=2000)
+    assert list(frame.columns) == ["x", "a", "b"]
+    assert len(frame) <= series_budget(2, 2000) == 1000
+    assert frame["a"].dtype == np.float32
+    np.testing.assert_array_equal(frame["b"], curves[1][frame["x"]].astype(np.float32))
+
+
+def test_stacked_frame_labels_each_series(curves):
+    x = np.arange(curves.shape[-1])
+    series = {
+        "Noisy": {"x": x, "low": curves[0], "high": curves[1]},
+        "Cleaned": {"x": x[:500], "low": curves[0, :500], "high": curves[1, :500]},
+    }
+    frame = stacked_frame(series, "Signal", max_points=2000)
+    assert list(frame.columns) == ["x", "low", "high", "Signal"]
+    assert isinstance(frame["Signal"].dtype, pd.CategoricalDtype)
+    counts = frame["Signal"].value_counts()
+    assert counts["Noisy"] <= 1000 and counts["Cleaned"] == 500
+    assert frame["low"].min() == np.float32(curves[0].min())
+
+
+def test_channel_frame_keeps_channels_aligned(curves):
+    frame = channel_frame(
+        {"Time (s)": np.arange(curves.shape[-1]) / 100.0},
+        {"Amplitude": curves},
+        max_points=2000,
+    )
+    assert len(frame) <= 2000
+    assert frame["Channel"].dtype == np.uint8
+    left, right = (frame[frame["Channel"] == c] for c in (1, 2))
+    np.testing.assert_array_equal(left["Time (s)"], right["Time (s)"])
+    np.testing.assert_array_equal(
+        right["Amplitude"],
+        curves[1][np.rint(right["Time (s)"] * 100).astype(int)].astype(np.float32),
+    )
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from analysis import calculate_snr, suggest_bandpass_values_welch
+from audio_io import audio_cache, load_audio
+from cli import process_file
+from features import feature_cache
+from filters import apply_filter
+from spectrum import spectrum_cache
+
+SR = 16000
+
+
+def batch_options(**overrides):
+    # The options main() builds for `clearwave batch` with its defaults
+    options = {
+        "filter_type": "Butterworth Band-pass",
+        "order": 5,
+        "rp": None,
+        "rs": None,
+        "numtaps": None,
+        "dtype": "float32",
+        "zero_phase": False,
+        "estimator": "welch",
+        "start": None,
+        "end": None,
+        "lowcut": None,
+        "highcut": None,
+    }
+    options.update(overrides)
+    return options
+
+
+@pytest.fixture
+def recordings(tmp_path):
+    # A mono and a stereo 16-bit recording of seeded noise, well below clipping
+    rng = np.random.default_rng(0)
+    input_dir = tmp_path / "in"
+    input_dir.mkdir()
+    for name, channels in [("mono.wav", 1), ("stereo.wav", 2)]:
+        samples = 0.1 * rng.standard_normal((3 * SR, channels))
+        sf.write(input_dir / name, samples, SR, subtype="PCM_16")
+    return input_dir
+
+
+@pytest.mark.parametrize("name", ["mono.wav", "stereo.wav"])
+@pytest.mark.parametrize("filter_type", ["Elliptic Band-pass", "FIR Band-pass"])
+def test_streamed_batch_matches_in_memory_filtering(
+    tmp_path, recordings, name, filter_type
+):
+    options = batch_options(filter_type=filter_type)
+    row = process_file(
+        str(recordings / name), str(recordings), str(tmp_path / "out"), options
+    )
+    assert not row.get("error")
+
+    # The same steps on the whole recording in memory
+    audio_data, sr = load_audio(str(recordings / name), mono=False)
+    audio_data = audio_data[0] if audio_data.shape[0] == 1 else audio_data
+    lowcut, highcut = suggest_bandpass_values_welch(audio_data, sr)
+    cleaned = apply_filter(audio_data, lowcut, highcut, sr, filter_type)
+
+    assert (row["lowcut"], row["highcut"]) == (lowcut, highcut)
+    assert row["channels"] == (1 if audio_data.ndim == 1 else 2)
+    assert row["snr_db"] == pytest.approx(
+        float(calculate_snr(audio_data, cleaned)), abs=1e-3
+    )
+    written, _ = sf.read(tmp_path / "out" / row["output"], always_2d=True)
+    # Both are stored as 16-bit PCM
+    np.testing.assert_allclose(
+        written.T, np.atleast_2d(cleaned), rtol=0, atol=1.5 / 2**15
+    )
+
+
+def test_batch_worker_keeps_no_recordings_cached(tmp_path, recordings):
+    options = batch_options(estimator="fft")
+    row = process_file(
+        str(recordings / "stereo.wav"), str(recordings), str(tmp_path / "out"), options
+    )
+    assert not row.get("error")
+    # The loaded samples, spectrum and features are dropped with the file
+    for cache in (audio_cache, spectrum_cache, feature_cache):
+        assert len(cache) == 0
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+import comparison
+from comparison import compare_filters
+
+SR = 16000
+FILTERS = ["Butterworth Band-pass", "Elliptic Band-pass"]
+
+
+@pytest.fixture
+def signal():
+    # Seeded mono noise
+    return np.random.default_rng(0).standard_normal(4 * SR)
+
+
+def test_pool_matches_in_process(signal):
+    serial = compare_filters(signal, SR, 300, 3000, FILTERS, workers=1)
+    # More workers requested than there are filters
+    parallel = compare_filters(signal, SR, 300, 3000, FILTERS, workers=8)
+    assert comparison._executor_workers == len(FILTERS)
+    for filt in FILTERS:
+        for got, expected in zip(parallel[filt], serial[filt]):
+            np.testing.assert_array_equal(got, expected)
+
+
+def test_wider_pool_is_reused():
+    executor = comparison.get_executor(3)
+    assert comparison.get_executor(2) is executor
+    assert comparison.get_executor(4) is not executor
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from analysis import calculate_snr
+from denoise import SpectralDenoiser
+
+SR = 16000
+
+
+@pytest.fixture
+def clean():
+    # A 1 kHz tone with a slow amplitude swell and silent stretches
+    t = np.arange(2 * SR) / SR
+    return 0.5 * np.sin(2 * np.pi * 1000 * t) * (np.sin(2 * np.pi * 1.5 * t) > 0)
+
+
+@pytest.fixture
+def noise():
+    # Seeded stereo white noise
+    return 0.05 * np.random.default_rng(0).standard_normal((2, 2 * SR))
+
+
+def test_unit_gain_reconstructs_the_signal(noise):
+    # With every gain at 1 the analysis/overlap-add resynthesis is the identity,
+    # including the partial frames at both edges and across chunk boundaries
+    denoiser = SpectralDenoiser(
+        100, 7000, SR, over_subtraction=0.0, gain_floor=1.0, chunk_frames=7
+    )
+    np.testing.assert_allclose(denoiser.apply(noise), noise, rtol=0, atol=1e-12)
+
+
+def test_chunk_size_does_not_change_the_output(clean, noise):
+    noisy = clean + noise
+    whole = SpectralDenoiser(100, 7000, SR, chunk_frames=10**6).apply(noisy)
+    chunked = SpectralDenoiser(100, 7000, SR, chunk_frames=13).apply(noisy)
+    np.testing.assert_allclose(chunked, whole, rtol=0, atol=1e-12)
+
+
+def test_channels_are_denoised_independently(clean, noise):
+    denoiser = SpectralDenoiser(100, 7000, SR)
+    stereo = denoiser.apply(clean + noise)
+    for channel in range(2):
+        np.testing.assert_allclose(
+            stereo[channel], denoiser.apply(clean + noise[channel]), atol=1e-12
+        )
+
+
+def test_noise_profile_of_white_noise(noise):
+    denoiser = SpectralDenoiser(100, 7000, SR, noise_quantile=1.0)
+    profile = denoiser.noise_profile(noise)
+    # E|X|^2 of windowed white noise is sigma^2 * sum(w^2) in every bin
+    expected = 0.05**2 * np.sum(denoiser.window**2)
+    np.testing.assert_allclose(profile[..., 1:-1].mean(axis=-1), expected, rtol=0.05)
+
+
+def test_denoising_raises_the_snr(clean, noise):
+    noisy = (clean + noise).astype(np.float32)
+    denoised = SpectralDenoiser(100, 7000, SR).apply(noisy)
+    assert denoised.dtype == np.float32
+    before = calculate_snr(np.broadcast_to(clean, noisy.shape), noisy)
+    after = calculate_snr(np.broadcast_to(clean, noisy.shape), denoised)
+    assert after > before + 6
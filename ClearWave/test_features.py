@@ -0,0 +1,68 @@
+import librosa
+import numpy as np
+import pytest
+
+from features import compute_features, get_features
+from signals import SignalHandle
+
+SR = 22050
+
+
+@pytest.fixture
+def signal():
+    # Seeded stereo noise plus a tone, with a silent stretch at the start
+    rng = np.random.default_rng(0)
+    t = np.arange(SR) / SR
+    data = 0.1 * rng.standard_normal((2, SR)) + np.sin(2 * np.pi * 440 * t)
+    data[..., :3000] = 0
+    return data.astype(np.float32)
+
+
+def test_features_match_librosa(signal):
+    features = compute_features(signal, SR)
+    kwargs = dict(y=signal, sr=SR, n_fft=2048, hop_length=512, pad_mode="constant")
+    for name, expected in [
+        ("centroid", librosa.feature.spectral_centroid(**kwargs)),
+        ("bandwidth", librosa.feature.spectral_bandwidth(**kwargs)),
+        ("rolloff", librosa.feature.spectral_rolloff(**kwargs)),
+    ]:
+        np.testing.assert_allclose(
+            getattr(features, name), expected[:, 0], rtol=1e-3, atol=1e-2
+        )
+    flatness = librosa.feature.spectral_flatness(
+        y=signal, n_fft=2048, hop_length=512, pad_mode="constant"
+    )
+    np.testing.assert_allclose(features.flatness, flatness[:, 0], rtol=1e-3)
+    np.testing.assert_allclose(
+        features.times, librosa.times_like(features.centroid, sr=SR, hop_length=512)
+    )
+
+
+def test_chunking_does_not_change_the_features(signal):
+    whole = compute_features(signal, SR, chunk_frames=None)
+    chunked = compute_features(signal, SR, chunk_frames=7)
+    # Equal up to float32 rounding of the batched reductions
+    for got, expected in zip(chunked, whole):
+        np.testing.assert_allclose(got, expected, rtol=1e-5)
+
+
+def test_channels_are_analysed_independently(signal):
+    stereo = compute_features(signal, SR)
+    mono = compute_features(signal[1], SR)
+    for got, expected in zip(stereo[1:], mono[1:]):
+        np.testing.assert_allclose(got[1], expected, rtol=1e-6)
+
+
+def test_silent_frames_have_no_energy(signal):
+    features = compute_features(signal, SR)
+    # Frames whose window lies entirely within the leading silence
+    silent = features.times < (3000 - 1024) / SR
+    assert silent.any()
+    assert np.all(features.energy[..., silent] == 0)
+    assert np.all(features.centroid[..., silent] == 0)
+
+
+def test_features_are_cached_and_read_only(signal):
+    features = get_features(SignalHandle(signal), SR)
+    assert get_features(signal, SR) is features
+    assert not features.centroid.flags.writeable
@@ -0,0 +1,149 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from pipeline import Pipeline, build_pipeline
+from signals import SignalHandle
+
+SR = 8000
+
+
+def recomputed(pipeline):
+    return {run.name for run in pipeline.runs if run.recomputed}
+
+
+@pytest.fixture
+def counting():
+    # Chain a -> b -> c over the parameters x and y, counting every evaluation
+    pipeline = Pipeline()
+    calls = []
+
+    @pipeline.node("a", ["x"])
+    def a(x):
+        calls.append("a")
+        return x // 10  # Equal for nearby x
+
+    @pipeline.node("b", ["a", "y"])
+    def b(a, y):
+        calls.append("b")
+        return a + y
+
+    @pipeline.node("c", ["b"])
+    def c(b):
+        calls.append("c")
+        return [b]  # Unhashable, identified by its inputs
+
+    pipeline.update(x=1, y=1)
+    return pipeline, calls
+
+
+def test_nodes_are_evaluated_lazily_and_once(counting):
+    pipeline, calls = counting
+    assert calls == []
+    assert pipeline["c"] == [1]
+    assert pipeline["c"] == [1] and pipeline["b"] == 1
+    assert calls == ["a", "b", "c"]
+
+
+def test_only_nodes_downstream_of_a_change_recompute(counting):
+    pipeline, calls = counting
+    pipeline["c"]
+    pipeline.begin()
+    pipeline.update(y=2)
+    assert pipeline["c"] == [2]
+    assert calls[3:] == ["b", "c"]
+    assert recomputed(pipeline) == {"b", "c"}
+    assert [run.name for run in pipeline.runs] == ["a", "b", "c"]
+
+
+def test_equal_values_keep_downstream_cached(counting):
+    pipeline, calls = counting
+    c = pipeline["c"]
+    pipeline.begin()
+    pipeline.update(x=2)  # a recomputes to the same value
+    assert pipeline["c"] is c
+    assert calls[3:] == ["a"]
+    assert recomputed(pipeline) == {"a"}
+
+
+def test_runs_are_reset_by_begin(counting):
+    pipeline, _ = counting
+    pipeline["c"]
+    assert all(run.seconds >= 0 for run in pipeline.runs)
+    pipeline.begin()
+    assert pipeline.runs == []
+    pipeline["a"]
+    assert pipeline.runs[0][:2] == ("a", False)
+
+
+def evaluate(pipeline):
+    # Everything an app rerun displays
+    for name in ["suggestion", "metrics", "noisy_preview", "cleaned_preview"]:
+        pipeline[name]
+
+
+@pytest.fixture
+def app_pipeline():
+    # The app's graph over a seeded stereo recording
+    rng = np.random.default_rng(0)
+    upload = io.BytesIO()
+    sf.write(upload, 0.1 * rng.standard_normal((SR, 2)), SR, format="WAV")
+    pipeline = build_pipeline()
+    pipeline.update(
+        upload=SignalHandle(np.frombuffer(upload.getvalue(), np.uint8), exact=True),
+        add_noise=True,
+        noise_type="Both",
+        noise_level=0.1,
+        estimator="fft",
+        analysis_range=(0.0, 1.0),
+        filter_type="Butterworth Band-pass",
+        lowcut=100,
+        highcut=3000,
+        order=4,
+        rp=1.0,
+        rs=40.0,
+        numtaps=101,
+        fir_method="auto",
+        zero_phase=False,
+        preview_format="WAV",
+        preview_seconds=None,
+        preview_rate=None,
+    )
+    evaluate(pipeline)
+    pipeline.begin()
+    return pipeline
+
+
+def test_cutoff_change_recomputes_only_the_filtered_side(app_pipeline):
+    noisy_preview = app_pipeline["noisy_preview"]
+    app_pipeline.begin()
+    app_pipeline.update(highcut=2500)
+    evaluate(app_pipeline)
+    assert recomputed(app_pipeline) == {
+        "design",
+        "adaptive",
+        "filter",
+        "spectra",
+        "metrics",
+        "cleaned_preview",
+    }
+    assert app_pipeline["noisy_preview"] is noisy_preview
+
+
+def test_unused_design_parameter_recomputes_nothing_downstream(app_pipeline):
+    metrics = app_pipeline["metrics"]
+    app_pipeline.begin()
+    app_pipeline.update(rp=3.0)  # Butterworth has no passband ripple
+    evaluate(app_pipeline)
+    assert recomputed(app_pipeline) == {"design"}
+    assert app_pipeline["metrics"] is metrics
+
+
+def test_noise_change_keeps_the_load(app_pipeline):
+    app_pipeline.begin()
+    app_pipeline.update(noise_level=0.2)
+    evaluate(app_pipeline)
+    assert "load" not in recomputed(app_pipeline)
+    assert {"noise", "filter", "noisy_preview"} <= recomputed(app_pipeline)
@@ -0,0 +1,59 @@
+import io
+import tracemalloc
+
+import numpy as np
+import pytest
+import soundfile as sf
+from scipy.signal import resample_poly
+
+from previews import encode_preview, preview_rate, resampled_blocks
+
+
+@pytest.fixture
+def signal():
+    # Seeded stereo float32 noise within [-1, 1]
+    return np.random.default_rng(0).uniform(-0.5, 0.5, (2, 100001)).astype(np.float32)
+
+
+@pytest.mark.parametrize("up, down", [(80, 147), (160, 147), (1, 6), (3, 1)])
+def test_resampled_blocks_match_resample_poly(signal, up, down):
+    blocks = list(resampled_blocks(signal, up, down, blocksize=4096))
+    assert len(blocks) > 1
+    np.testing.assert_array_equal(
+        np.concatenate(blocks, axis=-1), resample_poly(signal, up, down, axis=-1)
+    )
+
+
+def test_resampled_blocks_of_a_short_signal():
+    short = np.linspace(-1, 1, 10)
+    np.testing.assert_array_equal(
+        np.concatenate(list(resampled_blocks(short, 80, 147)), axis=-1),
+        resample_poly(short, 80, 147),
+    )
+
+
+def test_wav_preview_is_resampled_and_truncated(signal):
+    preview = encode_preview(signal, 44100, "WAV", max_seconds=2.0, max_rate=16000)
+    assert (preview.mime, preview.sr, preview.truncated) == ("audio/wav", 16000, True)
+    decoded, sr = sf.read(io.BytesIO(preview.data), always_2d=True)
+    expected = resample_poly(signal[..., : 2 * 44100], 160, 441, axis=-1)
+    assert sr == 16000
+    np.testing.assert_allclose(decoded.T, expected, rtol=0, atol=1.0 / 2**15)
+
+
+def test_opus_preview_rate():
+    assert preview_rate(44100, "OPUS") == 48000
+    assert preview_rate(44100, "OPUS", max_rate=11025) == 12000
+    assert preview_rate(44100, "VORBIS", max_rate=22050) == 22050
+
+
+def test_resampled_preview_keeps_temporaries_bounded():
+    long = np.zeros((2, 44100 * 30), dtype=np.float32)
+    tracemalloc.start()
+    try:
+        preview = encode_preview(long, 44100, "WAV", max_rate=16000)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # The encoded bytes plus about one block, not a resampled copy of the signal
+    assert peak < len(preview.data) + long.nbytes / 8
@@ -0,0 +1,184 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+from scipy.signal import welch
+
+from signals import SignalHandle
+from spectrum import (
+    FingerprintCache,
+    WelchAccumulator,
+    compute_spectrum,
+    get_spectrum,
+    welch_psd,
+)
+from streaming import iter_blocks
+
+SR = 8000
+
+
+@pytest.fixture
+def signal():
+    # Seeded stereo noise, several Welch segments long
+    return np.random.default_rng(0).standard_normal((2, 30000))
+
+
+def test_welch_accumulator_matches_scipy(signal):
+    accumulator = WelchAccumulator(SR, nperseg=1024)
+    # Blocks that do not line up with the segments
+    for block in iter_blocks(signal, 777):
+        accumulator.update(block)
+    freqs, psd = accumulator.psd()
+    expected_freqs, expected = welch(signal, SR, nperseg=1024, axis=-1)
+    np.testing.assert_allclose(freqs, expected_freqs)
+    np.testing.assert_allclose(psd, expected, rtol=1e-10)
+
+
+def test_welch_range_matches_slice(signal):
+    freqs, psd = welch_psd(signal, SR, start=0.5, end=3.0, nperseg=1024)
+    expected = welch(signal[..., 4000:24000], SR, nperseg=1024, axis=-1)[1]
+    np.testing.assert_allclose(psd, expected, rtol=1e-10)
+
+
+def test_welch_range_applies_to_blocks(signal):
+    from_data = welch_psd(signal, SR, start=0.5, end=3.0, nperseg=1024)
+    from_blocks = welch_psd(
+        None, SR, start=0.5, end=3.0, nperseg=1024, blocks=iter_blocks(signal, 999)
+    )
+    np.testing.assert_allclose(from_blocks.magnitude, from_data.magnitude, rtol=1e-10)
+
+
+def test_welch_short_signal_shortens_segments():
+    short = np.random.default_rng(1).standard_normal(500)
+    psd = welch_psd(short, SR, nperseg=1024).magnitude
+    np.testing.assert_allclose(psd, welch(short, SR, nperseg=500)[1], rtol=1e-10)
+
+
+@pytest.mark.parametrize("start, end", [(2.0, 2.0), (3.0, 1.0), (2.0, 2.1)])
+def test_welch_range_shorter_than_a_segment_is_rejected(signal, start, end):
+    # Empty, reversed and sub-segment ranges have no complete segment to average
+    with pytest.raises(ValueError, match="analysis range"):
+        welch_psd(signal, SR, start=start, end=end, nperseg=1024)
+
+
+def test_welch_short_block_range_is_rejected(signal):
+    with pytest.raises(ValueError, match="Welch estimate"):
+        welch_psd(
+            None, SR, start=2.0, end=2.0, nperseg=1024, blocks=iter_blocks(signal)
+        )
+
+
+def signals(count, n=1000):
+    # Distinct seeded signals
+    rng = np.random.default_rng(1)
+    return [rng.standard_normal(n) for _ in range(count)]
+
+
+def test_cache_computes_once_per_signal_and_params():
+    calls = []
+    cache = FingerprintCache(lambda data, scale: calls.append(1) or data * scale)
+    a, b = signals(2)
+    np.testing.assert_array_equal(cache.get(a, 2), a * 2)
+    cache.get(a.copy(), 2)  # Same content, another array
+    cache.get(SignalHandle(a), 2)  # A handle reuses its fingerprint
+    cache.get(a, 3)
+    cache.get(b, 2)
+    assert len(calls) == 3 and (cache.hits, cache.misses) == (2, 3)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = FingerprintCache(lambda data: data.sum(), max_entries=2)
+    a, b, c = signals(3)
+    cache.get(a)
+    cache.get(b)
+    cache.get(a)  # a is now the most recently used
+    cache.get(c)  # evicts b
+    misses = cache.misses
+    cache.get(a)
+    cache.get(c)
+    assert cache.misses == misses and len(cache) == 2
+    cache.get(b)
+    assert cache.misses == misses + 1
+
+
+def test_cache_evicts_by_size_but_keeps_the_newest_entry():
+    cache = FingerprintCache(lambda data: data.copy(), max_bytes=20000)
+    a, b, c = signals(3, n=1000)  # 8 kB each
+    for data in (a, b, c):
+        cache.get(data)
+    assert len(cache) == 2
+    large = signals(1, n=10000)[0]  # 80 kB, over the budget on its own
+    cache.get(large)
+    assert len(cache) == 1
+    np.testing.assert_array_equal(cache.get(large), large)
+
+
+def test_concurrent_misses_compute_once():
+    calls = []
+
+    def slow(data):
+        calls.append(1)
+        time.sleep(0.05)
+        return data.sum()
+
+    cache = FingerprintCache(slow)
+    a = signals(1)[0]
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get(a))) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and results == [a.sum()] * 8
+    assert (cache.hits, cache.misses) == (7, 1)
+
+
+def test_different_keys_compute_concurrently():
+    # Both computations must be running at the same time to pass the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    cache = FingerprintCache(lambda data: barrier.wait() is not None)
+    errors = []
+
+    def get(data):
+        try:
+            cache.get(data)
+        except threading.BrokenBarrierError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=get, args=(data,)) for data in signals(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors and len(cache) == 2
+
+
+def test_failed_computation_is_retried():
+    attempts = []
+
+    def flaky(data):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("first attempt fails")
+        return data.sum()
+
+    cache = FingerprintCache(flaky)
+    a = signals(1)[0]
+    with pytest.raises(RuntimeError):
+        cache.get(a)
+    assert cache.get(a) == a.sum() and len(attempts) == 2
+
+
+def test_spectrum_matches_numpy(signal):
+    spectrum = get_spectrum(SignalHandle(signal), SR)
+    np.testing.assert_allclose(
+        spectrum.magnitude, np.abs(np.fft.rfft(signal, axis=-1)), rtol=1e-5
+    )
+    np.testing.assert_allclose(spectrum.freqs, np.fft.rfftfreq(30000, 1 / SR))
+    # Cached values are shared, so they are read-only
+    assert not spectrum.magnitude.flags.writeable
+    assert get_spectrum(signal, SR) is spectrum
+    assert compute_spectrum(signal, SR).magnitude.dtype == np.float32
@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+import soundfile as sf
+from scipy.signal import filtfilt, lfilter, sosfilt, sosfiltfilt
+
+from audio_io import AudioSource
+from filters import filter_bank
+from streaming import (
+    BlockFilter,
+    OverlapAddFIR,
+    SOSBlockFilter,
+    filter_array,
+    filter_file,
+    settling_samples,
+    zero_phase_filter,
+)
+
+SR = 16000
+LOWCUT, HIGHCUT = 300, 3000
+LINEAR_TYPES = [name for name in filter_bank.names if filter_bank.is_linear(name)]
+
+
+@pytest.fixture
+def signal():
+    # Seeded stereo noise, long enough for many blocks and zero-phase chunks
+    return np.random.default_rng(0).standard_normal((2, 20000))
+
+
+def one_shot(data, filter_type, coeffs):
+    # Reference: the whole signal filtered in a single scipy call
+    if filter_bank.is_fir(filter_type):
+        return lfilter(coeffs, 1.0, data, axis=-1)
+    return sosfilt(coeffs, data, axis=-1)
+
+
+def test_all_linear_types_are_covered():
+    assert len(LINEAR_TYPES) == 7
+
+
+@pytest.mark.parametrize("fir_method", ["direct", "fft"])
+@pytest.mark.parametrize("filter_type", LINEAR_TYPES)
+def test_block_filter_matches_one_shot(signal, filter_type, fir_method):
+    coeffs = filter_bank.design(filter_type, LOWCUT, HIGHCUT, SR)
+    block_filter = filter_bank.block_filter(
+        filter_type, LOWCUT, HIGHCUT, SR, fir_method=fir_method
+    )
+    # A block size that does not divide the signal, so the last block is short
+    filtered = filter_array(signal, block_filter, blocksize=1000 + 7)
+    np.testing.assert_allclose(
+        filtered, one_shot(signal, filter_type, coeffs), rtol=0, atol=1e-12
+    )
+
+
+def test_overlap_add_matches_lfilter(signal):
+    taps = filter_bank.design("FIR Band-pass", LOWCUT, HIGHCUT, SR, numtaps=255)
+    expected = lfilter(taps, 1.0, signal, axis=-1)
+    np.testing.assert_allclose(
+        filter_array(signal, OverlapAddFIR(taps), blocksize=512),
+        expected,
+        rtol=0,
+        atol=1e-12,
+    )
+    # The direct form carries a state longer than the block
+    np.testing.assert_allclose(
+        filter_array(signal, BlockFilter(taps), blocksize=100),
+        expected,
+        rtol=0,
+        atol=1e-12,
+    )
+
+
+def test_zero_phase_chunks_match_whole_signal(signal):
+    sos = filter_bank.design("Butterworth Band-pass", LOWCUT, HIGHCUT, SR, order=4)
+    chunk_size = 2048
+    overlap = settling_samples(sos)
+    # The overlap must be much shorter than the signal, or zero_phase_filter
+    # falls back to a single call and the chunking is not exercised
+    assert signal.shape[-1] > 4 * (chunk_size + 2 * overlap)
+
+    filtered = zero_phase_filter(signal, sos, chunk_size=chunk_size)
+    np.testing.assert_allclose(
+        filtered, sosfiltfilt(sos, signal, axis=-1), rtol=0, atol=1e-12
+    )
+
+
+def test_zero_phase_fir_chunks_match_whole_signal(signal):
+    taps = filter_bank.design("FIR Band-pass", LOWCUT, HIGHCUT, SR)
+    filtered = zero_phase_filter(signal, taps, fir=True, chunk_size=2048)
+    np.testing.assert_allclose(
+        filtered, filtfilt(taps, 1.0, signal, axis=-1), rtol=0, atol=1e-12
+    )
+
+
+def test_zero_phase_short_signal_uses_single_call(signal):
+    sos = filter_bank.design("Elliptic Band-pass", 50, 60, SR)
+    # Narrow elliptic bands ring for longer than the signal: no chunking
+    assert signal.shape[-1] <= 2048 + 2 * settling_samples(sos)
+    np.testing.assert_allclose(
+        zero_phase_filter(signal, sos, chunk_size=2048),
+        sosfiltfilt(sos, signal, axis=-1),
+        rtol=0,
+        atol=1e-12,
+    )
+
+
+@pytest.mark.parametrize("filter_type", ["Elliptic Band-pass", "FIR Band-pass"])
+def test_filter_file_matches_one_shot(tmp_path, signal, filter_type):
+    src, dst = tmp_path / "in.wav", tmp_path / "out.wav"
+    # 64-bit float WAV files hold the samples exactly
+    sf.write(src, signal.T, SR, subtype="DOUBLE")
+    coeffs = filter_bank.design(filter_type, LOWCUT, HIGHCUT, SR)
+    block_filter = filter_bank.block_filter(filter_type, LOWCUT, HIGHCUT, SR)
+
+    assert filter_file(src, dst, block_filter, blocksize=1000, subtype="DOUBLE") == SR
+    filtered, sr = sf.read(dst, always_2d=True)
+    assert sr == SR
+    np.testing.assert_allclose(
+        filtered.T, one_shot(signal, filter_type, coeffs), rtol=0, atol=1e-12
+    )
+
+
+def test_filter_file_reads_audio_source(tmp_path, signal):
+    src, dst = tmp_path / "in.wav", tmp_path / "out.wav"
+    sf.write(src, signal.T, SR, subtype="FLOAT")
+    sos = filter_bank.design("Butterworth Band-pass", LOWCUT, HIGHCUT, SR)
+    seen = []
+
+    filter_file(
+        AudioSource(str(src)),
+        dst,
+        SOSBlockFilter(sos),
+        blocksize=1000,
+        subtype="DOUBLE",
+        monitor=lambda block, filtered: seen.append(block.shape),
+    )
+    # The mapped float32 samples are filtered in (channels, frames) blocks
+    assert seen[0] == (2, 1000) and sum(shape[-1] for shape in seen) == 20000
+    expected = sosfilt(sos, signal.astype(np.float32), axis=-1)
+    np.testing.assert_allclose(sf.read(dst)[0].T, expected, rtol=0, atol=1e-6)